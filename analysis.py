@@ -1,45 +1,185 @@
 import cv2
 import os
-import matplotlib.pyplot as plt
+import sys
+import csv
+import json
 import numpy as np
+import math
+from concurrent.futures import ProcessPoolExecutor
+from functools import cached_property, lru_cache
+import steganography
 
-def show_histogram(original, stego):
-    img1 = cv2.imread(original)
-    img2 = cv2.imread(stego)
-    
-    plt.figure(figsize=(12, 6))
-    
+# How many decoded images / finished reports to keep around
+IMAGE_CACHE_SIZE = 8
+
+@lru_cache(maxsize=IMAGE_CACHE_SIZE)
+def _decode(path, mtime_ns, size):
+    img = cv2.imread(path)
+    if img is None:
+        raise ValueError(f"❌ Could not read image: {path}")
+    # Cached arrays are shared between callers, so make them read-only
+    img.setflags(write=False)
+    return img
+
+def _stat_key(path):
+    # Cache key: the path plus mtime and size, so edited files are re-read
+    st = os.stat(path)
+    return path, st.st_mtime_ns, st.st_size
+
+def load_image(path):
+    # Decoded BGR array, cached (LRU) until the file changes
+    return _decode(*_stat_key(path))
+
+class AnalysisReport:
+    # Everything we measure about an original/stego pair.
+    # File sizes need no decoding. The first pixel statistic that is asked
+    # for decodes both images (once, via the cache) and computes all of
+    # them in a single pass over the difference image.
+    def __init__(self, original, stego):
+        self.original = original
+        self.stego = stego
+        self.original_size = os.path.getsize(original)
+        self.stego_size = os.path.getsize(stego)
+
+    @property
+    def size_difference(self):
+        return self.stego_size - self.original_size
+
+    @cached_property
+    def _stats(self):
+        img1 = load_image(self.original)
+        img2 = load_image(self.stego)
+        if img1.shape != img2.shape:
+            raise ValueError(f"❌ Image sizes differ: {img1.shape} vs {img2.shape}")
+
+        # |original - stego| as uint8; no wide temporaries
+        diff = cv2.absdiff(img1, img2)
+
+        # MSE from the histogram of differences: sum(count * d^2) / n
+        diff_hist = np.bincount(diff.reshape(-1), minlength=256)
+        mse = float(diff_hist @ (np.arange(256, dtype=np.float64) ** 2)) / diff.size
+        # Same formula as cv2.PSNR (epsilon keeps identical images finite)
+        psnr = 20 * math.log10(255 / (math.sqrt(mse) + np.finfo(float).eps))
+
+        # Per-channel histograms: offset every channel into its own 256 bins
+        # so one bincount covers all of them
+        channels = img1.shape[2] if img1.ndim == 3 else 1
+        offsets = (np.arange(channels, dtype=np.uint16) * 256)
+        hist1 = np.bincount((img1.reshape(-1, channels) + offsets).reshape(-1), minlength=256 * channels)
+        hist2 = np.bincount((img2.reshape(-1, channels) + offsets).reshape(-1), minlength=256 * channels)
+
+        # Which pixels changed, and the box (x0, y0, x1, y1) around them
+        changed = diff.max(axis=2) if diff.ndim == 3 else diff
+        changed = changed != 0
+        rows = np.flatnonzero(changed.any(axis=1))
+        cols = np.flatnonzero(changed.any(axis=0))
+        bbox = None
+        if len(rows):
+            bbox = (int(cols[0]), int(rows[0]), int(cols[-1]) + 1, int(rows[-1]) + 1)
+
+        return {
+            'shape': img1.shape,
+            'mse': mse,
+            'psnr': psnr,
+            'hist_original': hist1.reshape(channels, 256),
+            'hist_stego': hist2.reshape(channels, 256),
+            'changed_pixels': int(np.count_nonzero(changed)),
+            'bbox': bbox,
+        }
+
+    @property
+    def shape(self):
+        return self._stats['shape']
+
+    @property
+    def mse(self):
+        return self._stats['mse']
+
+    @property
+    def psnr(self):
+        return self._stats['psnr']
+
+    @property
+    def hist_original(self):
+        return self._stats['hist_original']
+
+    @property
+    def hist_stego(self):
+        return self._stats['hist_stego']
+
+    @property
+    def changed_pixels(self):
+        return self._stats['changed_pixels']
+
+    @property
+    def bbox(self):
+        return self._stats['bbox']
+
+@lru_cache(maxsize=IMAGE_CACHE_SIZE)
+def _cached_report(original_key, stego_key):
+    return AnalysisReport(original_key[0], stego_key[0])
+
+def analyze(original, stego):
+    # Shared report for a pair; repeated calls (PSNR, histogram, sizes)
+    # reuse the same decode and the same statistics until a file changes
+    return _cached_report(_stat_key(original), _stat_key(stego))
+
+def _draw_histogram(ax, report):
     # Create x-axis values
     x = np.arange(256)
     
-    for i, color in enumerate(['b','g','r']):
-        hist1 = cv2.calcHist([img1], [i], None, [256], [0,256])
-        hist2 = cv2.calcHist([img2], [i], None, [256], [0,256])
+    for i, color in enumerate(['b','g','r'][:len(report.hist_original)]):
+        hist1 = report.hist_original[i]
+        hist2 = report.hist_stego[i]
         
         # Plot original as semi-transparent bars
-        plt.bar(x, hist1.flatten(), color=color, alpha=0.3, width=1.0, 
+        ax.bar(x, hist1, color=color, alpha=0.3, width=1.0, 
                label=f'Original {color}')
         
         # Plot stego as solid line with different line styles
         line_style = '-' if i == 0 else '--' if i == 1 else ':'
-        plt.plot(hist2, color=color, linestyle=line_style, 
+        ax.plot(hist2, color=color, linestyle=line_style, 
                linewidth=2, label=f'Stego {color}')
     
-    plt.title('Histogram Comparison (Original: Bars, Stego: Lines)')
-    plt.xlabel('Pixel Intensity')
-    plt.ylabel('Frequency')
-    plt.grid(True, linestyle='--', alpha=0.6)
-    plt.legend()
-    plt.xlim([0, 255])
+    ax.set_title('Histogram Comparison (Original: Bars, Stego: Lines)')
+    ax.set_xlabel('Pixel Intensity')
+    ax.set_ylabel('Frequency')
+    ax.grid(True, linestyle='--', alpha=0.6)
+    ax.legend()
+    ax.set_xlim([0, 255])
+
+def show_histogram(original, stego):
+    # matplotlib is only needed here: importing it costs more than the rest
+    # of this module, so the CLI, the server and the GUI's other tabs skip it
+    import matplotlib.pyplot as plt
+    report = analyze(original, stego)
+    
+    plt.figure(figsize=(12, 6))
+    _draw_histogram(plt.gca(), report)
     plt.tight_layout()
     plt.show()
 
+def render_histogram(original, stego, width=1200, height=600, dpi=100):
+    # The same chart as show_histogram, drawn off-screen (Agg) into a PIL
+    # RGBA image of width x height pixels. It touches no GUI toolkit and no
+    # pyplot state, so it is safe to call from a worker thread.
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    from PIL import Image
+    report = analyze(original, stego)
+
+    figure = Figure(figsize=(width / dpi, height / dpi), dpi=dpi)
+    canvas = FigureCanvasAgg(figure)
+    _draw_histogram(figure.add_subplot(), report)
+    figure.tight_layout()
+    canvas.draw()
+    return Image.frombuffer('RGBA', canvas.get_width_height(), canvas.buffer_rgba()).copy()
+
 def calculate_psnr(original, stego):
-    img1 = cv2.imread(original)
-    img2 = cv2.imread(stego)
+    report = analyze(original, stego)
     
     # Calculate PSNR
-    psnr = cv2.PSNR(img1, img2)
+    psnr = report.psnr
     
     # Determine Level
     if psnr > 60:
@@ -54,11 +194,233 @@ def calculate_psnr(original, stego):
     print(f"🔍 PSNR Value: {psnr:.2f} dB")
     print(f"📊 Quality Level: {grade}")
 
-def compare_file_size(original, stego):
-    size1 = os.path.getsize(original)
-    size2 = os.path.getsize(stego)
+    height, width = report.shape[:2]
+    changed = report.changed_pixels
+    print(f"🧩 Changed pixels: {changed:,} ({changed / (width * height):.2%})")
+    if report.bbox:
+        print(f"📐 Modified region: x {report.bbox[0]}-{report.bbox[2]}, y {report.bbox[1]}-{report.bbox[3]}")
+
+    # Capacity vs quality: what each bits-per-channel setting would cost
+    # The PSNR stands on its own: a payload that can't be read is reported,
+    # not raised (damaged header, unsupported container, undecodable rows)
+    try:
+        info = steganography.stego_info(stego)
+    except (ValueError, OSError) as e:
+        print(f"🧮 Payload: unreadable ({str(e).removeprefix('❌').strip()})")
+    else:
+        if info:
+            print(f"🧮 Bits per channel: {info['bits_per_channel']} ({info['payload_bytes']:,} bytes embedded)")
+        else:
+            print("🧮 Payload: none found")
+
+    print("💡 Capacity / quality trade-off at full capacity:")
+    for k in range(1, steganography.MAX_BITS_PER_CHANNEL + 1):
+        capacity = steganography.plan_capacity(stego, [], k)['capacity']
+        print(f"   {k} bit(s): {capacity:,} bytes, ~{lsb_psnr_estimate(k):.2f} dB")
+
+    return psnr
+
+def lsb_psnr_estimate(bits_per_channel):
+    # Expected PSNR when every channel's k low bits are replaced by random
+    # payload bits: the error is the difference of two uniform values in
+    # [0, 2^k), whose mean square is (4^k - 1) / 6.
+    mse = (4 ** bits_per_channel - 1) / 6
+    return 10 * math.log10(255 ** 2 / mse)
+
+def compare_file_size(original, stego, encoders=False):
+    # Sizes only: this never decodes the images, unless `encoders` is set.
+    # encoders=True (or a list of profile names) also re-encodes the stego
+    # image with each output encoder and shows what every profile costs.
+    report = analyze(original, stego)
     
-    print(f"📂 Original size: {size1:,} bytes")
-    print(f"📂 Stego size:    {size2:,} bytes")
-    diff = size2 - size1
-    print(f"📈 Size difference: {diff:,} bytes")
\ No newline at end of file
+    print(f"📂 Original size: {report.original_size:,} bytes")
+    print(f"📂 Stego size:    {report.stego_size:,} bytes")
+    print(f"📈 Size difference: {report.size_difference:,} bytes")
+
+    if encoders:
+        profiles = steganography.profile_encoders(stego, None if encoders is True else encoders)
+        print(f"\n🗜️ Encoder profiles ({profiles[0]['format']}):")
+        for row in profiles:
+            change = row['bytes'] - report.stego_size
+            print(f"   {row['encoder']:<13}{row['seconds']:8.3f} s {row['bytes']:>14,} bytes ({change:+,})")
+    return report
+
+# ========================== STEGANALYSIS ==========================
+# Blind detectors: they look at a single image and estimate whether (and
+# how much) LSB data it carries. Everything is plain NumPy over the whole
+# image, no per-pixel Python loops.
+
+def _as_array(image):
+    return load_image(image) if isinstance(image, str) else image
+
+def _chi2_sf(x, df):
+    # Chi-square survival function, Wilson-Hilferty approximation
+    # (accurate for the ~100+ degrees of freedom we get from 256 bins)
+    if df <= 0:
+        return 0.0
+    z = ((x / df) ** (1 / 3) - (1 - 2 / (9 * df))) / math.sqrt(2 / (9 * df))
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+def chi_square_attack(image, segments=100):
+    # Westfeld & Pfitzmann: LSB embedding evens out the counts of each
+    # value pair (2i, 2i+1). The test runs over growing prefixes of the
+    # sample stream, which is also the order our embedder writes in.
+    samples = _as_array(image).reshape(-1)
+    per_segment = len(samples) // segments
+    blocks = samples[:per_segment * segments].reshape(segments, per_segment)
+
+    # Histogram of every segment in one bincount, then prefix sums
+    ids = (np.arange(segments, dtype=np.int64)[:, None] * 256 + blocks).reshape(-1)
+    hist = np.bincount(ids, minlength=segments * 256).reshape(segments, 256).cumsum(axis=0)
+
+    even = hist[:, 0::2].astype(np.float64)
+    odd = hist[:, 1::2].astype(np.float64)
+    expected = (even + odd) / 2
+    used = expected > 0
+    chi2 = np.where(used, (even - expected) ** 2 / np.where(used, expected, 1), 0).sum(axis=1)
+    dof = used.sum(axis=1) - 1
+    p = np.array([_chi2_sf(x, d) for x, d in zip(chi2, dof)])
+
+    # The payload covers the prefixes that still look embedded
+    clean = np.flatnonzero(p <= 0.5)
+    fraction = float(clean[0] if len(clean) else segments) / segments
+    return {
+        'probability': float(p[0]),
+        'full_image_probability': float(p[-1]),
+        'embedded_fraction': fraction,
+    }
+
+def _rs_counts(columns, mask):
+    # Fraction of Regular / Singular groups under F1 and F-1 flipping.
+    # columns: one int16 array per pixel position in the group
+    def smoothness(cols):
+        total = np.abs(cols[1] - cols[0])
+        for a, b in zip(cols[1:], cols[2:]):
+            total += np.abs(b - a)
+        return total
+
+    base = smoothness(columns)
+    positive = smoothness([c ^ 1 if m else c for c, m in zip(columns, mask)])                # F1: 0<->1, 2<->3, ...
+    negative = smoothness([((c + 1) ^ 1) - 1 if m else c for c, m in zip(columns, mask)])    # F-1: -1<->0, 1<->2, ...
+
+    n = len(base)
+    if n == 0:
+        # Narrower than one group: nothing to count (rs_analysis then skips
+        # the channel)
+        return 0.0, 0.0, 0.0, 0.0
+    return (np.count_nonzero(positive > base) / n, np.count_nonzero(positive < base) / n,
+            np.count_nonzero(negative > base) / n, np.count_nonzero(negative < base) / n)
+
+def rs_analysis(image, mask=(0, 1, 1, 0)):
+    # Fridrich, Goljan & Du: estimated fraction of samples carrying payload,
+    # averaged over the colour channels
+    img = _as_array(image)
+    size = len(mask)
+    channels = img.reshape(img.shape[0], img.shape[1], -1)
+    rates = []
+    for c in range(channels.shape[2]):
+        channel = channels[:, :, c]
+        width = channel.shape[1] // size * size
+        groups = channel[:, :width].reshape(-1, size).astype(np.int16)
+        columns = [groups[:, i] for i in range(size)]
+
+        r_m, s_m, r_nm, s_nm = _rs_counts(columns, mask)
+        r_m1, s_m1, r_nm1, s_nm1 = _rs_counts([c ^ 1 for c in columns], mask)
+        d0, d1 = r_m - s_m, r_m1 - s_m1
+        dn0, dn1 = r_nm - s_nm, r_nm1 - s_nm1
+
+        # 2(d1 + d0) z^2 + (d-0 - d-1 - d1 - 3 d0) z + d0 - d-0 = 0
+        a = 2 * (d1 + d0)
+        b = dn0 - dn1 - d1 - 3 * d0
+        c0 = d0 - dn0
+        if a == 0:
+            continue
+        root = math.sqrt(max(b * b - 4 * a * c0, 0))
+        z = min((-b + root) / (2 * a), (-b - root) / (2 * a), key=abs)
+        if z != 0.5:
+            rates.append(z / (z - 0.5))
+    return float(np.clip(np.mean(rates), 0, 1)) if rates else float('nan')
+
+def sample_pairs_analysis(image):
+    # Dumitrescu, Wu & Wang: estimated fraction of samples carrying payload,
+    # from horizontally adjacent sample pairs, averaged over the channels
+    img = _as_array(image)
+    channels = img.reshape(img.shape[0], img.shape[1], -1)
+    rates = []
+    for c in range(channels.shape[2]):
+        channel = channels[:, :, c].astype(np.int16)
+        u = channel[:, :-1].reshape(-1)
+        v = channel[:, 1:].reshape(-1)
+        v_even = (v & 1) == 0
+        x = np.count_nonzero((v_even & (u < v)) | (~v_even & (u > v)))
+        y = np.count_nonzero((v_even & (u > v)) | (~v_even & (u < v)))
+        k = np.count_nonzero((u >> 1) == (v >> 1))
+        if k == 0:
+            continue
+
+        # (k/2) p^2 + (2x - n) p + (y - x) = 0, smaller root
+        a = k / 2
+        b = 2 * x - len(u)
+        disc = b * b - 4 * a * (y - x)
+        rates.append((-b - math.sqrt(disc)) / (2 * a) if disc >= 0 else -b / (2 * a))
+    return float(np.clip(np.mean(rates), 0, 1)) if rates else float('nan')
+
+def detect_lsb(image):
+    # All detectors on one image (decoded once)
+    img = _as_array(image)
+    chi = chi_square_attack(img)
+    return {
+        'chi2_probability': chi['probability'],
+        'chi2_embedded_fraction': chi['embedded_fraction'],
+        'rs_rate': rs_analysis(img),
+        'spa_rate': sample_pairs_analysis(img),
+    }
+
+SCAN_FIELDS = ['path', 'chi2_probability', 'chi2_embedded_fraction', 'rs_rate', 'spa_rate', 'error']
+SCAN_EXTS = ('.png', '.bmp', '.tif', '.tiff')
+
+def _scan_one(path):
+    # Worker: decode directly (no cache, each image is seen once)
+    row = {'path': path}
+    try:
+        img = cv2.imread(path)
+        if img is None:
+            raise ValueError("could not read image")
+        row.update(detect_lsb(img))
+        row['error'] = ''
+    except Exception as e:
+        row['error'] = str(e)
+    return row
+
+def json_row(row):
+    # NaN and infinities are not JSON: write them as null
+    return {key: None if isinstance(value, float) and not math.isfinite(value) else value
+            for key, value in row.items()}
+
+def scan_directory(directory, output=None, fmt='csv', workers=None):
+    # Run the detectors over every image in a directory with a process pool.
+    # Rows are written to `output` (a path or file object, default stdout)
+    # as soon as they are ready, as CSV or JSON Lines. Returns the row count.
+    paths = [os.path.join(directory, name) for name in sorted(os.listdir(directory))
+             if name.lower().endswith(SCAN_EXTS)]
+
+    out = open(output, 'w', newline='', encoding='utf-8') if isinstance(output, str) else (output or sys.stdout)
+    try:
+        if fmt == 'csv':
+            writer = csv.DictWriter(out, fieldnames=SCAN_FIELDS)
+            writer.writeheader()
+            write = writer.writerow
+        else:
+            write = lambda row: out.write(json.dumps(json_row(row), allow_nan=False) + '\n')
+
+        count = 0
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunksize = max(1, len(paths) // ((workers or os.cpu_count() or 1) * 4))
+            for row in pool.map(_scan_one, paths, chunksize=chunksize):
+                write(row)
+                out.flush()
+                count += 1
+        return count
+    finally:
+        if isinstance(output, str):
+            out.close()
\ No newline at end of file
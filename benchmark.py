@@ -0,0 +1,334 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+from PIL import Image
+
+try:
+    import resource
+except ImportError:  # Windows: no peak RSS
+    resource = None
+
+# Benchmark harness for the embed / extract / analysis paths.
+#   python benchmark.py                              # default matrix -> bench_results.json
+#   python benchmark.py --sizes 1,16,100 --formats png,bmp
+#   python benchmark.py --baseline old.json          # compare, exit 1 on regression
+#   python benchmark.py --ops embed,extract --threads 1,8,32   # thread scaling
+#   python benchmark.py --matrix                     # plain LSB vs matrix embedding
+#   python benchmark.py --startup --budget 1.0       # GUI import time, exit 1 over budget
+#
+# Every operation runs in a fresh interpreter, so peak RSS is per
+# operation and the analysis cache starts cold each time.
+
+ANALYSIS_OPS = ['psnr', 'file_size', 'histogram', 'chi_square', 'rs', 'spa']
+ALL_OPS = ['embed', 'extract'] + ANALYSIS_OPS
+MODES = ['RGB', 'RGBA', 'L']
+FORMATS = ['png', 'bmp', 'tiff']
+
+# ========================== SYNTHETIC DATA ==========================
+def make_cover(path, megapixels, mode, seed=0):
+    # Smooth gradients plus noise: compresses and analyses roughly like a photo
+    side = int(round((megapixels * 1e6) ** 0.5))
+    rng = np.random.default_rng(seed)
+    y = np.linspace(0, 1, side, dtype=np.float32)[:, None]
+    x = np.linspace(0, 1, side, dtype=np.float32)[None, :]
+    channels = _channels(mode)
+    arr = np.empty((side, side, channels), dtype=np.uint8)
+    for c in range(channels):
+        base = 255 * (0.5 + 0.25 * np.sin(6 * x + 3 * y + c) * np.cos(4 * y - 2 * x))
+        arr[:, :, c] = np.clip(base + rng.normal(0, 4, (side, side)), 0, 255).astype(np.uint8)
+    Image.fromarray(arr[:, :, 0] if channels == 1 else arr, mode).save(path)
+    return side * side
+
+def _channels(mode):
+    return len(Image.new(mode, (1, 1)).getbands())
+
+def make_payload(path, size, seed=0):
+    # Random bytes, written in chunks so big payloads don't need big memory
+    rng = np.random.default_rng(seed)
+    with open(path, 'wb') as f:
+        left = size
+        while left:
+            n = min(left, 16 * 1024 * 1024)
+            f.write(rng.integers(0, 256, n, dtype=np.uint8).tobytes())
+            left -= n
+
+def parse_size(text, capacity):
+    # "1KB", "4MB", "0.5" (fraction of capacity) or "max"
+    text = text.strip().upper()
+    if text == 'MAX':
+        return capacity
+    for suffix, factor in (('KB', 1024), ('MB', 1024 ** 2), ('GB', 1024 ** 3)):
+        if text.endswith(suffix):
+            return int(float(text[:-len(suffix)]) * factor)
+    value = float(text)
+    return int(value * capacity) if value <= 1 else int(value)
+
+# ========================== TIMED OPERATIONS ==========================
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS reports bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def run_op(op, cover, stego, payload, workdir, threads=None, matrix=False):
+    # Runs in a worker process. Returns (seconds, peak RSS in MB, channels
+    # the embed changed or None)
+    os.environ.setdefault('MPLBACKEND', 'Agg')
+    import steganography
+    import analysis
+    if threads:
+        steganography.THREADS = threads
+
+    calls = {
+        'embed': lambda: steganography.embed_multiple_files(cover, [payload], stego, matrix=matrix),
+        'extract': lambda: steganography.extract_multiple_files(stego, os.path.join(workdir, 'extracted')),
+        'psnr': lambda: analysis.calculate_psnr(cover, stego),
+        'file_size': lambda: analysis.compare_file_size(cover, stego),
+        'histogram': lambda: analysis.show_histogram(cover, stego),
+        'chi_square': lambda: analysis.chi_square_attack(stego),
+        'rs': lambda: analysis.rs_analysis(stego),
+        'spa': lambda: analysis.sample_pairs_analysis(stego),
+    }
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        calls[op]()
+        seconds = time.perf_counter() - start
+    if op == 'histogram':
+        import matplotlib.pyplot as plt
+        plt.close('all')
+    rss = _peak_rss_mb()
+    return seconds, rss, _changed_channels(cover, stego) if op == 'embed' else None
+
+def _changed_channels(cover, stego):
+    # How many channel values the embed modified: what PSNR and the
+    # histogram comparison pick up
+    with Image.open(cover) as original, Image.open(stego) as changed:
+        return int(np.count_nonzero(np.asarray(original) != np.asarray(changed)))
+
+def _in_fresh_process(func, *args):
+    # func(*args) in a new interpreter, arguments and result passed as JSON
+    # (so tuples come back as lists). Its last line of output is the result.
+    code = ("import json, sys, benchmark; name, args = json.load(sys.stdin); "
+            "print(json.dumps(getattr(benchmark, name)(*args)))")
+    done = subprocess.run([sys.executable, '-c', code], cwd=HERE, input=json.dumps([func.__name__, args]),
+                          capture_output=True, text=True)
+    if done.returncode:
+        raise RuntimeError(f"{func.__name__}{tuple(args)} failed:\n{done.stderr}")
+    return json.loads(done.stdout.splitlines()[-1])
+
+# ========================== STARTUP ==========================
+# How long a fresh interpreter takes to import a front-end, which is what a
+# user waits for before the window appears. Heavy modules that only some
+# features need must stay out of that path.
+STARTUP_MODULES = ['stego_gui', 'main', 'server']
+DEFERRED_IMPORTS = ['cv2', 'matplotlib', 'analysis']
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def _import_once(module, importtime=False):
+    # (import seconds, whole process seconds, deferred modules loaded, stderr)
+    code = (f"import sys, time; start = time.perf_counter(); import {module}; "
+            f"print(time.perf_counter() - start); "
+            f"print(','.join(m for m in {DEFERRED_IMPORTS!r} if m in sys.modules))")
+    command = [sys.executable] + (['-X', 'importtime'] if importtime else []) + ['-c', code]
+    start = time.perf_counter()
+    done = subprocess.run(command, cwd=HERE, capture_output=True, text=True, check=True,
+                          env=dict(os.environ, MPLBACKEND='Agg'))
+    wall = time.perf_counter() - start
+    seconds, loaded = done.stdout.splitlines()[-2:]
+    return float(seconds), wall, [m for m in loaded.split(',') if m], done.stderr
+
+def _slowest_imports(importtime_log, module, count=5):
+    # Direct imports of `module` by cumulative time, from -X importtime output:
+    #   import time: self [us] | cumulative | imported package
+    rows = []
+    for line in importtime_log.splitlines():
+        parts = line.split('|')
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            name = parts[2].rstrip()
+            rows.append((len(name) - len(name.lstrip()), name.strip(), int(parts[1])))
+    # A module's imports are listed (deeper) right before it
+    top = max(i for i, row in enumerate(rows) if row[1] == module)
+    depth, children = rows[top][0], []
+    for row in reversed(rows[:top]):
+        if row[0] <= depth:
+            break
+        if row[0] == depth + 2:
+            children.append(row)
+    return [(name, micros / 1e6) for _, name, micros in sorted(children, key=lambda row: -row[2])[:count]]
+
+def run_startup(modules, repeat=5, budget=None):
+    # Times every module `repeat` times; the median counts against the budget
+    results = []
+    for module in modules:
+        runs = [_import_once(module) for _ in range(repeat)]
+        imports = sorted(run[0] for run in runs)
+        median = imports[len(imports) // 2]
+        loaded = sorted(set().union(*(run[2] for run in runs)))
+        over = budget is not None and median > budget
+        results.append({
+            'case': 'startup', 'op': module, 'seconds': median, 'first_seconds': runs[0][0],
+            'process_seconds': sorted(run[1] for run in runs)[len(runs) // 2],
+            'deferred_loaded': loaded, 'budget': budget, 'over_budget': over,
+        })
+        flag = "❌" if over or loaded else "✅"
+        print(f"{flag} import {module:<12} {median:8.3f} s (first {runs[0][0]:.3f} s, "
+              f"process {results[-1]['process_seconds']:.3f} s)"
+              + (f" over the {budget:.2f} s budget" if over else "")
+              + (f", loads {', '.join(loaded)} too early" if loaded else ""))
+        for name, seconds in _slowest_imports(_import_once(module, importtime=True)[3], module):
+            print(f"     {name:<28} {seconds:8.3f} s")
+    return results
+
+# ========================== RUNNER ==========================
+def run_benchmarks(sizes, modes, formats, payloads, ops, repeat=1, threads=(None,), matrix=(False,)):
+    # threads: thread counts for the bit kernels; each count is its own case.
+    # matrix: True runs the case with matrix embedding, on the same payload
+    results = []
+    workdir = tempfile.mkdtemp(prefix='stegopro_bench_')
+    try:
+        for megapixels in sizes:
+            for mode in modes:
+                for fmt in formats:
+                    cover = os.path.join(workdir, f'cover.{fmt}')
+                    pixels = _in_fresh_process(make_cover, cover, megapixels, mode)
+                    # Embedding works on the native mode: every channel but alpha, 1 bit each
+                    capacity = pixels * (_channels(mode) - mode.endswith('A')) // 8 - 1024
+                    # Matrix embedding holds at most 2 bits per 3 channels
+                    matrix_capacity = capacity * 2 // 3 - 1024
+                    for payload_spec in payloads:
+                        payload_size = max(1, min(parse_size(payload_spec, capacity), capacity))
+                        payload = os.path.join(workdir, 'payload.bin')
+                        make_payload(payload, payload_size)
+                        stegos = {m: os.path.join(workdir, f"stego{'-matrix' if m else ''}.{fmt}") for m in matrix}
+
+                        for op, thread_count, coded in [(op, t, m) for op in ops for t in threads for m in matrix]:
+                            case = f"{megapixels}MP-{mode}-{fmt}-{payload_spec}"
+                            if thread_count:
+                                case += f"-t{thread_count}"
+                            if coded:
+                                case += "-matrix"
+                                if payload_size > matrix_capacity:
+                                    print(f"⏭️ {case:<28} {op:<10} payload too big for matrix embedding")
+                                    continue
+                            stego = stegos[coded]
+                            if op != 'embed' and not os.path.exists(stego):
+                                _in_fresh_process(run_op, 'embed', cover, stego, payload, workdir, None, coded)
+                            timings = [_in_fresh_process(run_op, op, cover, stego, payload, workdir, thread_count,
+                                                         coded)
+                                       for _ in range(repeat)]
+                            seconds = min(t[0] for t in timings)
+                            rss = max((t[1] for t in timings if t[1] is not None), default=None)
+                            # Throughput: payload bytes for embed/extract, decoded pixels otherwise
+                            nbytes = payload_size if op in ('embed', 'extract') else pixels * _channels(mode)
+                            row = {
+                                'case': case, 'op': op, 'megapixels': megapixels, 'mode': mode,
+                                'format': fmt, 'payload_bytes': payload_size, 'threads': thread_count,
+                                'matrix': coded, 'seconds': seconds, 'peak_rss_mb': rss,
+                                'mb_per_s': nbytes / seconds / 1e6 if seconds else None,
+                            }
+                            changes_text = ""
+                            if op == 'embed':
+                                # Changed channels per payload bit: 0.5 for plain LSB
+                                row['changes'] = timings[0][2]
+                                row['changes_per_bit'] = row['changes'] / (payload_size * 8)
+                                changes_text = f" {row['changes']:>11,} changed ({row['changes_per_bit']:.3f}/bit)"
+                            results.append(row)
+                            rss_text = f"{rss:8.1f} MB" if rss is not None else "     n/a"
+                            print(f"⏱️ {case:<28} {op:<10} {seconds:8.3f} s {rss_text} {row['mb_per_s'] or 0:9.2f} MB/s"
+                                  + changes_text)
+                        shutil.rmtree(os.path.join(workdir, 'extracted'), ignore_errors=True)
+                        for stego in stegos.values():
+                            if os.path.exists(stego):
+                                os.remove(stego)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+def compare(results, baseline_path, threshold):
+    # Prints every (case, op) that got slower than baseline * (1 + threshold)
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = {(r['case'], r['op']): r for r in json.load(f)['results']}
+
+    regressions = 0
+    print(f"\n📈 Comparison against {baseline_path} (threshold {threshold:.0%}):")
+    for row in results:
+        old = baseline.get((row['case'], row['op']))
+        if old is None:
+            continue
+        change = row['seconds'] / old['seconds'] - 1 if old['seconds'] else 0
+        flag = "❌" if change > threshold else "✅"
+        if change > threshold:
+            regressions += 1
+        print(f"{flag} {row['case']:<28} {row['op']:<10} {old['seconds']:8.3f} -> {row['seconds']:8.3f} s ({change:+.1%})")
+    print(f"\n{'❌' if regressions else '✅'} {regressions} regression(s)")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="StegoPro performance benchmarks")
+    parser.add_argument("--sizes", default="1,4", help="cover sizes in megapixels, e.g. 1,16,100")
+    parser.add_argument("--modes", default="RGB", help=f"cover modes ({','.join(MODES)})")
+    parser.add_argument("--formats", default="png,bmp,tiff", help=f"cover formats ({','.join(FORMATS)})")
+    parser.add_argument("--payloads", default="1KB,0.1,max",
+                        help="payload sizes: 1KB / 4MB, a fraction of capacity, or max")
+    parser.add_argument("--ops", default=",".join(ALL_OPS), help="operations to time")
+    parser.add_argument("--threads", help="thread counts for the bit kernels, e.g. 1,8,32 (default: one per CPU)")
+    parser.add_argument("--matrix", action="store_true",
+                        help="also run every case with matrix embedding, reporting the changed channels of both")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per operation (best time is kept)")
+    parser.add_argument("--output", default="bench_results.json", help="results file")
+    parser.add_argument("--baseline", help="earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown before flagging")
+    parser.add_argument("--startup", action="store_true",
+                        help="time importing the front-ends (fresh interpreter each run) instead")
+    parser.add_argument("--startup-modules", default=",".join(STARTUP_MODULES), help="modules --startup imports")
+    parser.add_argument("--budget", type=float, default=1.0, help="--startup: seconds allowed per import (median)")
+    args = parser.parse_args(argv)
+
+    if args.startup:
+        results = run_startup(args.startup_modules.split(','), max(args.repeat, 5), args.budget)
+        failed = any(row['over_budget'] or row['deferred_loaded'] for row in results)
+    else:
+        failed = False
+        results = run_benchmarks(
+            sizes=[float(s) if '.' in s else int(s) for s in args.sizes.split(',')],
+            modes=args.modes.split(','),
+            formats=args.formats.split(','),
+            payloads=args.payloads.split(','),
+            ops=args.ops.split(','),
+            repeat=args.repeat,
+            threads=[int(t) for t in args.threads.split(',')] if args.threads else [None],
+            matrix=[False, True] if args.matrix else [False],
+        )
+
+    report = {
+        'meta': {
+            'date': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+        },
+        'results': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n💾 Results saved to {args.output}")
+
+    if args.baseline and compare(results, args.baseline, args.threshold):
+        return 1
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
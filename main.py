@@ -1,22 +1,423 @@
-from steganography import embed_multiple_files, extract_multiple_files
-from analysis import show_histogram, calculate_psnr, compare_file_size
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
-# Embed multiple files into one cover image
-secret_files = [
-    "test_files/secret.txt",
-    "test_files/secret.docx",
-    "test_files/secret.png"
-]
+import steganography
 
-embed_multiple_files("test_files/cover.png", secret_files, "test_files/stego_multiple.png")
+# Command-line front-end for batch jobs:
+#   python main.py embed   covers/ --secret a.txt --secret b.docx --out stego/
+#   python main.py extract stego/ --out recovered/
+#   python main.py list    stego/
+#   python main.py verify  stego/
+#   python main.py analyze covers/ stego/
+#   python main.py scan stego/ --format jsonl --output report.jsonl
+# Inputs can be files, directories, or a JSON Lines manifest (--manifest).
 
-# Extract all files from the stego image
-extract_multiple_files("test_files/stego_multiple.png", "test_files/Secret_files")
+IMAGE_EXTS = ('.png', '.bmp', '.tif', '.tiff')
 
-# Analysis
-original = "test_files/cover.png"
-stego = "test_files/stego_multiple.png"
+# ========================== PER-ITEM KERNELS ==========================
+# These run inside worker processes, so they must stay at module level.
+# Each one returns (ok, bytes processed, log text or error message, result)
+# where result is the StegoResult of an embed/extract/verify (None otherwise).
 
-show_histogram(original, stego)
-calculate_psnr(original, stego)
-compare_file_size(original, stego)
\ No newline at end of file
+def _run_quietly(func, *args, **kwargs):
+    # The analysis functions print their report; keep it per job instead of interleaved
+    buffer = io.StringIO()
+    with contextlib.redirect_stdout(buffer):
+        func(*args, **kwargs)
+    return buffer.getvalue()
+
+def embed_job(job):
+    try:
+        result = steganography.embed_multiple_files(job['cover'], job['secrets'], job['output'],
+                                                    streaming=job.get('streaming', False),
+                                                    bits_per_channel=job.get('bits_per_channel', 1),
+                                                    compression=job.get('compression', 'none'),
+                                                    encoder=job.get('encoder', 'default'),
+                                                    channels=job.get('channels'),
+                                                    checksum=job.get('checksum', 'crc32'),
+                                                    matrix=job.get('matrix', False))
+        size = os.path.getsize(job['cover']) + sum(os.path.getsize(p) for p in job['secrets'])
+        return True, size, result.summary(), result
+    except Exception as e:
+        return False, 0, str(e), None
+
+def extract_job(job):
+    try:
+        result = steganography.extract_multiple_files(job['stego'], job['output'], names=job.get('files'))
+        return True, os.path.getsize(job['stego']), result.summary(), result
+    except Exception as e:
+        return False, 0, str(e), None
+
+def verify_job(job):
+    # A damaged image is a failed job, not an error
+    try:
+        result = steganography.verify(job['stego'])
+        if result.valid is False:
+            return False, 0, "verification failed\n" + result.summary(), result
+        return True, result.payload_bytes, result.summary(), result
+    except Exception as e:
+        return False, 0, str(e), None
+
+def list_job(job):
+    try:
+        entries = steganography.list_files(job['stego'])
+        lines = [f"   {entry['name']}: {entry['size']:,} bytes"
+                 + (f" ({entry['codec']}, {entry['stored']:,} stored)" if entry['codec'] != 'none' else "")
+                 for entry in entries]
+        return True, sum(entry['stored'] for entry in entries), "\n".join(lines), None
+    except Exception as e:
+        return False, 0, str(e), None
+
+def analyze_job(job):
+    try:
+        import analysis
+        log = _run_quietly(_analyze_pair, analysis, job['original'], job['stego'], job.get('encoders', False))
+        return True, os.path.getsize(job['original']) + os.path.getsize(job['stego']), log, None
+    except Exception as e:
+        return False, 0, str(e), None
+
+def _analyze_pair(analysis, original, stego, encoders=False):
+    analysis.calculate_psnr(original, stego)
+    print("-" * 30)
+    analysis.compare_file_size(original, stego, encoders)
+
+# ========================== INPUT HANDLING ==========================
+def find_images(inputs):
+    # Expand files and directories into a sorted list of image paths
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            for name in sorted(os.listdir(item)):
+                if name.lower().endswith(IMAGE_EXTS):
+                    paths.append(os.path.join(item, name))
+        else:
+            paths.append(item)
+    return paths
+
+def read_manifest(path, key):
+    # One job per line: a JSON object, or just an input path (the job's
+    # `key`). Every job records its 'line'; a line that can't be parsed
+    # becomes a job with only an 'error', which run_batch reports as failed.
+    jobs = []
+    with open(path, encoding='utf-8') as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            try:
+                job = json.loads(line) if line.startswith('{') else {key: line}
+            except ValueError as e:
+                job = {'error': f"invalid JSON ({e})"}
+            job['line'] = number
+            jobs.append(job)
+    return jobs
+
+def input_jobs(args, key):
+    # The input paths, then the manifest jobs
+    jobs = [{key: path} for path in find_images(args.inputs)]
+    return jobs + (read_manifest(args.manifest, key) if args.manifest else [])
+
+def missing(job, *keys):
+    # Marks a job that lacks one of `keys` as failed, see read_manifest
+    absent = [key for key in keys if key not in job]
+    if absent and 'error' not in job:
+        job['error'] = f"missing {', '.join(map(repr, absent))}"
+    return 'error' in job
+
+def output_name(path, ext=None):
+    # The cover's own extension by default, or .png when that format is lossy
+    # (a JPEG cover): re-encoding would wipe out the hidden bits
+    stem, old_ext = os.path.splitext(os.path.basename(path))
+    return stem + (ext or (old_ext if old_ext.lower() in IMAGE_EXTS else '.png'))
+
+def build_embed_jobs(args):
+    jobs = []
+    for job in input_jobs(args, 'cover'):
+        jobs.append(job)
+        if missing(job, 'cover'):
+            continue
+        job.setdefault('secrets', args.secret)
+        job.setdefault('output', os.path.join(args.out, output_name(job['cover'], args.format)))
+        job.setdefault('streaming', args.streaming)
+        job.setdefault('bits_per_channel', args.bits)
+        job.setdefault('compression', args.compression)
+        job.setdefault('encoder', encoder_setting(args))
+        job.setdefault('channels', args.channels)
+        job.setdefault('checksum', args.checksum)
+        job.setdefault('matrix', args.matrix)
+        if not job['secrets']:
+            job['error'] = "no secret files given (use --secret)"
+        elif not str(job['output']).lower().endswith(IMAGE_EXTS):
+            job['error'] = f"output {job['output']} is not lossless, use one of {', '.join(IMAGE_EXTS)}"
+    return jobs
+
+def reject_oversized(jobs):
+    # Capacity check from image headers and file sizes, before any worker
+    # decodes anything. Returns (jobs that may fit, number rejected).
+    accepted, rejected = [], 0
+    for job in jobs:
+        if 'error' in job:
+            accepted.append(job)
+            continue
+        try:
+            plan = steganography.plan_capacity(job['cover'], job['secrets'], job['bits_per_channel'],
+                                               job['compression'], job['channels'], matrix=job['matrix'],
+                                               fmt=steganography.output_format(job['output']))
+        except Exception:
+            # Unreadable cover or secret: let the job itself report it
+            accepted.append(job)
+            continue
+        if plan['fits']:
+            accepted.append(job)
+        elif plan['exact']:
+            rejected += 1
+            print(f"❌ {job['cover']}: needs {plan['used']:,} bytes, only {plan['capacity']:,} available")
+        else:
+            # Compression may still make it fit
+            accepted.append(job)
+            print(f"⚠️ {job['cover']}: {plan['used']:,} bytes before compression, {plan['capacity']:,} available")
+    return accepted, rejected
+
+def encoder_setting(args):
+    # A profile name, or explicit PNG options when --png-level/--png-strategy are given
+    if args.png_level is None and args.png_strategy is None:
+        return args.encoder
+    options = {}
+    if args.png_level is not None:
+        options['compress_level'] = args.png_level
+    if args.png_strategy is not None:
+        options['compress_type'] = args.png_strategy
+    return options
+
+def build_extract_jobs(args):
+    jobs = []
+    for job in input_jobs(args, 'stego'):
+        jobs.append(job)
+        if missing(job, 'stego'):
+            continue
+        job.setdefault('output', os.path.join(args.out, os.path.splitext(os.path.basename(job['stego']))[0]))
+        if args.file:
+            job.setdefault('files', args.file)
+    return jobs
+
+def build_stego_jobs(args):
+    # verify and list only need the stego image
+    jobs = input_jobs(args, 'stego')
+    for job in jobs:
+        missing(job, 'stego')
+    return jobs
+
+def build_analyze_jobs(args):
+    jobs = []
+    if args.original and args.stego:
+        originals = find_images([args.original])
+        if os.path.isdir(args.stego):
+            # Pair images by file name without extension
+            stegos = {os.path.splitext(os.path.basename(p))[0]: p for p in find_images([args.stego])}
+            for original in originals:
+                key = os.path.splitext(os.path.basename(original))[0]
+                if key in stegos:
+                    jobs.append({'original': original, 'stego': stegos[key]})
+        else:
+            jobs.append({'original': originals[0], 'stego': args.stego})
+    if args.manifest:
+        for job in read_manifest(args.manifest, 'stego'):
+            missing(job, 'original', 'stego')
+            jobs.append(job)
+    if args.encoders:
+        for job in jobs:
+            job.setdefault('encoders', True)
+    return jobs
+
+# ========================== BATCH RUNNER ==========================
+def run_batch(kernel, jobs, workers, label, timings=False):
+    # timings: print the stage breakdown of every job, not just the batch total
+    if not jobs:
+        print("⚠️ Nothing to do.")
+        return 0
+
+    start = time.perf_counter()
+    done = failed = total_bytes = 0
+    # Summed over all jobs, so the slowest stage of the batch stands out
+    stages, stage_seconds = {}, 0.0
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(kernel, job): job for job in jobs if 'error' not in job}
+        # Jobs that failed while being read (see read_manifest) never reach a worker
+        outcomes = [(job, (False, 0, job['error'], None)) for job in jobs if 'error' in job]
+        outcomes = itertools.chain(outcomes, ((futures[future], future.result()) for future in as_completed(futures)))
+        for count, (job, (ok, size, message, result)) in enumerate(outcomes, 1):
+            name = job.get(label)
+            progress = f"[{count}/{len(jobs)}]"
+            if ok:
+                done += 1
+                total_bytes += size
+                took = f" ({result.seconds:.2f} s)" if result else ""
+                print(f"✅ {progress} {name}{took}")
+                if message.strip():
+                    print(message.rstrip())
+                if result:
+                    if timings:
+                        print(result.timing_table())
+                    stage_seconds += result.seconds
+                    for stage, value in result.stages.items():
+                        total = stages.setdefault(stage, {'seconds': 0.0, 'bytes': 0})
+                        total['seconds'] += value['seconds']
+                        total['bytes'] += value['bytes']
+            else:
+                # Keep going: one bad image shouldn't stop the batch
+                failed += 1
+                if 'line' in job:
+                    name = f"{name or 'manifest'} (line {job['line']})"
+                print(f"❌ {progress} {name}: {message}")
+
+    elapsed = time.perf_counter() - start
+    print(f"\n📊 {done}/{len(jobs)} succeeded, {failed} failed in {elapsed:.2f} s")
+    print(f"⚡ {done / elapsed:.2f} images/s, {total_bytes / elapsed / 1e6:.2f} MB/s")
+    if stages:
+        print("⏱️ Time by stage (all jobs, worker time):")
+        print("\n".join(steganography.format_stages(stages, stage_seconds)))
+    return 1 if failed else 0
+
+def run_sharded(args):
+    # One payload set spread over all the given images (--shard / --shards)
+    start = time.perf_counter()
+    images = find_images(args.inputs)
+    if args.command == "embed":
+        if not args.secret:
+            raise SystemExit("❌ No secret files given (use --secret).")
+        if args.matrix:
+            raise SystemExit("❌ --matrix can't be combined with --shard.")
+        os.makedirs(args.out, exist_ok=True)
+        outputs = [os.path.join(args.out, output_name(cover, args.format)) for cover in images]
+        results = steganography.embed_sharded(images, args.secret, outputs, args.workers, args.streaming, args.bits,
+                                              args.compression, encoder_setting(args), args.channels, args.checksum)
+        for index, result in enumerate(results):
+            print(f"✅ Shard {index + 1}/{len(results)}: {result.output} "
+                  f"({sum(f['size'] for f in result.files[1:]):,} bytes, {result.seconds:.2f} s)")
+        size = sum(os.path.getsize(path) for path in args.secret)
+    else:
+        result = steganography.extract_sharded(images, args.out, args.workers)
+        print(result.summary())
+        if args.timings:
+            print(result.timing_table())
+        size = result.payload_bytes
+
+    elapsed = time.perf_counter() - start
+    print(f"\n📊 {len(images)} shards in {elapsed:.2f} s, {size / elapsed / 1e6:.2f} MB/s")
+    return 0
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="stegopro", description="LSB steganography batch tool")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument("--threads", type=int,
+                        help="threads per worker for the bit operations (default: CPUs / workers)")
+    parser.add_argument("--timings", action="store_true", help="print the time by stage of every job")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    embed = sub.add_parser("embed", help="hide secret files in a batch of cover images")
+    embed.add_argument("inputs", nargs="*", help="cover images or directories of covers")
+    embed.add_argument("--secret", action="append", default=[], help="secret file to hide (repeatable)")
+    embed.add_argument("--out", default=".", help="output directory")
+    embed.add_argument("--format", choices=IMAGE_EXTS, help="output extension (default: same as cover, .png for lossy covers)")
+    embed.add_argument("--bits", type=int, default=1, help="bits per channel (1-4)")
+    embed.add_argument("--channels", help="bands that carry the data, e.g. RGBA or G (default: all but alpha)")
+    embed.add_argument("--checksum", choices=steganography.CHECKSUMS, default="crc32",
+                       help="per-file checksums to store ('blake2' adds BLAKE2b to the CRC32)")
+    embed.add_argument("--matrix", action="store_true",
+                       help="matrix embedding: far fewer changed pixels for the same payload (1 bit per channel)")
+    embed.add_argument("--compression", choices=steganography.COMPRESSION_MODES, default="none",
+                       help="payload compression ('auto' picks per file from sampled entropy)")
+    embed.add_argument("--streaming", action="store_true", help="bounded-memory embed for very large covers")
+    embed.add_argument("--encoder", choices=list(steganography.ENCODERS), default="default",
+                       help="output encoding profile ('source' reuses the cover's settings)")
+    embed.add_argument("--png-level", type=int, choices=range(10), metavar="0-9",
+                       help="explicit PNG compress level (overrides --encoder)")
+    embed.add_argument("--png-strategy", choices=list(steganography.PNG_STRATEGIES),
+                       help="explicit PNG zlib strategy (overrides --encoder)")
+    embed.add_argument("--manifest", help="JSON Lines file: {\"cover\", \"secrets\", \"output\"} per line")
+    embed.add_argument("--shard", action="store_true",
+                       help="split the secrets across all the covers instead of copying them into each")
+
+    extract = sub.add_parser("extract", help="recover hidden files from a batch of stego images")
+    extract.add_argument("inputs", nargs="*", help="stego images or directories of stego images")
+    extract.add_argument("--out", default=".", help="output directory (one folder per image)")
+    extract.add_argument("--manifest", help="JSON Lines file: {\"stego\", \"output\"} per line")
+    extract.add_argument("--shards", action="store_true",
+                         help="the inputs are the shards of one payload set: reassemble it into --out")
+    extract.add_argument("--file", action="append", default=[],
+                         help="only extract the hidden file with this name (repeatable, see 'list')")
+
+    list_ = sub.add_parser("list", help="list the hidden files of stego images without extracting them")
+    list_.add_argument("inputs", nargs="*", help="stego images or directories of stego images")
+    list_.add_argument("--manifest", help="JSON Lines file: {\"stego\"} per line")
+
+    verify = sub.add_parser("verify", help="check the checksums of stego images without extracting anything")
+    verify.add_argument("inputs", nargs="*", help="stego images or directories of stego images")
+    verify.add_argument("--manifest", help="JSON Lines file: {\"stego\"} per line")
+
+    analyze = sub.add_parser("analyze", help="PSNR and file size for original/stego pairs")
+    analyze.add_argument("original", nargs="?", help="original image or directory")
+    analyze.add_argument("stego", nargs="?", help="stego image or directory (paired by file name)")
+    analyze.add_argument("--manifest", help="JSON Lines file: {\"original\", \"stego\"} per line")
+    analyze.add_argument("--encoders", action="store_true", help="also time every output encoder profile")
+
+    scan = sub.add_parser("scan", help="run the LSB detectors over a directory")
+    scan.add_argument("directory", help="directory of images to audit")
+    scan.add_argument("--format", choices=("csv", "jsonl"), default="csv", help="output format")
+    scan.add_argument("--output", help="output file (default: stdout)")
+
+    serve = sub.add_parser("serve", help="run the HTTP job server (uses --workers)")
+    serve.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    serve.add_argument("--port", type=int, default=8765, help="port to listen on (0 picks a free one)")
+    serve.add_argument("--queue", type=int, default=64, help="jobs that may wait before new ones are refused")
+
+    return parser
+
+def set_threads(threads, workers):
+    # Every worker process gets its share of the CPUs for the band-parallel
+    # bit kernels, so workers x threads doesn't oversubscribe the machine.
+    # Forked workers see the module setting, spawned ones the environment.
+    threads = threads or max(1, (os.cpu_count() or 1) // max(1, workers or 1))
+    os.environ['STEGOPRO_THREADS'] = str(threads)
+    steganography.THREADS = threads
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    set_threads(args.threads, args.workers)
+
+    if getattr(args, 'shard', False) or getattr(args, 'shards', False):
+        return run_sharded(args)
+    if args.command == "embed":
+        os.makedirs(args.out, exist_ok=True)
+        jobs, rejected = reject_oversized(build_embed_jobs(args))
+        status = run_batch(embed_job, jobs, args.workers, 'cover', args.timings)
+        return 1 if rejected else status
+    if args.command == "extract":
+        return run_batch(extract_job, build_extract_jobs(args), args.workers, 'stego', args.timings)
+    if args.command == "verify":
+        return run_batch(verify_job, build_stego_jobs(args), args.workers, 'stego', args.timings)
+    if args.command == "list":
+        return run_batch(list_job, build_stego_jobs(args), args.workers, 'stego', args.timings)
+    if args.command == "scan":
+        import analysis
+        start = time.perf_counter()
+        count = analysis.scan_directory(args.directory, args.output, args.format, args.workers)
+        elapsed = time.perf_counter() - start
+        print(f"📊 Scanned {count} images in {elapsed:.2f} s ({count / elapsed:.2f} images/s)", file=sys.stderr)
+        return 0
+    if args.command == "serve":
+        import server
+        return server.main(["--host", args.host, "--port", str(args.port), "--workers", str(args.workers),
+                            "--threads", str(steganography.THREADS), "--queue", str(args.queue)])
+    return run_batch(analyze_job, build_analyze_jobs(args), args.workers, 'stego')
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
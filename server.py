@@ -0,0 +1,372 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import sys
+import time
+import uuid
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import steganography
+
+# StegoPro as a shared service: a small HTTP/JSON front-end (stdlib asyncio
+# only) in front of a process pool.
+#   python server.py --port 8765 --workers 4 --threads 2 --queue 64
+#
+#   POST   /jobs        {"op": "embed", "cover": ..., "secrets": [...], "output": ...}
+#                       {"op": "extract", "stego": ..., "output_dir": ..., "files": [...]}
+#                       {"op": "verify", "stego": ...}
+#                       {"op": "list", "stego": ...}
+#                       {"op": "analyze", "stego": ..., "original": ..., "detect": true}
+#                       -> 202 {"id": ..., "status": "queued"}
+#                       -> 503 with Retry-After when the queue is full
+#   GET    /jobs/<id>   status, result or error, and timings
+#   DELETE /jobs/<id>   cancel a queued job (409 once it is running)
+#   GET    /metrics     queue depth, job counts, wait/run latency percentiles
+#   GET    /health      "ok", or "restarting" while a crashed worker pool is replaced
+#
+# Paths in a job are paths on the server. At most `workers` jobs run at a
+# time, each using `threads` threads for the bit operations; up to `queue` more wait, and anything beyond that is refused, so a
+# burst of clients gets pushed back instead of piling up memory.
+
+MAX_BODY = 1024 * 1024
+HISTORY = 1000          # finished jobs kept for polling
+LATENCY_SAMPLES = 1000  # recent jobs the latency metrics are computed from
+
+# ========================== JOB KERNELS ==========================
+# Run inside the worker processes, so they stay at module level.
+# Each takes the job's JSON parameters and returns a JSON-able dict.
+
+def _stego_result(result):
+    return {'output': result.output, 'files': result.files, 'seconds': result.seconds, 'stages': result.stages}
+
+def embed_task(params):
+    result = steganography.embed_multiple_files(
+        params['cover'], params['secrets'], params['output'],
+        streaming=params.get('streaming', False),
+        bits_per_channel=params.get('bits_per_channel', 1),
+        compression=params.get('compression', 'none'),
+        encoder=params.get('encoder', 'default'),
+        channels=params.get('channels'),
+        checksum=params.get('checksum', 'crc32'),
+        matrix=params.get('matrix', False))
+    return _stego_result(result)
+
+def extract_task(params):
+    return _stego_result(steganography.extract_multiple_files(params['stego'], params['output_dir'],
+                                                              names=params.get('files')))
+
+def verify_task(params):
+    result = steganography.verify(params['stego'])
+    return dict(_stego_result(result), valid=result.valid)
+
+def list_task(params):
+    return {'files': steganography.list_files(params['stego'])}
+
+def analyze_task(params):
+    # Pair statistics when an original is given; LSB detectors on the stego
+    # image when asked for, or when there is nothing to compare against
+    import analysis
+    result = {}
+    if params.get('original'):
+        report = analysis.analyze(params['original'], params['stego'])
+        result.update(psnr=report.psnr, mse=report.mse, changed_pixels=report.changed_pixels,
+                      original_size=report.original_size, stego_size=report.stego_size,
+                      size_difference=report.size_difference)
+    if params.get('detect', not params.get('original')):
+        result.update({key: float(value) for key, value in analysis.detect_lsb(params['stego']).items()})
+    # Undefined rates (NaN) go out as null
+    return analysis.json_row(result)
+
+def _warm_up():
+    # No-op run once per worker at startup, see JobServer.start
+    return os.getpid()
+
+TASKS = {'embed': embed_task, 'extract': extract_task, 'verify': verify_task, 'list': list_task,
+         'analyze': analyze_task}
+REQUIRED = {'embed': ('cover', 'secrets', 'output'), 'extract': ('stego', 'output_dir'), 'verify': ('stego',),
+            'list': ('stego',), 'analyze': ('stego',)}
+
+class HTTPError(Exception):
+    def __init__(self, status, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+REASONS = {200: 'OK', 202: 'Accepted', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           409: 'Conflict', 413: 'Payload Too Large', 500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+def _percentiles(samples):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    return {'count': len(ordered), 'mean': sum(ordered) / len(ordered), 'p50': pick(0.5), 'p95': pick(0.95),
+            'max': ordered[-1]}
+
+# ========================== SERVER ==========================
+class JobServer:
+    def __init__(self, host='127.0.0.1', port=8765, workers=None, queue_size=64, threads=None):
+        self.host = host
+        self.port = port
+        self.workers = workers or os.cpu_count()
+        self.threads = threads or max(1, (os.cpu_count() or 1) // self.workers)
+        self.queue_size = queue_size
+        self.jobs = {}
+        self.finished = deque()
+        self.wait_times = deque(maxlen=LATENCY_SAMPLES)
+        self.run_times = deque(maxlen=LATENCY_SAMPLES)
+        self.rejected = 0
+        self.queued = 0
+        self.running = 0
+        self.pool_restarts = 0
+        self.started = time.time()
+        self.server = None
+
+    async def start(self):
+        # The queue and pool live on the running loop. The queue itself is
+        # unbounded: cancelled jobs stay in it until a dispatcher skips them,
+        # so the limit is on self.queued, the jobs still waiting
+        self.queue = asyncio.Queue()
+        # Seen by forked workers through the module, by spawned ones through the environment
+        os.environ['STEGOPRO_THREADS'] = str(self.threads)
+        steganography.THREADS = self.threads
+        # The pool only forks its workers when work first arrives. Make that
+        # happen now, before any socket is open: a worker forked later would
+        # inherit the listening socket and the client connection of the
+        # moment, and that client would never see EOF.
+        self.pool = await self._new_pool()
+        self.pool_ready = asyncio.Event()
+        self.pool_ready.set()
+        self.dispatchers = [asyncio.create_task(self._dispatch()) for _ in range(self.workers)]
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+        # Port 0 picks a free port; report the real one
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def _new_pool(self, context=None):
+        pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(pool, _warm_up) for _ in range(self.workers)))
+        return pool
+
+    async def _restart_pool(self, broken):
+        # A worker died (killed, out of memory...) and took the pool with it:
+        # every later submit would fail too. Only the first dispatcher to see
+        # it replaces the pool, the others wait for the new one.
+        if self.pool is not broken or not self.pool_ready.is_set():
+            return
+        self.pool_ready.clear()
+        try:
+            broken.shutdown(wait=False, cancel_futures=True)
+            # Same warm-up as in start, but the socket is open by now: forked
+            # workers would inherit it and every open connection, so these
+            # start from a fresh interpreter instead
+            self.pool = await self._new_pool(multiprocessing.get_context('spawn'))
+            self.pool_restarts += 1
+        finally:
+            self.pool_ready.set()
+
+    async def close(self):
+        self.server.close()
+        await self.server.wait_closed()
+        for task in self.dispatchers:
+            task.cancel()
+        await asyncio.gather(*self.dispatchers, return_exceptions=True)
+        self.pool.shutdown(cancel_futures=True)
+
+    async def serve_forever(self):
+        async with self.server:
+            await self.server.serve_forever()
+
+    # --- jobs ---
+    def submit(self, params):
+        op = params.get('op')
+        if op not in TASKS:
+            raise HTTPError(400, f"Unknown op {op!r}, use one of {', '.join(TASKS)}.")
+        missing = [key for key in REQUIRED[op] if key not in params]
+        if missing:
+            raise HTTPError(400, f"Missing field(s) for {op}: {', '.join(missing)}.")
+
+        job = {'id': uuid.uuid4().hex[:12], 'op': op, 'status': 'queued', 'params': params,
+               'submitted': time.time(), 'started': None, 'finished': None, 'result': None, 'error': None}
+        if self.queue_size and self.queued >= self.queue_size:
+            # Backpressure: tell the client to come back instead of queueing without limit
+            self.rejected += 1
+            raise HTTPError(503, "Queue is full, retry later.", {'Retry-After': '1'})
+        self.queue.put_nowait(job)
+        self.queued += 1
+        self.jobs[job['id']] = job
+        return job
+
+    def cancel(self, job_id):
+        job = self._job(job_id)
+        if job['status'] == 'queued':
+            # Still in the queue: the dispatcher skips it when it comes up,
+            # but it stops taking up room now
+            job['status'] = 'cancelled'
+            self.queued -= 1
+            self._finish(job)
+        elif job['status'] == 'running':
+            raise HTTPError(409, "Job is already running and can't be cancelled.")
+        return job
+
+    async def _dispatch(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self.queue.get()
+            try:
+                # Jobs wait in the queue while a crashed pool is replaced
+                await self.pool_ready.wait()
+                if job['status'] != 'queued':
+                    continue
+                job['status'] = 'running'
+                job['started'] = time.time()
+                self.queued -= 1
+                self.running += 1
+                self.wait_times.append(job['started'] - job['submitted'])
+                pool = self.pool
+                try:
+                    job['result'] = await loop.run_in_executor(pool, TASKS[job['op']], job['params'])
+                    job['status'] = 'done'
+                except BrokenProcessPool:
+                    job['error'] = "A worker process died while running this job; the pool is being restarted."
+                    job['status'] = 'failed'
+                    await self._restart_pool(pool)
+                except Exception as e:
+                    job['error'] = str(e)
+                    job['status'] = 'failed'
+                finally:
+                    self.running -= 1
+                    self.run_times.append(time.time() - job['started'])
+                    self._finish(job)
+            finally:
+                self.queue.task_done()
+
+    def _finish(self, job):
+        job['finished'] = time.time()
+        self.finished.append(job['id'])
+        while len(self.finished) > HISTORY:
+            self.jobs.pop(self.finished.popleft(), None)
+
+    def _job(self, job_id):
+        if job_id not in self.jobs:
+            raise HTTPError(404, f"No job {job_id}.")
+        return self.jobs[job_id]
+
+    def metrics(self):
+        return {
+            'queue_depth': self.queued,
+            'queue_capacity': self.queue_size,
+            'running': self.running,
+            'workers': self.workers,
+            'threads': self.threads,
+            'rejected': self.rejected,
+            'jobs': dict(Counter(job['status'] for job in self.jobs.values())),
+            'latency': {
+                'queue_wait': _percentiles(self.wait_times),
+                'run': _percentiles(self.run_times),
+            },
+            'uptime': time.time() - self.started,
+        }
+
+    @staticmethod
+    def _public(job):
+        return {key: value for key, value in job.items() if key != 'params'}
+
+    # --- HTTP ---
+    async def _handle(self, reader, writer):
+        # One request per connection, answered with Connection: close
+        headers = {}
+        try:
+            try:
+                method, path, body = await self._read_request(reader)
+                status, payload = self._route(method, path, body)
+            except HTTPError as e:
+                status, payload, headers = e.status, {'error': str(e)}, e.headers
+            except Exception as e:
+                status, payload = 500, {'error': str(e)}
+            data = json.dumps(payload).encode('utf-8')
+            head = [f"HTTP/1.1 {status} {REASONS.get(status, '')}", "Content-Type: application/json",
+                    f"Content-Length: {len(data)}", "Connection: close"]
+            head += [f"{key}: {value}" for key, value in headers.items()]
+            writer.write(("\r\n".join(head) + "\r\n\r\n").encode('latin-1') + data)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader):
+        request_line = (await reader.readline()).decode('latin-1').split()
+        if len(request_line) != 3:
+            raise HTTPError(400, "Malformed request line.")
+        method, path, _ = request_line
+        length = 0
+        while True:
+            line = (await reader.readline()).decode('latin-1').strip()
+            if not line:
+                break
+            name, _, value = line.partition(':')
+            if name.strip().lower() == 'content-length':
+                value = value.strip()
+                # Digits only: int() would also take signs, underscores and spaces
+                if not (value.isascii() and value.isdigit()):
+                    raise HTTPError(400, "Invalid Content-Length.")
+                length = int(value)
+        if length > MAX_BODY:
+            raise HTTPError(413, "Request body too large.")
+        body = await reader.readexactly(length) if length else b''
+        return method, path.split('?', 1)[0], body
+
+    def _route(self, method, path, body):
+        parts = [part for part in path.split('/') if part]
+        if parts == ['jobs'] and method == 'POST':
+            try:
+                params = json.loads(body or b'{}')
+            except ValueError:
+                raise HTTPError(400, "Body must be a JSON object.")
+            if not isinstance(params, dict):
+                raise HTTPError(400, "Body must be a JSON object.")
+            return 202, self._public(self.submit(params))
+        if len(parts) == 2 and parts[0] == 'jobs':
+            if method == 'GET':
+                return 200, self._public(self._job(parts[1]))
+            if method == 'DELETE':
+                return 200, self._public(self.cancel(parts[1]))
+            raise HTTPError(405, f"{method} not allowed here.")
+        if parts == ['metrics'] and method == 'GET':
+            return 200, self.metrics()
+        if parts == ['health'] and method == 'GET':
+            return 200, {'status': 'ok' if self.pool_ready.is_set() else 'restarting',
+                         'pool_restarts': self.pool_restarts}
+        raise HTTPError(404, f"No route for {method} {path}.")
+
+async def serve(host='127.0.0.1', port=8765, workers=None, queue_size=64, threads=None):
+    server = await JobServer(host, port, workers, queue_size, threads).start()
+    print(f"🚀 StegoPro server on http://{server.host}:{server.port} "
+          f"({server.workers} workers x {server.threads} threads, queue of {server.queue_size})")
+    try:
+        await server.serve_forever()
+    finally:
+        await server.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="StegoPro job server")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser.add_argument("--port", type=int, default=8765, help="port to listen on (0 picks a free one)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("--threads", type=int, help="threads per worker (default: CPUs / workers)")
+    parser.add_argument("--queue", type=int, default=64, help="jobs that may wait before new ones are refused")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, args.queue, args.threads))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,82 +1,1724 @@
 import numpy as np
-from PIL import Image
+from PIL import Image, ImageMode, ImageSequence, TiffImagePlugin
+import bisect
+import bz2
+import contextlib
+import hashlib
+import io
+import json
+import lzma
+import mmap
 import os
+import shutil
+import struct
+import threading
+import time
+import uuid
+import zlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
-def embed_multiple_files(cover_path, secret_paths, output_path):
-    # Load image and convert to numpy array (Fast Matrix)
-    img = Image.open(cover_path).convert("RGB")
-    arr = np.array(img)
-    
-    # Flatten the array to a long line of numbers (R, G, B, R, G, B...)
-    flat_arr = arr.flatten()
-    
-    # Prepare all secret data as bytes first
-    payload_bytes = bytearray()
-    for secret_path in secret_paths:
-        # Read file
-        with open(secret_path, 'rb') as f:
-            secret_data = f.read()
-        
-        # Prepare Extension (8 bytes, padded with #)
-        ext = os.path.splitext(secret_path)[1].encode()
-        # If no extension, default to .txt or empty
-        if not ext: ext = b'.txt'
-        ext = ext.ljust(8, b'#')
-        
-        # Add to payload: [EXT] + [DATA] + [DELIMITER]
-        payload_bytes.extend(ext)
-        payload_bytes.extend(secret_data)
-        payload_bytes.extend(b'####')
-
-    # Convert the payload bytes directly to bits using NumPy
-    # (Much faster than formatting strings "010101")
-    payload_arr = np.frombuffer(payload_bytes, dtype=np.uint8)
-    payload_bits = np.unpackbits(payload_arr)
-    
-    # Check if image is big enough
-    if len(payload_bits) > len(flat_arr):
-        raise ValueError(f"❌ Not enough space! Need {len(payload_bits)} pixels, but image only has {len(flat_arr)}.")
-
-    # Embed bits:
-    # 1. Clear the LSB of the image pixels (bitwise AND with ~1)
+# Container format
+# ----------------
+# Pixels are used in the image's own mode and bit depth (see NATIVE_MODES).
+# Signature, always 1 bit per channel in every channel but alpha, so it can
+# be read before anything else is known:
+#   [MAGIC 4][VERSION 1][BITS PER CHANNEL 1][CHANNEL MASK 1][MODE 8][CODE 1]
+# CHANNEL MASK has bit i set if band i of MODE carries the body. CODE is 0,
+# or p for Hamming matrix embedding (see MATRIX EMBEDDING).
+# Body, BITS PER CHANNEL bits in every masked channel (or p bits per block
+# of 2^p - 1 of them), from the first whole pixel after the signature:
+#   [FILE COUNT 2][CHECKSUM 1][FRAME COUNT 2][FRAME START 8 x FRAME COUNT]
+#   then for each file: [NAME LEN 2][NAME][CODEC 1][DATA LEN 8][STORED LEN 8]
+#                       [CRC32 4][BLAKE2 32, only if CHECKSUM is blake2]
+#   [CONTAINER CRC32 4]
+#   zero padding so the header fills a whole number of channels (blocks)
+#   then the stored (possibly compressed) data of every file, back to back.
+# Because every length is known up front, the extractor only has to decode
+# the bits that actually belong to the stream instead of scanning the image.
+# The CRC32 (and BLAKE2b) of a file is over its original data. The container
+# CRC32 is over the stored data of every file followed by the header up to
+# the container CRC itself, so a damaged header is caught too.
+# A multi-frame TIFF carries one body across all of its frames (see
+# MULTI-FRAME): the signature and header are in the last frame, and the data
+# runs from the first sample of frame 0 through every frame in order, ending
+# after the header in the last one. FRAME START i is where in the data
+# (bytes after the header) frame i begins. A single image is one frame that
+# starts at 0.
+# Only containers of FORMAT_VERSION are read. Images from before the
+# container, which end every file with a `####` delimiter, are still
+# extracted (see _legacy_files), but carry no checksums.
+MAGIC = b'STGP'
+FORMAT_VERSION = 7
+
+SIGNATURE = struct.Struct('>4sB')   # magic, version
+LAYOUT = struct.Struct('>B')        # bits per channel
+CARRIER = struct.Struct('>B8s')     # channel mask, mode
+CODE = struct.Struct('>B')          # matrix embedding p, 0 for plain LSB
+COUNT = struct.Struct('>H')         # file count
+ENTRY = struct.Struct('>H')         # name length (name follows)
+ENTRY_DATA = struct.Struct('>BQQ')  # codec, data length, stored length
+CHECKSUM = struct.Struct('>B')      # checksum kind
+CRC = struct.Struct('>I')           # CRC32 of a file / of the container
+FRAME_COUNT = struct.Struct('>H')   # frames the body spans
+FRAME_START = struct.Struct('>Q')   # data offset where a frame begins
+
+# Checksums written by the embedder. The position is the id stored in the
+# header; every kind includes CRC32.
+CHECKSUMS = ['crc32', 'blake2']
+BLAKE2_SIZE = 32
+
+MAX_BITS_PER_CHANNEL = 4
+
+# Payload compression. The position in CODECS is the id stored in the header.
+CODECS = ['none', 'zlib', 'bz2', 'lzma']
+COMPRESSION_MODES = CODECS + ['auto']
+
+# 'auto' never compresses these, they are compressed already
+COMPRESSED_EXTS = {
+    '.png', '.jpg', '.jpeg', '.gif', '.webp', '.zip', '.gz', '.bz2', '.xz',
+    '.7z', '.rar', '.docx', '.xlsx', '.pptx', '.odt', '.ods', '.mp3', '.mp4',
+    '.mkv', '.mov', '.avi',
+}
+# 'auto' samples a few blocks of every other file and compresses it if the
+# byte entropy is below this many bits per byte
+ENTROPY_LIMIT = 7.5
+ENTROPY_SAMPLES = 4
+ENTROPY_SAMPLE_SIZE = 64 * 1024
+
+# Modes embedded in as they are. 16-bit grayscale keeps its full depth;
+# 16-bit colour covers are refused (see _cover_mode) and any other mode is
+# converted once to the nearest of these.
+NATIVE_MODES = ('RGB', 'RGBA', 'L', 'LA', 'I;16', 'I;16L', 'I;16B')
+
+def _build_header(entries, bits_per_channel, mode='RGB', channel_mask=0b111, checksum='crc32', data_crc=0,
+                  frame_starts=(0,), code=0):
+    # entries: list of dicts with name, codec, size, stored, and once the
+    # data has been read, crc (and blake2 as hex). data_crc is the CRC32 of
+    # all the stored data. frame_starts: data offset of every frame.
+    # code: matrix embedding p, or 0.
+    # Returns (signature, body header)
+    signature = (SIGNATURE.pack(MAGIC, FORMAT_VERSION) + LAYOUT.pack(bits_per_channel)
+                 + CARRIER.pack(channel_mask, mode.encode('ascii')) + CODE.pack(code))
+    header = bytearray(COUNT.pack(len(entries)) + CHECKSUM.pack(CHECKSUMS.index(checksum)))
+    header.extend(FRAME_COUNT.pack(len(frame_starts)))
+    for start in frame_starts:
+        header.extend(FRAME_START.pack(start))
+    for entry in entries:
+        name_bytes = entry['name'].encode('utf-8')
+        header.extend(ENTRY.pack(len(name_bytes)))
+        header.extend(name_bytes)
+        header.extend(ENTRY_DATA.pack(CODECS.index(entry['codec']), entry['size'], entry['stored']))
+        header.extend(CRC.pack(entry.get('crc', 0)))
+        if checksum == 'blake2':
+            header.extend(bytes.fromhex(entry['blake2']) if 'blake2' in entry else bytes(BLAKE2_SIZE))
+    header.extend(CRC.pack(zlib.crc32(header, data_crc)))
+    # Pad so the data starts on a channel boundary (only matters for k=3),
+    # or on a block boundary with matrix embedding
+    header.extend(bytes(-len(header) % (code or bits_per_channel)))
+    return signature, header
+
+# Streaming mode works on this many bytes of pixel data at a time
+CHUNK_SIZE = 4 * 1024 * 1024
+
+# Uncompressed layouts we can patch directly on disk:
+# raw mode -> (sample type, samples per pixel, slice that picks the bands
+# out of a pixel in mode order)
+RAW_LAYOUTS = {
+    'RGB': (np.uint8, 3, slice(0, 3)),
+    'BGR': (np.uint8, 3, slice(2, None, -1)),
+    'RGBX': (np.uint8, 4, slice(0, 3)),
+    'BGRX': (np.uint8, 4, slice(2, None, -1)),
+    'RGBA': (np.uint8, 4, slice(0, 4)),
+    'L': (np.uint8, 1, slice(0, 1)),
+    'LA': (np.uint8, 2, slice(0, 2)),
+    'I;16': ('<u2', 1, slice(0, 1)),
+    'I;16B': ('>u2', 1, slice(0, 1)),
+}
+
+# ========================== IMAGE SOURCES ==========================
+# Covers and stego images can be a file path, encoded image bytes, a binary
+# file object, or a NumPy array of pixels ((height, width, 3) for RGB,
+# (height, width) uint16 for 16-bit grayscale, ...).
+# Outputs are a file path or a binary file object.
+
+def _as_source(image):
+    if isinstance(image, (bytes, bytearray, memoryview)):
+        return io.BytesIO(image)
+    return image
+
+def _is_path(source):
+    return isinstance(source, (str, os.PathLike))
+
+def _open_image(source):
+    # A PIL image for any source; encoded data is only decoded on load()
+    if isinstance(source, np.ndarray):
+        return Image.fromarray(source)
+    if hasattr(source, 'seek'):
+        source.seek(0)
+    return Image.open(source)
+
+def _is_rgb_array(source):
+    return (isinstance(source, np.ndarray) and source.dtype == np.uint8 and source.ndim == 3
+            and source.shape[2] == 3)
+
+def _array_mode(arr):
+    # The PIL mode of a pixel array, without converting the whole array
+    return Image.fromarray(np.ascontiguousarray(arr[:1, :1])).mode
+
+def _is_native_array(source):
+    return isinstance(source, np.ndarray) and source.ndim in (2, 3) and _array_mode(source) in NATIVE_MODES
+
+def _native_mode(img):
+    # The mode we embed in for an (unloaded) image; nothing is decoded
+    if img.mode in NATIVE_MODES:
+        return img.mode
+    if img.mode == '1':
+        return 'L'
+    return 'RGBA' if img.has_transparency_data else 'RGB'
+
+def _cover_mode(img):
+    # _native_mode for a cover. Pillow decodes 16-bit RGB, RGBA and LA files
+    # to 8 bits per channel, so embedding would silently halve their depth:
+    # refuse them, the rawmode of the first tile tells them apart
+    tile = getattr(img, 'tile', None)
+    args = tile[0][3] if tile else None
+    base, _, depth = (args[0] if isinstance(args, tuple) else args or '').partition(';')
+    if depth.startswith('16') and base in ('RGB', 'RGBA', 'RGBX', 'RGBa', 'LA', 'La'):
+        raise ValueError(f"❌ 16-bit {img.mode} images can't keep their depth (only 16-bit grayscale can). "
+                         "Convert the cover to 8 bits per channel first.")
+    return _native_mode(img)
+
+def _native(img):
+    return img if img.mode in NATIVE_MODES else img.convert(_native_mode(img))
+
+def _bands(pixels):
+    # Pixel array -> (height, width, bands) view
+    return pixels.reshape(pixels.shape[0], pixels.shape[1], -1)
+
+def _carriers(mode, channels=None):
+    # Band indexes of `mode` that carry (signature, body).
+    # channels: band names of the body, e.g. 'RGBA' or 'A' (default: all
+    # bands but alpha, same as the signature)
+    bands = ImageMode.getmode(mode).bands
+    signature = [i for i, band in enumerate(bands) if band != 'A']
+    if channels is None:
+        return signature, signature
+    unknown = set(channels) - set(bands)
+    if unknown or not channels:
+        raise ValueError(f"❌ Channels must be taken from {''.join(bands)} for a {mode} image.")
+    return signature, [i for i, band in enumerate(bands) if band in channels]
+
+def _body_start(signature_len, signature_channels, body_channels):
+    # First body sample: the signature fills whole pixels, the body starts
+    # at the next one
+    return -(-signature_len * 8 // len(signature_channels)) * len(body_channels)
+
+def _encoded_size(source):
+    # Bytes of image data, for the stage byte counts
+    if _is_path(source):
+        return os.path.getsize(source)
+    if isinstance(source, np.ndarray):
+        return source.nbytes
+    return source.seek(0, os.SEEK_END)
+
+# ========================== OUTPUT ENCODING ==========================
+# Profiles for writing the stego image: PIL save options per output format.
+# Re-encoding a large PNG is usually the slowest part of an embed, so the
+# profile is the throughput/size knob:
+#   default       PIL's defaults (PNG zlib level 6)
+#   fastest       PNG level 1 with the RLE strategy, TIFF uncompressed
+#   smallest      PNG level 9, TIFF deflate
+#   uncompressed  PNG level 0 (stored), TIFF uncompressed
+#   source        whatever the cover itself was written with
+# A dict of save options can be given instead of a profile name, e.g.
+# {'compress_level': 3, 'compress_type': 'filtered'}.
+# Uncompressed BMP/TIFF covers written to the same format skip decoding and
+# encoding altogether: the file is copied and only the touched rows are
+# patched on disk (see _embed_raw).
+ENCODERS = {
+    'default': {},
+    'fastest': {'PNG': {'compress_level': 1, 'compress_type': zlib.Z_RLE}, 'TIFF': {'compression': 'raw'}},
+    'smallest': {'PNG': {'compress_level': 9}, 'TIFF': {'compression': 'tiff_adobe_deflate'}},
+    'uncompressed': {'PNG': {'compress_level': 0}, 'TIFF': {'compression': 'raw'}},
+    'source': None,
+}
+
+# PNG compress_type: the zlib strategy. Pillow picks the row filters itself.
+PNG_STRATEGIES = {
+    'default': zlib.Z_DEFAULT_STRATEGY,
+    'filtered': zlib.Z_FILTERED,
+    'huffman': zlib.Z_HUFFMAN_ONLY,
+    'rle': zlib.Z_RLE,
+    'fixed': zlib.Z_FIXED,
+}
+
+# The 2-bit FLEVEL of a zlib stream header -> a compress_level that gives it back
+_ZLIB_LEVELS = {0: 1, 1: 3, 2: 6, 3: 9}
+
+def output_format(path):
+    # PIL format name for an output path, from its extension
+    ext = os.path.splitext(path)[1].lower()
+    fmt = Image.registered_extensions().get(ext)
+    if fmt is None:
+        raise ValueError(f"❌ Unknown output format '{ext}'.")
+    return fmt
+
+def encoder_options(encoder, cover, fmt):
+    # PIL save options for writing `fmt` with the given profile or dict.
+    # `cover` is the (open) cover image, needed for 'source'.
+    if isinstance(encoder, dict):
+        options = dict(encoder)
+    elif encoder not in ENCODERS:
+        raise ValueError(f"❌ Unknown encoder '{encoder}', use one of {', '.join(ENCODERS)} or a dict.")
+    elif encoder == 'source':
+        options = _source_options(cover, fmt)
+    else:
+        options = dict(ENCODERS[encoder].get(fmt, {}))
+
+    strategy = options.get('compress_type')
+    if isinstance(strategy, str):
+        if strategy not in PNG_STRATEGIES:
+            raise ValueError(f"❌ Unknown PNG strategy '{strategy}', use one of {', '.join(PNG_STRATEGIES)}.")
+        options['compress_type'] = PNG_STRATEGIES[strategy]
+    return options
+
+def _source_options(cover, fmt):
+    # Carry over the metadata PIL knows about, and the compression when the
+    # cover is in the output format already
+    options = {key: cover.info[key] for key in ('dpi', 'icc_profile') if key in cover.info}
+    if cover.format != fmt:
+        return options
+    if fmt == 'TIFF' and cover.info.get('compression'):
+        options['compression'] = cover.info['compression']
+    elif fmt == 'PNG' and cover.tile and cover.tile[0][0] == 'zip':
+        # PIL doesn't keep the level, but the zlib header of the first IDAT
+        # chunk records roughly which one was used
+        header = _read_encoded(cover, cover.tile[0][2], 2)
+        if len(header) == 2:
+            options['compress_level'] = _ZLIB_LEVELS[header[1] >> 6]
+    return options
+
+def _read_encoded(img, offset, length):
+    # Raw bytes of the file an (unloaded) image was opened from
+    if img.fp is not None and not getattr(img.fp, 'closed', False):
+        position = img.fp.tell()
+        img.fp.seek(offset)
+        data = img.fp.read(length)
+        img.fp.seek(position)
+        return data
+    with open(img.filename, 'rb') as f:
+        f.seek(offset)
+        return f.read(length)
+
+def _is_uncompressed(fmt, options):
+    return fmt in ('BMP', 'TIFF') and options.get('compression', 'raw') == 'raw'
+
+def profile_encoders(image, encoders=None, fmt=None):
+    # Encode the image once per profile, in memory, and report the cost:
+    # [{'encoder', 'format', 'seconds', 'bytes'}, ...]
+    # fmt defaults to the image's own format (PNG for arrays).
+    encoders = encoders or list(ENCODERS)
+    with _open_image(_as_source(image)) as img:
+        fmt = fmt or img.format or 'PNG'
+        options = [encoder_options(encoder, img, fmt) for encoder in encoders]
+        pixels = _native(img)
+        results = []
+        for encoder, options in zip(encoders, options):
+            buffer = io.BytesIO()
+            start = time.perf_counter()
+            pixels.save(buffer, fmt, **options)
+            seconds = time.perf_counter() - start
+            results.append({'encoder': encoder, 'format': fmt, 'seconds': seconds, 'bytes': buffer.tell()})
+    return results
+
+# ========================== BIT KERNELS ==========================
+# The LSB writes and the unpack/pack of payload bits are NumPy kernels that
+# release the GIL, so a large array is cut into bands that threads work on
+# side by side, each writing its own slice of a preallocated output.
+# THREADS is the number of threads (STEGOPRO_THREADS in the environment, or
+# one per CPU); set it to 1 to keep everything on the calling thread. When
+# several processes run jobs at once, give each a share of the CPUs.
+THREADS = int(os.environ.get('STEGOPRO_THREADS', 0)) or os.cpu_count() or 1
+# Smallest band worth handing to another thread, in samples
+BAND_SIZE = 1 << 17
+
+# (pool, its size), created on first use and again when THREADS changes.
+# The lock keeps two threads that start at once from each creating a pool,
+# and a call from submitting to a pool that another one has just shut down
+# (work submitted before the shutdown still runs to the end).
+_thread_pool = (None, 0)
+_thread_pool_lock = threading.Lock()
+
+def _reset_thread_pool():
+    # A forked worker process inherits the pool object but not its threads
+    # (and maybe a lock that one of them held)
+    global _thread_pool, _thread_pool_lock
+    _thread_pool = (None, 0)
+    _thread_pool_lock = threading.Lock()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_thread_pool)
+
+def _in_bands(n, func, min_band=BAND_SIZE):
+    # Calls func(start, stop) over [0, n) in bands, in parallel when n is
+    # large enough to be worth it
+    global _thread_pool
+    threads = min(THREADS, n // min_band)
+    if threads <= 1:
+        func(0, n)
+        return
+    with _thread_pool_lock:
+        pool, size = _thread_pool
+        if size != THREADS:
+            if pool is not None:
+                pool.shutdown(wait=False)
+            pool = ThreadPoolExecutor(max_workers=THREADS, thread_name_prefix='stegopro')
+            _thread_pool = (pool, THREADS)
+        step = -(-n // threads)
+        futures = [pool.submit(func, start, min(start + step, n)) for start in range(0, n, step)]
+    for future in futures:
+        future.result()
+
+def _lsb_write(target, symbols, bits):
+    # target = (target & ~mask) | symbols, in place
+    mask = _clear_mask(bits, target.dtype)
+
+    def band(start, stop):
+        part = target[start:stop]
+        np.bitwise_and(part, mask, out=part)
+        np.bitwise_or(part, symbols[start:stop], out=part)
+
+    _in_bands(len(target), band)
+
+# ========================== MATRIX EMBEDDING ==========================
+# Plain LSB overwrites one channel per payload bit, so about half of the
+# channels it touches change. With matrix embedding (CODE p) the body is
+# cut into blocks of 2^p - 1 channels and every block carries p bits as the
+# syndrome of its LSBs under the binary Hamming code (1, 2^p - 1, p): the
+# XOR of the (1-based) positions of the channels whose LSB is 1. Flipping
+# the LSB at position syndrome ^ value turns the syndrome into the value,
+# so a block changes at most one channel (none, one time in 2^p) where
+# plain LSB changes p/2 on average. The price is capacity: p bits per
+# 2^p - 1 channels, so the embedder picks the largest p the payload still
+# fits in. Matrix embedding always uses 1 bit per channel.
+MIN_CODE = 2
+MAX_CODE = 8
+
+def _block_size(code):
+    # Channels per value: 2^p - 1 with matrix embedding, 1 otherwise
+    return (1 << code) - 1 if code else 1
+
+def _capacity_bytes(samples, bits_per_channel, code=0):
+    # Whole bytes that `samples` body channels hold
+    if code:
+        return samples // _block_size(code) * code // 8
+    return samples * bits_per_channel // 8
+
+def _choose_code(capacity, data_len):
+    # The largest p whose capacity(p) (header length, bytes) holds the
+    # header and data_len bytes of data, MIN_CODE if none does
+    for code in range(MAX_CODE, MIN_CODE, -1):
+        header_len, available = capacity(code)
+        if header_len + data_len <= available:
+            return code
+    return MIN_CODE
+
+def _syndromes(samples, code):
+    # Syndrome of every block of 2^p - 1 samples, as uint8 values
+    n = _block_size(code)
+    blocks = samples[:len(samples) // n * n].reshape(-1, n)
+    out = np.zeros(len(blocks), dtype=np.uint8)
+
+    def band(start, stop):
+        part = blocks[start:stop]
+        if n >= 15:
+            # Long blocks: one reduction along every block
+            lsb = np.bitwise_and(part, 1).astype(np.uint8)
+            np.multiply(lsb, np.arange(1, n + 1, dtype=np.uint8), out=lsb)
+            np.bitwise_xor.reduce(lsb, axis=1, out=out[start:stop])
+            return
+        # Short blocks: a reduction per block is slow, go column by column
+        column = np.empty(stop - start, dtype=np.uint8)
+        for i in range(n):
+            np.bitwise_and(part[:, i], 1, out=column, casting='unsafe')
+            np.multiply(column, i + 1, out=column)
+            np.bitwise_xor(out[start:stop], column, out=out[start:stop])
+
+    _in_bands(len(blocks), band, BAND_SIZE // n)
+    return out
+
+def _matrix_write(target, values, code):
+    # Make the syndrome of block i of target equal values[i], in place, by
+    # flipping at most one LSB per block
+    n = _block_size(code)
+    flips = np.bitwise_xor(_syndromes(target, code), values)
+    blocks = np.flatnonzero(flips)
+    target[blocks * n + flips[blocks] - 1] ^= 1
+
+# ========================== INSTRUMENTATION ==========================
+# embed_multiple_files / extract_multiple_files accept an `on_event` hook.
+# It is called with one dict per event:
+#   {'event': 'start', 'stage': name, 'bytes': n}
+#   {'event': 'end', 'stage': name, 'seconds': s, 'bytes': n}
+#   {'event': 'progress', 'stage': name, 'bytes': done, 'total': total}
+# Stages can nest (reading the secrets happens inside 'embed'); the seconds
+# of a stage never include its nested stages, so they add up to the total.
+# Stages that run once per chunk ('read', 'unpack', 'decode', ...) send one
+# start/end pair per chunk.
+
+class _Stages:
+    # Times the stages of one call and forwards events to the hook
+    def __init__(self, hook=None):
+        self.hook = hook
+        self.totals = {}  # stage -> {'seconds', 'bytes'}, in first-run order
+        self._stack = []
+        self._start = time.perf_counter()
+
+    def _emit(self, event, stage, **fields):
+        if self.hook is not None:
+            self.hook({'event': event, 'stage': stage, **fields})
+
+    @contextlib.contextmanager
+    def stage(self, name, nbytes=0):
+        # The caller may set frame['bytes'] once it knows the count
+        frame = {'bytes': nbytes, 'nested': 0.0}
+        self._emit('start', name, bytes=nbytes)
+        self._stack.append(frame)
+        start = time.perf_counter()
+        try:
+            yield frame
+        finally:
+            elapsed = time.perf_counter() - start
+            self._stack.pop()
+            if self._stack:
+                self._stack[-1]['nested'] += elapsed
+            seconds = elapsed - frame['nested']
+            total = self.totals.setdefault(name, {'seconds': 0.0, 'bytes': 0})
+            total['seconds'] += seconds
+            total['bytes'] += frame['bytes']
+            self._emit('end', name, seconds=seconds, bytes=frame['bytes'])
+
+    def timed(self, name, iterable, size=len):
+        # Time spent producing every item of a generator counts toward `name`
+        iterator = iter(iterable)
+        while True:
+            with self.stage(name) as frame:
+                item = next(iterator, None)
+                if item is not None:
+                    frame['bytes'] = size(item)
+            if item is None:
+                return
+            yield item
+
+    def progress(self, name, done, total):
+        self._emit('progress', name, bytes=done, total=total)
+
+    def elapsed(self):
+        return time.perf_counter() - self._start
+
+def format_stages(stages, total_seconds):
+    # One line per stage: time, share of the total and throughput
+    lines = []
+    for name, stage in stages.items():
+        share = stage['seconds'] / total_seconds if total_seconds else 0
+        line = f"  {name:<11}{stage['seconds']:9.3f} s {share:6.1%}"
+        if stage['bytes'] and stage['seconds']:
+            line += f"  {stage['bytes'] / stage['seconds'] / 1e6:9.1f} MB/s"
+        lines.append(line)
+    lines.append(f"  {'total':<11}{total_seconds:9.3f} s")
+    return lines
+
+class StegoResult:
+    # What an embed, extract or verify did, returned instead of printing it.
+    #   operation: 'embed', 'extract' or 'verify'
+    #   output: the stego image (embed, verify) or the output folder (extract)
+    #   files: one dict per hidden file (name, codec, size, stored, crc,
+    #          'path' of the written file for extract, 'ok' for verify)
+    #   stages: {stage: {'seconds', 'bytes'}}, see format_stages()
+    #   seconds: wall time of the whole call
+    #   valid: verify only, True/False, or None if there were no checksums
+    def __init__(self, operation, output, files, bits_per_channel, stages, seconds, valid=None):
+        self.operation = operation
+        self.output = output
+        self.files = files
+        self.bits_per_channel = bits_per_channel
+        self.stages = stages
+        self.seconds = seconds
+        self.valid = valid
+
+    @property
+    def payload_bytes(self):
+        return sum(entry['size'] for entry in self.files)
+
+    def summary(self):
+        if self.operation == 'embed':
+            return f"✅ Secret data embedded into: {self.output}"
+        if self.operation == 'verify':
+            return self._verify_summary()
+        if not self.files:
+            return "⚠️ No hidden files found or header corrupted."
+        return "\n".join(f"✅ Extracted file {i + 1}: {entry['path']}" for i, entry in enumerate(self.files))
+
+    def _verify_summary(self):
+        if not self.files and self.valid is False:
+            return "❌ No hidden files found or header corrupted."
+        if self.valid is None:
+            lines = [f"⚠️ {entry['name']} ({entry['size']:,} bytes)" for entry in self.files]
+            lines.append("⚠️ Nothing to verify: no checksums (legacy format).")
+            return "\n".join(lines)
+        lines = [f"{'✅' if entry['ok'] else '❌'} {entry['name']} ({entry['size']:,} bytes)" for entry in self.files]
+        lines.append("✅ Container intact." if self.valid else "❌ Container damaged.")
+        return "\n".join(lines)
+
+    def timing_table(self):
+        return "\n".join(["⏱️ Time by stage:"] + format_stages(self.stages, self.seconds))
+
+    def __str__(self):
+        return self.summary()
+
+def embed_multiple_files(cover_path, secret_paths, output_path, streaming=False, chunk_size=CHUNK_SIZE,
+                         bits_per_channel=1, compression='none', on_event=None, encoder='default', channels=None,
+                         checksum='crc32', matrix=False):
+    _check_settings(bits_per_channel, compression, checksum, matrix)
+    stages = _Stages(on_event)
+
+    # Names, sizes and codecs come from the file system (and a few sampled
+    # blocks for 'auto'), so the header layout is known before reading the data
+    with stages.stage('prepare'):
+        entries = _secret_entries(secret_paths, compression)
+    return _embed_entries(cover_path, entries, output_path, stages, streaming, chunk_size, bits_per_channel, encoder,
+                          channels=channels, checksum=checksum, matrix=matrix)
+
+def embed_bytes(cover, secrets, fmt=None, streaming=False, bits_per_channel=1, compression='none',
+                on_event=None, encoder='default', channels=None, checksum='crc32', matrix=False):
+    # In-memory embed. cover: encoded image bytes, a binary file object or a
+    # NumPy array of pixels. secrets: iterable of (name, bytes-like).
+    # Returns the encoded stego image as bytes, in fmt (default: the cover's
+    # own format, PNG for arrays). Secrets are read through memoryviews, so
+    # they are never copied before being unpacked into bits.
+    _check_settings(bits_per_channel, compression, checksum, matrix)
+    stages = _Stages(on_event)
+    source = _as_source(cover)
+    with stages.stage('prepare'):
+        entries = _memory_entries(secrets, compression)
+        if fmt is None and not isinstance(source, np.ndarray):
+            with _open_image(source) as img:
+                fmt = img.format
+    output = io.BytesIO()
+    _embed_entries(source, entries, output, stages, streaming, CHUNK_SIZE, bits_per_channel, encoder, fmt or 'PNG',
+                   channels, checksum, matrix)
+    return output.getvalue()
+
+def _memory_entries(secrets, compression):
+    entries = []
+    for name, data in secrets:
+        data = memoryview(data).cast('B')
+        entries.append({
+            'data': data,
+            'name': name,
+            'size': len(data),
+            'codec': _choose_codec(name, len(data), compression,
+                                   lambda offset, length, data=data: data[offset:offset + length]),
+            'stored': len(data),
+        })
+    return entries
+
+def _check_settings(bits_per_channel, compression, checksum='crc32', matrix=False):
+    if not 1 <= bits_per_channel <= MAX_BITS_PER_CHANNEL:
+        raise ValueError(f"❌ bits_per_channel must be between 1 and {MAX_BITS_PER_CHANNEL}.")
+    if matrix and bits_per_channel != 1:
+        raise ValueError("❌ Matrix embedding uses 1 bit per channel.")
+    if compression not in COMPRESSION_MODES:
+        raise ValueError(f"❌ Unknown compression '{compression}', use one of {', '.join(COMPRESSION_MODES)}.")
+    if checksum not in CHECKSUMS:
+        raise ValueError(f"❌ Unknown checksum '{checksum}', use one of {', '.join(CHECKSUMS)}.")
+
+def _embed_entries(cover, entries, output, stages, streaming=False, chunk_size=CHUNK_SIZE,
+                   bits_per_channel=1, encoder='default', fmt=None, channels=None, checksum='crc32', matrix=False):
+    # The embed itself, for secrets already described as entries: dicts with
+    # name, size and codec, plus either a file 'path' (and optional 'offset'
+    # of the slice to store) or in-memory 'data'.
+    # cover is any image source (see IMAGE SOURCES), output a path or a
+    # binary file object; fmt defaults to the output path's extension.
+    # channels: band names that carry the body (see _carriers).
+    # matrix: Hamming matrix embedding with p picked from the payload size
+    # (see MATRIX EMBEDDING); compressed files count at their original size.
+    with stages.stage('prepare'):
+        fmt = fmt or output_format(output)
+        with _open_image(cover) as img:
+            options = encoder_options(encoder, img, fmt)
+            width, height = img.size
+            mode = _cover_mode(img)
+            frames = getattr(img, 'n_frames', 1) if img.format == 'TIFF' else 1
+    if frames > 1 and fmt == 'TIFF':
+        return _embed_frames(cover, entries, output, stages, chunk_size, bits_per_channel, options, channels,
+                             checksum, matrix)
+
+    with stages.stage('prepare'):
+        signature_channels, body_channels = _carriers(mode, channels)
+        mask = sum(1 << i for i in body_channels)
+        signature, header = _build_header(entries, bits_per_channel, mode, mask, checksum)
+        body_start = _body_start(len(signature), signature_channels, body_channels)
+        samples = width * height * len(body_channels)
+        code = 0
+        if matrix:
+            code = _choose_code(lambda code: (len(_build_header(entries, 1, mode, mask, checksum, code=code)[1]),
+                                              _capacity_bytes(max(0, samples - body_start), 1, code)),
+                                sum(entry['size'] for entry in entries))
+            signature, header = _build_header(entries, bits_per_channel, mode, mask, checksum, code=code)
+        layout = {
+            'bands': len(ImageMode.getmode(mode).bands),
+            'signature': np.unpackbits(np.frombuffer(signature, dtype=np.uint8)),
+            'signature_channels': signature_channels,
+            'channels': body_channels,
+            'body_start': body_start,
+            'code': code,
+        }
+
+        # Without compression the exact size is known, so fail before any
+        # pixel is decoded or any secret read
+        needed = None
+        if all(entry['codec'] == 'none' for entry in entries):
+            body_len = len(header) + sum(entry['size'] for entry in entries)
+            needed = _samples_needed(layout['body_start'], body_len, bits_per_channel, code)
+            _check_space(needed, samples)
+
+    # Payload: [SIGNATURE] in its own channels, then [HEADER] + [DATA OF ALL
+    # FILES] from body_start, streamed chunk by chunk as k-bit values (one
+    # per channel, or p-bit values per block). Compressed sizes are only
+    # known once the data has gone through, so the header slot is written as
+    # zeros first and filled in at the end.
+    chunk_bytes = max(1, _capacity_bytes(chunk_size, bits_per_channel, code))
+    value_bits = code or bits_per_channel
+    container = {'checksum': checksum, 'crc': 0}
+    chunks = stages.timed('read', _payload_chunks(len(header), entries, chunk_bytes, stages, container))
+    symbol_chunks = stages.timed('unpack', _payload_symbols(chunks, value_bits),
+                                 lambda item: len(item[0]) * item[1] // 8)
+
+    def header_symbols():
+        header = _build_header(entries, bits_per_channel, mode, mask, checksum, container['crc'], code=code)[1]
+        return [(_to_symbols(header, value_bits), value_bits)]
+
+    # Uncompressed output in the cover's own format: patch a copy on disk
+    if (_is_path(cover) and _is_path(output) and _is_uncompressed(fmt, options)
+            and _embed_raw(cover, layout, symbol_chunks, header_symbols, output, chunk_size, stages)):
+        return _embed_result(output, entries, bits_per_channel, stages)
+
+    if streaming:
+        _embed_streaming(cover, layout, symbol_chunks, header_symbols, output, fmt, chunk_size, options, stages)
+        return _embed_result(output, entries, bits_per_channel, stages)
+
+    # Load image and convert to numpy array (Fast Matrix), in its own mode
+    if _is_native_array(cover):
+        # Pixels already: the only work is a copy to write into
+        with stages.stage('convert', cover.nbytes):
+            arr = np.array(cover)
+    else:
+        with stages.stage('decode', _encoded_size(cover)):
+            img = _open_image(cover)
+            img.load()
+        with stages.stage('convert') as frame:
+            arr = np.array(_native(img))
+            frame['bytes'] = arr.nbytes
+
+    with stages.stage('embed'):
+        if layout['signature_channels'] == layout['channels'] == list(range(layout['bands'])):
+            # Every channel carries data: a flat view, a long line of
+            # numbers (R, G, B, R, G, B...)
+            flat_arr = arr.reshape(-1)
+            _write_symbols(flat_arr, 0, [(layout['signature'], 1)])
+            _write_symbols(flat_arr, layout['body_start'], symbol_chunks, code)
+            _write_symbols(flat_arr, layout['body_start'], header_symbols(), code)
+        else:
+            # Some channels are left alone: go through the rows in bands
+            pixels = _bands(arr)
+
+            def write_band(rows, band):
+                pixels[rows] = band
+
+            _embed_layout(pixels.__getitem__, write_band, width, height, chunk_size, layout,
+                          symbol_chunks, header_symbols)
+
+    # Back to an image and save
+    with stages.stage('encode') as frame:
+        Image.fromarray(arr).save(output, fmt, **options)
+        frame['bytes'] = _encoded_size(output)
+    return _embed_result(output, entries, bits_per_channel, stages)
+
+def _embed_result(output, entries, bits_per_channel, stages):
+    files = [{key: entry[key] for key in ('name', 'codec', 'size', 'stored', 'crc', 'blake2') if key in entry}
+             for entry in entries]
+    output = output if _is_path(output) else None
+    return StegoResult('embed', output, files, bits_per_channel, stages.totals, stages.elapsed())
+
+def _write_symbols(flat_arr, pos, symbol_chunks, code=0):
+    # Embed bits, one chunk at a time, starting at channel `pos`:
+    # 1. Clear the k low bits of the image pixels (bitwise AND with e.g. 0xFE for k=1)
     # 2. Add the secret bits (bitwise OR)
+    # or, with matrix embedding, flip one LSB per block where needed.
     # We only modify the part of the image needed to hold the data
-    flat_arr[:len(payload_bits)] = (flat_arr[:len(payload_bits)] & ~1) | payload_bits
-    
-    # Reshape back to image and save
-    new_arr = flat_arr.reshape(arr.shape)
-    Image.fromarray(new_arr).save(output_path)
-    print(f"✅ Secret data embedded into: {output_path}")
-
-def extract_multiple_files(stego_path, output_dir):
-    # Load image
-    img = Image.open(stego_path).convert("RGB")
-    arr = np.array(img)
-    
-    # Extract LSBs instantly using NumPy
-    bits = arr.flatten() & 1
-    
-    # Pack bits back into bytes
-    bytes_data = np.packbits(bits).tobytes()
-    
+    for symbols, bits in symbol_chunks:
+        end = pos + len(symbols) * _block_size(code)
+        _check_space(end, len(flat_arr))
+        if code:
+            _matrix_write(flat_arr[pos:end], symbols, code)
+        else:
+            _lsb_write(flat_arr[pos:end], symbols, bits)
+        pos = end
+    return pos
+
+def _secret_entries(secret_paths, compression):
+    entries = []
+    for path in secret_paths:
+        size = os.path.getsize(path)
+        entries.append({
+            'path': path,
+            'name': os.path.basename(path),
+            'size': size,
+            'codec': _choose_codec(path, size, compression, _file_blocks(path)),
+            'stored': size,  # real value is filled in while streaming
+        })
+    return entries
+
+def _choose_codec(name, size, compression, read_block):
+    # read_block(offset, length) returns part of the secret, see _file_blocks
+    if compression != 'auto':
+        return compression
+    if size == 0 or os.path.splitext(name)[1].lower() in COMPRESSED_EXTS:
+        return 'none'
+    return 'zlib' if _sampled_entropy(read_block, size) < ENTROPY_LIMIT else 'none'
+
+def _file_blocks(path, start=0):
+    def read_block(offset, length):
+        with open(path, 'rb') as f:
+            f.seek(start + offset)
+            return f.read(length)
+    return read_block
+
+def _sampled_entropy(read_block, size):
+    # Shannon entropy (bits per byte) of a few blocks spread through the data
+    counts = np.zeros(256, dtype=np.int64)
+    last = max(0, size - ENTROPY_SAMPLE_SIZE)
+    offsets = sorted({last * i // max(1, ENTROPY_SAMPLES - 1) for i in range(ENTROPY_SAMPLES)})
+    for offset in offsets:
+        block = np.frombuffer(read_block(offset, min(ENTROPY_SAMPLE_SIZE, size)), dtype=np.uint8)
+        counts += np.bincount(block, minlength=256)
+    p = counts[counts > 0] / counts.sum()
+    return float(-(p * np.log2(p)).sum())
+
+def _compressor(codec):
+    if codec == 'zlib':
+        return zlib.compressobj(6)
+    if codec == 'bz2':
+        return bz2.BZ2Compressor()
+    if codec == 'lzma':
+        return lzma.LZMACompressor()
+    return None
+
+def _decompressor(codec):
+    if codec == 'zlib':
+        return zlib.decompressobj()
+    if codec == 'bz2':
+        return bz2.BZ2Decompressor()
+    if codec == 'lzma':
+        return lzma.LZMADecompressor()
+    return None
+
+def _payload_chunks(header_len, entries, chunk_size, stages, container):
+    # Generator over the payload bytes: a zeroed header slot, then every
+    # secret file read through mmap in pieces of at most chunk_size bytes
+    # (and compressed on the fly). Only one piece is ever held in memory.
+    # Each entry's 'stored' size and checksums are updated once its data has
+    # been produced, and container['crc'] covers all the stored data.
+    yield bytes(header_len)
+    total = sum(entry['size'] for entry in entries)
+    done = 0
+    for entry in entries:
+        compressor = _compressor(entry['codec'])
+        digest = _Digest(container['checksum'])
+        stored = 0
+        for piece in _entry_source(entry, chunk_size):
+            done += len(piece)
+            stages.progress('embed', done, total)
+            digest.update(piece)
+            if compressor:
+                with stages.stage('compress', len(piece)):
+                    piece = compressor.compress(piece)
+            if piece:
+                stored += len(piece)
+                container['crc'] = zlib.crc32(piece, container['crc'])
+                yield piece
+        if compressor:
+            with stages.stage('compress'):
+                piece = compressor.flush()
+            stored += len(piece)
+            container['crc'] = zlib.crc32(piece, container['crc'])
+            yield piece
+        entry['stored'] = stored
+        entry.update(digest.values())
+
+class _Digest:
+    # CRC32, and BLAKE2b if asked for, of one file's original data
+    def __init__(self, checksum):
+        self.crc = 0
+        self.blake2 = hashlib.blake2b(digest_size=BLAKE2_SIZE) if checksum == 'blake2' else None
+
+    def update(self, data):
+        self.crc = zlib.crc32(data, self.crc)
+        if self.blake2:
+            self.blake2.update(data)
+
+    def values(self):
+        values = {'crc': self.crc}
+        if self.blake2:
+            values['blake2'] = self.blake2.hexdigest()
+        return values
+
+    def matches(self, entry):
+        return self.values() == {key: entry[key] for key in self.values()}
+
+def _entry_source(entry, chunk_size):
+    if 'data' in entry:
+        data = memoryview(entry['data'])
+        for pos in range(0, entry['size'], chunk_size):
+            yield data[pos:pos + chunk_size]
+    else:
+        yield from _read_chunks(entry['path'], entry['size'], chunk_size, entry.get('offset', 0))
+
+def _read_chunks(path, size, chunk_size, offset=0):
+    if size == 0:
+        return
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        if len(mm) < offset + size:
+            raise ValueError(f"❌ {path} changed while embedding.")
+        for pos in range(offset, offset + size, chunk_size):
+            yield mm[pos:min(pos + chunk_size, offset + size)]
+
+def _samples_needed(body_start, body_len, bits_per_channel, code=0):
+    # Body channels up to the end of the body, at bits_per_channel bits each
+    # (or p bits per block with matrix embedding)
+    return body_start + -(-body_len * 8 // (code or bits_per_channel)) * _block_size(code)
+
+def _clear_mask(bits, dtype=np.uint8):
+    # 0xFE for 1 bit, 0xFC for 2 bits, ... (0xFFFE ... for 16-bit samples)
+    return np.invert(np.array((1 << bits) - 1, dtype=dtype))
+
+def _payload_symbols(chunks, bits_per_channel):
+    # Convert payload chunks directly to per-channel values using NumPy
+    # (Much faster than formatting strings "010101")
+    # Yields (values, bits) pairs.
+    leftover = np.empty(0, dtype=np.uint8)
+    for chunk in chunks:
+        data = np.frombuffer(chunk, dtype=np.uint8)
+        if 8 % bits_per_channel == 0:
+            # k divides 8: split every byte into 8/k values with shifts
+            yield _split_bytes(data, bits_per_channel), bits_per_channel
+            continue
+
+        # Otherwise values straddle bytes: go through the bit array and carry
+        # the bits that don't fill a whole value over to the next chunk
+        bits = np.unpackbits(data)
+        if len(leftover):
+            bits = np.concatenate([leftover, bits])
+        usable = len(bits) - len(bits) % bits_per_channel
+        leftover = bits[usable:]
+        yield _join_bits(bits[:usable], bits_per_channel), bits_per_channel
+
+    if len(leftover):
+        padded = np.zeros(bits_per_channel, dtype=np.uint8)
+        padded[:len(leftover)] = leftover
+        yield _join_bits(padded, bits_per_channel), bits_per_channel
+
+def _to_symbols(data, bits):
+    # Whole buffer -> k-bit values; len(data) * 8 must be a multiple of k
+    data = np.frombuffer(bytes(data), dtype=np.uint8)
+    if 8 % bits == 0:
+        return _split_bytes(data, bits)
+    return _join_bits(np.unpackbits(data), bits)
+
+def _split_bytes(data, bits):
+    # bytes -> k-bit values, most significant first
+    out = np.empty((len(data), 8 // bits), dtype=np.uint8)
+
+    def band(start, stop):
+        if bits == 1:
+            # unpackbits has no out=, but is 2.5x faster than the shifts
+            # below; its temporary is one band
+            out[start:stop] = np.unpackbits(data[start:stop, None], axis=1)
+            return
+        for i, shift in enumerate(range(8 - bits, -1, -bits)):
+            values = out[start:stop, i]
+            np.right_shift(data[start:stop], shift, out=values)
+            np.bitwise_and(values, (1 << bits) - 1, out=values)
+
+    _in_bands(len(data), band, BAND_SIZE * bits // 8)
+    return out.reshape(-1)
+
+def _join_bits(bits, k):
+    # bit array -> k-bit values, most significant first
+    values = np.zeros(len(bits) // k, dtype=np.uint8)
+    groups = bits.reshape(-1, k)
+    for i in range(k):
+        values <<= 1
+        values |= groups[:, i]
+    return values
+
+def _check_space(needed, available):
+    if needed > available:
+        raise ValueError(f"❌ Not enough space! Need {needed} pixels, but image only has {available}.")
+
+def _embed_raw(cover_path, layout, symbol_chunks, header_symbols, output_path, chunk_size, stages):
+    # Uncompressed BMP/TIFF cover written to the same format: copy the file
+    # and patch the rows the payload touches through a memmap, a fixed
+    # number of rows at a time. Nothing is decoded or re-encoded.
+    # Returns False (before touching the payload) when that isn't possible.
+    with Image.open(cover_path) as img:
+        width, height = img.size
+        raw = _raw_pixels(img, cover_path, output_path, stages)
+    if raw is None:
+        return False
+
+    mm, pixels = raw
+    try:
+        with stages.stage('embed'):
+            _embed_layout(pixels.__getitem__, pixels.__setitem__, width, height, chunk_size, layout,
+                          symbol_chunks, header_symbols)
+        with stages.stage('flush'):
+            mm.flush()
+    except Exception:
+        # Don't leave a half-written stego image behind
+        del mm, pixels
+        if os.path.abspath(cover_path) != os.path.abspath(output_path):
+            os.remove(output_path)
+        raise
+    return True
+
+def _embed_streaming(cover, layout, symbol_chunks, header_symbols, output, fmt, chunk_size, options, stages):
+    # Bounded-memory embed for covers that have to be re-encoded: only the
+    # rows the payload touches are edited, a fixed number of rows at a time,
+    # and never as a full-image copy.
+    img = _open_image(cover)
+    width, height = img.size
+
+    # Edit the decoded image in place
+    with stages.stage('decode', _encoded_size(cover)):
+        img.load()
+    if img.mode not in NATIVE_MODES:
+        with stages.stage('convert') as frame:
+            img = _native(img)
+            frame['bytes'] = width * height * layout['bands']
+
+    def read_band(rows):
+        return _bands(np.array(img.crop((0, rows.start, width, rows.stop))))
+
+    def write_band(rows, band):
+        img.paste(Image.fromarray(band[:, :, 0] if band.shape[2] == 1 else band), (0, rows.start))
+
+    with stages.stage('embed'):
+        _embed_layout(read_band, write_band, width, height, chunk_size, layout, symbol_chunks, header_symbols)
+    with stages.stage('encode') as frame:
+        img.save(output, fmt, **options)
+        frame['bytes'] = _encoded_size(output)
+
+def _embed_layout(read_band, write_band, width, height, chunk_size, layout, symbol_chunks, header_symbols):
+    # Signature, payload, then the finished header, a band of rows at a time
+    chunk_rows = max(1, chunk_size // (width * layout['bands']))
+    args = (read_band, write_band, width, height, chunk_rows)
+    _embed_rows(*args, [(layout['signature'], 1)], layout['signature_channels'])
+    _embed_rows(*args, symbol_chunks, layout['channels'], layout['body_start'], layout['code'])
+    _embed_rows(*args, header_symbols(), layout['channels'], layout['body_start'], layout['code'])
+
+def _embed_rows(read_band, write_band, width, height, chunk_rows, symbol_chunks, channels, pos=0, code=0):
+    # Write the payload values into `channels` starting at (channel) sample
+    # `pos`, holding at most chunk_rows rows at a time. read_band/write_band
+    # take a row slice and return/accept a (rows, width, bands) array.
+    # With matrix embedding a value takes a block of channels, and a band
+    # always ends on a whole block.
+    row_samples = width * len(channels)
+    unit = _block_size(code)
+    chunk_rows = max(chunk_rows, 1 + -(-unit // row_samples))
+    band = None
+    for symbols, bits in symbol_chunks:
+        _check_space(pos + len(symbols) * unit, height * row_samples)
+        done = 0
+        while done < len(symbols):
+            if band is None or pos + unit > band_end:
+                if band is not None:
+                    _store_band(write_band, rows, band, carriers, channels)
+                first = pos // row_samples
+                rows = slice(first, min(first + chunk_rows, height))
+                band = np.ascontiguousarray(read_band(rows))
+                # Only the carrier channels, unless that is all of them
+                carriers = band if len(channels) == band.shape[2] else np.ascontiguousarray(band[:, :, channels])
+                flat = carriers.reshape(-1)
+                band_start = first * row_samples
+                band_end = band_start + len(flat)
+
+            # Same LSB swap as the in-memory path, but in place on the band
+            n = min(len(symbols) - done, (band_end - pos) // unit)
+            target = flat[pos - band_start:pos - band_start + n * unit]
+            if code:
+                _matrix_write(target, symbols[done:done + n], code)
+            else:
+                _lsb_write(target, symbols[done:done + n], bits)
+            done += n
+            pos += n * unit
+
+    if band is not None:
+        _store_band(write_band, rows, band, carriers, channels)
+    return pos
+
+def _store_band(write_band, rows, band, carriers, channels):
+    if carriers is not band:
+        band[:, :, channels] = carriers
+    write_band(rows, band)
+
+def _raw_pixels(img, cover_path, output_path, stages):
+    # If the cover is an uncompressed BMP/TIFF and the output is the same
+    # format, copy the file and return a writable (height, width, bands)
+    # view of its pixel data on disk, along with the memmap itself.
+    # Returns None when that isn't possible.
+    out_ext = os.path.splitext(output_path)[1].lower()
+    formats = {'.bmp': 'BMP', '.tif': 'TIFF', '.tiff': 'TIFF'}
+    layout = _raw_layout(img)
+    if layout is None or formats.get(out_ext) != img.format:
+        return None
+
+    if os.path.abspath(cover_path) != os.path.abspath(output_path):
+        with stages.stage('copy', os.path.getsize(cover_path)):
+            shutil.copyfile(cover_path, output_path)
+    return _map_pixels(output_path, img.size, layout, 'r+')
+
+def _raw_layout(img):
+    # Where the pixels of an uncompressed image sit in its file:
+    # (offset, row stride, sample type, samples per pixel, bands, orientation)
+    # or None when they can't be mapped directly
+    if img.mode not in NATIVE_MODES or len(img.tile) != 1:
+        return None
+    if img.format == 'TIFF' and img.info.get('compression') != 'raw':
+        return None
+
+    codec, extents, offset, args = img.tile[0]
+    width, height = img.size
+    if codec != 'raw' or extents != (0, 0, width, height) or not isinstance(args, tuple):
+        return None
+    rawmode = args[0]
+    stride = args[1] if len(args) > 1 else 0
+    orientation = args[2] if len(args) > 2 else 1
+    if rawmode not in RAW_LAYOUTS:
+        return None
+    dtype, samples, bands = RAW_LAYOUTS[rawmode]
+    if len(range(samples)[bands]) != len(img.getbands()):
+        return None
+    stride = stride or width * np.dtype(dtype).itemsize * samples
+    return offset, stride, dtype, samples, bands, orientation
+
+def _map_pixels(path, size, layout, mode='r'):
+    # Returns the memmap of an image's pixel data and a (height, width,
+    # bands) view of it in mode order, see _raw_layout
+    offset, stride, dtype, samples, bands, orientation = layout
+    width, height = size
+    mm = np.memmap(path, dtype=np.uint8, mode=mode, offset=offset, shape=(height, stride))
+    row_bytes = width * np.dtype(dtype).itemsize * samples
+    pixels = mm[:, :row_bytes].view(dtype).reshape(height, width, samples)[:, :, bands]
+    if orientation < 0:
+        # Bottom-up BMP: last image row comes first in the file
+        pixels = pixels[::-1]
+    return mm, pixels
+
+def _load_rows(source, rows):
+    # Decode only the first `rows` rows of the image.
+    # PNG ('zip') and uncompressed BMP/TIFF ('raw') store rows top to bottom
+    # (or bottom to top for BMP), so we can shrink the decoder tile and
+    # stop as soon as the rows we need are filled.
+    img = _open_image(source)
+    width, height = img.size
+    if rows < height and len(img.tile) == 1 and not img.info.get('interlace'):
+        codec, extents, offset, args = img.tile[0]
+        if codec in ('zip', 'raw') and extents == (0, 0, width, height):
+            if codec == 'raw' and isinstance(args, tuple) and len(args) == 3 and args[2] == -1:
+                # Bottom-up BMP: the first image rows are at the end of the file
+                offset += (height - rows) * args[1]
+            img._size = (width, rows)
+            if hasattr(img, '_tile_size'):
+                # TIFF allocates its buffer from the tile size, not the image size
+                img._tile_size = (width, rows)
+            img.tile = [(codec, (0, 0, width, rows), offset, args)]
+    return _native(img)
+
+class _LSBReader:
+    # Reads the embedded stream of an image on demand, in the image's own
+    # mode. Offsets passed to read() are relative to the body, which starts
+    # at sample `body_start` of `channels` and holds `bits` bits per channel.
+    # Until set_body() is called that is the signature.
+    # Only the rows that hold the requested bytes are unpacked. A pixel
+    # array, or an uncompressed BMP/TIFF file (memory-mapped), is read
+    # straight at those rows; other images are decoded up to the last of
+    # them. The source can be anything listed under IMAGE SOURCES.
+    def __init__(self, source, stages=None):
+        self.source = source
+        self.stages = stages or _Stages()
+        self.rows = 0
+        self.pixels = None
+        self.header_mode = None
+        if _is_native_array(source):
+            self.pixels = _bands(source)
+            self.height, self.width = source.shape[:2]
+            self.mode = _array_mode(source)
+        else:
+            with _open_image(source) as img:
+                self.width, self.height = img.size
+                self.mode = _native_mode(img)
+                layout = _raw_layout(img) if _is_path(source) else None
+                if layout:
+                    self.pixels = _map_pixels(source, img.size, layout)[1]
+        if self.pixels is not None:
+            self.rows = self.height
+        self.signature_channels = _carriers(self.mode)[0]
+        self.set_body(0, 1, self.signature_channels)
+        # Checksums from the header, and the CRC32 of the stored data read so
+        # far (by _entry_chunks, in order)
+        self.checks = None
+        self.crc = 0
+
+    def set_body(self, body_start, bits, channels, code=0):
+        self.body_start = body_start
+        self.bits = bits
+        self.code = code
+        if channels != getattr(self, 'channels', None):
+            self.channels = channels
+            # Unpacked samples of rows [window / row_samples, ...)
+            self.flat = np.empty(0, dtype=np.uint8)
+            self.window = 0
+        self.row_samples = self.width * len(channels)
+        self.samples = self.row_samples * self.height
+
+    def _ensure(self, start, stop):
+        # Make self.flat cover samples [start, stop)
+        if self.window <= start and stop <= self.window + len(self.flat):
+            return
+        first = start // self.row_samples
+        last = -(-stop // self.row_samples)
+        # Read ahead (up to CHUNK_SIZE samples) so a run of small reads, like
+        # the header's, doesn't go back to the pixels every time
+        ahead = min(2 * len(self.flat), max(CHUNK_SIZE, stop - start)) // self.row_samples
+        last = min(self.height, max(last, first + ahead))
+        if last > self.rows:
+            # Decoders can't skip rows: decode everything up to `last`, and
+            # grow geometrically so repeated reads don't re-decode every time
+            rows = min(self.height, max(last, self.rows * 2))
+            with self.stages.stage('decode', rows * self.width * len(self.signature_channels)):
+                self.pixels = _bands(np.asarray(_load_rows(self.source, rows)))
+            self.rows = rows
+        pixels = self.pixels[first:last]
+        if len(self.channels) != pixels.shape[2]:
+            pixels = pixels[:, :, self.channels]
+        if pixels.dtype != np.uint8:
+            # Only the low bits matter: keep the low byte of 16-bit samples
+            pixels = (pixels & 0xFF).astype(np.uint8)
+        self.flat = np.ascontiguousarray(pixels).reshape(-1)
+        self.window = first * self.row_samples
+
+    def read(self, offset, length):
+        # k bits per channel, or p bits per block with matrix embedding
+        k = self.code or self.bits
+        unit = _block_size(self.code)
+        first_bit = offset * 8
+        start = self.body_start + first_bit // k * unit
+        stop = self.body_start + -(-(first_bit + length * 8) // k) * unit
+        if stop > self.samples:
+            raise ValueError("❌ Stream runs past the end of the image.")
+        self._ensure(start, stop)
+        with self.stages.stage('unpack', length):
+            values = self.flat[start - self.window:stop - self.window]
+            if self.code:
+                values = _syndromes(values, self.code)
+            return _values_to_bytes(values, k, first_bit % k, length)
+
+def _values_to_bytes(samples, k, skip, length):
+    # Collect the k low bits of every sample back into bytes.
+    # `skip` is how many bits of the first sample belong to the previous byte.
+    out = np.empty(length, dtype=np.uint8)
+
+    def band(start, stop):
+        # Bytes [start, stop) come from the samples that hold their bits
+        first_bit = skip + start * 8
+        _pack_values(samples[first_bit // k:-(-(skip + stop * 8) // k)], k, first_bit % k, out[start:stop])
+
+    _in_bands(length, band, BAND_SIZE * k // 8)
+    return out.tobytes()
+
+def _pack_values(samples, k, skip, out):
+    # The k low bits of `samples`, from bit `skip` on, packed into out
+    if k == 1:
+        # packbits has no out=, but beats a shift loop by 4x; only its
+        # result (len(out) bytes) is a temporary
+        lsb = np.empty(len(samples), dtype=np.uint8)
+        np.bitwise_and(samples, 1, out=lsb, casting='unsafe')
+        out[:] = np.packbits(lsb)
+    elif 8 % k == 0:
+        # k divides 8: every byte is exactly 8/k whole values
+        _pack_fields(samples.reshape(-1, 8 // k), k, out)
+    else:
+        # One bit per byte first, as the bytes don't start on a value
+        bits = np.empty((len(samples), k), dtype=np.uint8)
+        for i in range(k):
+            np.right_shift(samples, k - 1 - i, out=bits[:, i], casting='unsafe')
+        np.bitwise_and(bits, 1, out=bits)
+        _pack_fields(bits.reshape(-1)[skip:skip + len(out) * 8].reshape(-1, 8), 1, out)
+
+def _pack_fields(groups, k, out):
+    # out[i] = the k low bits of groups[i, 0], groups[i, 1], ... in a row
+    column = np.empty(len(out), dtype=np.uint8)
+    mask = (1 << k) - 1
+    np.bitwise_and(groups[:, 0], mask, out=out, casting='unsafe')
+    for i in range(1, groups.shape[1]):
+        np.left_shift(out, k, out=out)
+        np.bitwise_and(groups[:, i], mask, out=column, casting='unsafe')
+        np.bitwise_or(out, column, out=out)
+
+def _read_header(reader):
+    # Returns (header length, [entry, ...]) or None if there is no container.
+    # Every entry is a dict with name, codec, size, stored, crc (and blake2)
+    # and offset (of its stored data in the body). The container checksum
+    # ends up in reader.checks.
+    magic, version = SIGNATURE.unpack(reader.read(0, SIGNATURE.size))
+    if magic != MAGIC:
+        return None
+    if version != FORMAT_VERSION:
+        raise ValueError(f"❌ Unsupported container version {version}.")
+
+    (bits,) = LAYOUT.unpack(reader.read(SIGNATURE.size, LAYOUT.size))
+    if not 1 <= bits <= MAX_BITS_PER_CHANNEL:
+        raise ValueError(f"❌ Corrupted header: {bits} bits per channel.")
+    mask, mode = CARRIER.unpack(reader.read(SIGNATURE.size + LAYOUT.size, CARRIER.size))
+    reader.header_mode = mode.rstrip(b'\0').decode('ascii', errors='replace')
+    channels = _body_channels(reader, mask)
+    signature_len = SIGNATURE.size + LAYOUT.size + CARRIER.size
+    (code,) = CODE.unpack(reader.read(signature_len, CODE.size))
+    signature_len += CODE.size
+    if code and not (MIN_CODE <= code <= MAX_CODE and bits == 1):
+        raise ValueError(f"❌ Corrupted header: matrix code {code}.")
+    reader.set_body(_body_start(signature_len, reader.signature_channels, channels), bits, channels, code)
+
+    (count,) = COUNT.unpack(reader.read(0, COUNT.size))
+    offset = COUNT.size
+    (checksum_id,) = CHECKSUM.unpack(reader.read(offset, CHECKSUM.size))
+    offset += CHECKSUM.size
+    if checksum_id >= len(CHECKSUMS):
+        raise ValueError(f"❌ Corrupted header: unknown checksum {checksum_id}.")
+    checksum = CHECKSUMS[checksum_id]
+    (frames,) = FRAME_COUNT.unpack(reader.read(offset, FRAME_COUNT.size))
+    offset += FRAME_COUNT.size
+    frame_starts = [FRAME_START.unpack(reader.read(offset + i * FRAME_START.size, FRAME_START.size))[0]
+                    for i in range(frames)]
+    offset += frames * FRAME_START.size
+    entries = []
+    for _ in range(count):
+        (name_len,) = ENTRY.unpack(reader.read(offset, ENTRY.size))
+        offset += ENTRY.size
+        name = reader.read(offset, name_len).decode('utf-8', errors='replace')
+        offset += name_len
+        codec_id, size, stored = ENTRY_DATA.unpack(reader.read(offset, ENTRY_DATA.size))
+        offset += ENTRY_DATA.size
+        if codec_id >= len(CODECS):
+            raise ValueError(f"❌ Corrupted header: unknown codec {codec_id}.")
+        entry = {'name': name, 'codec': CODECS[codec_id], 'size': size, 'stored': stored}
+        (entry['crc'],) = CRC.unpack(reader.read(offset, CRC.size))
+        offset += CRC.size
+        if checksum == 'blake2':
+            entry['blake2'] = reader.read(offset, BLAKE2_SIZE).hex()
+            offset += BLAKE2_SIZE
+        entries.append(entry)
+
+    (crc,) = CRC.unpack(reader.read(offset, CRC.size))
+    reader.checks = {'checksum': checksum, 'crc': crc, 'header_len': offset}
+    offset += CRC.size
+
+    # Skip the padding that aligns the data to a channel (block) boundary
+    offset += -offset % (reader.code or reader.bits)
+    if len(frame_starts) > 1:
+        if not hasattr(reader, 'set_frames'):
+            raise ValueError(f"❌ The payload spans {len(frame_starts)} frames: read the multi-frame TIFF it was "
+                             f"embedded in.")
+        reader.set_frames(frame_starts, offset)
+    reader.frames = len(frame_starts)
+    # The data of every file follows the header back to back, so its
+    # position is known without reading any of it
+    position = offset
+    for entry in entries:
+        entry['offset'] = position
+        position += entry['stored']
+    return offset, entries
+
+def _body_channels(reader, mask):
+    # The channels of the image being read that carry the body, found by
+    # band name so the image may have been converted since (e.g. RGBA -> RGB
+    # when alpha wasn't used)
+    try:
+        bands = ImageMode.getmode(reader.header_mode).bands
+    except KeyError:
+        raise ValueError(f"❌ Corrupted header: unknown mode {reader.header_mode!r}.")
+    names = [band for i, band in enumerate(bands) if mask >> i & 1]
+    own = ImageMode.getmode(reader.mode).bands
+    missing = [band for band in names if band not in own]
+    if not names or missing:
+        raise ValueError(f"❌ The payload was embedded in the {''.join(names)} channels of a "
+                         f"{reader.header_mode} image, but this is a {reader.mode} image.")
+    return [own.index(band) for band in names]
+
+def _container_ok(reader):
+    # Once every entry has been read: does the container CRC match?
+    header = reader.read(0, reader.checks['header_len'])
+    return zlib.crc32(header, reader.crc) == reader.checks['crc']
+
+def _check_container(reader):
+    if not _container_ok(reader):
+        raise ValueError("❌ Container checksum mismatch: the stego image is damaged or was re-encoded.")
+
+def plan_capacity(cover_path, secret_paths, bits_per_channel=1, compression='none', channels=None,
+                  checksum='crc32', matrix=False, fmt=None):
+    # Will these secrets fit? Works from the image header and file sizes only:
+    # no pixels are decoded and no secret data is read.
+    # Returns a dict of byte counts: 'capacity' of the cover, 'used' by the
+    # container header ('overhead') plus the data, and what is 'left'.
+    # Compressed sizes are only known after embedding, so with compression
+    # 'used' counts the uncompressed sizes and 'exact' is False.
+    # fmt is the format the stego image will be written in (see
+    # output_format; default: the cover's own). A multi-frame TIFF cover
+    # counts all of its frames only when that is TIFF (see MULTI-FRAME);
+    # any other format keeps the first frame. With matrix embedding the
+    # capacity is that of the p the embedder would pick ('code').
+    _check_settings(bits_per_channel, compression, checksum, matrix)
+    with Image.open(cover_path) as img:
+        width, height = img.size
+        mode = _cover_mode(img)
+        sizes = [img.size]
+        if img.format == 'TIFF' and (fmt or img.format) == 'TIFF' and getattr(img, 'n_frames', 1) > 1:
+            sizes = [size for size, _, _ in _frame_plan(img)]
+    signature_channels, body_channels = _carriers(mode, channels)
+
+    entries = []
+    for path in secret_paths:
+        size = os.stat(path).st_size
+        entries.append({'name': os.path.basename(path), 'codec': 'none', 'size': size, 'stored': size})
+    # The header layout doesn't depend on the codecs, only on the names
+    signature = _build_header(entries, bits_per_channel, mode, checksum=checksum)[0]
+
+    # The signature is always 1 bit per channel and fills whole pixels, the
+    # rest is k bits in every body channel (p bits per block)
+    start = _body_start(len(signature), signature_channels, body_channels)
+
+    def code_capacity(code):
+        # (header length, capacity) with matrix code p, or plain LSB
+        header_len = len(_build_header(entries, bits_per_channel, mode, checksum=checksum,
+                                       frame_starts=[0] * len(sizes), code=code)[1])
+        if len(sizes) > 1:
+            return header_len, header_len + sum(_frame_capacities(sizes, len(body_channels), start, header_len,
+                                                                  bits_per_channel, code))
+        samples = width * height * len(body_channels)
+        return header_len, _capacity_bytes(max(0, samples - start), bits_per_channel, code)
+
+    data = sum(entry['size'] for entry in entries)
+    code = _choose_code(code_capacity, data) if matrix else 0
+    header_len, capacity = code_capacity(code)
+    used = header_len + data
+    bands = ImageMode.getmode(mode).bands
+    return {
+        'width': width,
+        'height': height,
+        'mode': mode,
+        'channels': ''.join(bands[i] for i in body_channels),
+        'frames': len(sizes),
+        'bits_per_channel': bits_per_channel,
+        'code': code,
+        'capacity': capacity,
+        'overhead': header_len,
+        'payload_bytes': data,
+        'used': used,
+        'left': capacity - used,
+        'fits': used <= capacity,
+        'exact': compression == 'none',
+    }
+
+def stego_info(stego):
+    # Read just the header of a stego image (any source), without extracting anything.
+    # Returns None if the image has no container (e.g. the old delimiter format).
+    reader = _open_reader(_as_source(stego))
+    header = _read_header(reader)
+    if header is None:
+        return None
+    offset, entries = header
+    bands = ImageMode.getmode(reader.mode).bands
+    return {
+        'bits_per_channel': reader.bits,
+        'mode': reader.header_mode,
+        'checksum': reader.checks['checksum'],
+        'channels': ''.join(bands[i] for i in reader.channels),
+        'frames': reader.frames,
+        'code': reader.code,
+        'files': entries,
+        'payload_bytes': offset + sum(entry['stored'] for entry in entries),
+    }
+
+def extract_multiple_files(stego, output_dir, on_event=None, names=None):
+    # stego is a path or any other image source (see IMAGE SOURCES).
+    # names: only extract the hidden files with these names (see list_files);
+    # the others are skipped without being decoded.
+    # Returns a StegoResult; see the INSTRUMENTATION notes for on_event
+    stages = _Stages(on_event)
+    source = _as_source(stego)
+    reader = _open_reader(source, stages)
+
     # Create output directory
     os.makedirs(output_dir, exist_ok=True)
-    
+
+    header = _read_header(reader)
+    if header is None:
+        # No magic: image was made by an older version (delimiter format)
+        files = _extract_legacy_files(source, output_dir, stages, names)
+        return StegoResult('extract', output_dir, files, 1, stages.totals, stages.elapsed())
+
+    out_names = _output_names(entry['name'] for entry in header[1])
+    entries, selected = [], list(zip(header[1], out_names))
+    if names is not None:
+        selected = [(entry, out_name) for entry, out_name in selected if entry['name'] in names]
+        _check_names(names, [entry['name'] for entry, _ in selected])
+    total = sum(entry['stored'] for entry, _ in selected)
+    done = 0
+    for entry, out_name in selected:
+        out_path = os.path.join(output_dir, out_name)
+
+        with open(out_path, 'wb') as f:
+            for data, stored in _entry_chunks(reader, entry['offset'], entry, stages):
+                with stages.stage('write', len(data)):
+                    f.write(data)
+                done += stored
+                stages.progress('extract', done, total)
+        entry['path'] = out_path
+        entries.append(entry)
+
+    if len(entries) == len(header[1]):
+        # The container checksum covers all the data, so only a full read can check it
+        _check_container(reader)
+    return StegoResult('extract', output_dir, entries, reader.bits, stages.totals, stages.elapsed())
+
+def _output_names(names):
+    # Safe, distinct file names to write entries to: the original name
+    # without any directory part
+    result, used = [], set()
+    for i, name in enumerate(names):
+        name = os.path.basename(name.replace('\\', '/'))
+        if name in ('', '.', '..'):
+            name = f"secret_{i}.bin"
+        if name in used:
+            name = f"{i}_{name}"
+        used.add(name)
+        result.append(name)
+    return result
+
+def _check_names(names, found):
+    missing = [name for name in names if name not in found]
+    if missing:
+        raise ValueError(f"❌ No hidden file named {', '.join(map(repr, missing))}.")
+
+def list_files(stego):
+    # The table of contents: one dict per hidden file with name, codec,
+    # size, stored, offset (and crc). Only the header rows are decoded.
+    # Images in the old delimiter format have no header and are scanned.
+    stages = _Stages()
+    source = _as_source(stego)
+    reader = _open_reader(source, stages)
+    header = _read_header(reader)
+    if header is None:
+        return [{'name': name, 'codec': 'none', 'size': len(data), 'stored': len(data)}
+                for name, data in _legacy_files(source, stages)]
+    return header[1]
+
+def extract_file(stego, name, output, on_event=None):
+    # Extract one hidden file by name into output (a path or a binary file
+    # object). The header gives the file's offset, so only the samples that
+    # hold it are unpacked; see _LSBReader for what gets decoded.
+    # Returns a StegoResult
+    stages = _Stages(on_event)
+    source = _as_source(stego)
+    reader = _open_reader(source, stages)
+    header = _read_header(reader)
+    if header is None:
+        files = {file_name: data for file_name, data in _legacy_files(source, stages)}
+        _check_names([name], files)
+        entry = {'name': name, 'codec': 'none', 'size': len(files[name]), 'stored': len(files[name])}
+        chunks = [(files[name], entry['stored'])]
+    else:
+        _check_names([name], [entry['name'] for entry in header[1]])
+        entry = next(entry for entry in header[1] if entry['name'] == name)
+        chunks = _entry_chunks(reader, entry['offset'], entry, stages)
+
+    done = 0
+    with _output_file(output) as f:
+        for data, stored in chunks:
+            with stages.stage('write', len(data)):
+                f.write(data)
+            done += stored
+            stages.progress('extract', done, entry['stored'])
+    if _is_path(output):
+        entry['path'] = output
+    return StegoResult('extract', output if _is_path(output) else None, [entry], reader.bits,
+                       stages.totals, stages.elapsed())
+
+def _output_file(output):
+    # A path is opened (and closed) here; a file object is the caller's
+    if _is_path(output):
+        return open(output, 'wb')
+    return contextlib.nullcontext(output)
+
+def extract_bytes(stego, on_event=None):
+    # In-memory extract: stego is encoded image bytes, a binary file object
+    # or a NumPy array (or a path). Returns [(name, memoryview), ...].
+    # The payload is unpacked once into a single buffer and every stored
+    # file is a view into it; only compressed files get their own buffer.
+    stages = _Stages(on_event)
+    source = _as_source(stego)
+    reader = _open_reader(source, stages)
+    header = _read_header(reader)
+    if header is None:
+        return list(_legacy_files(source, stages))
+
+    offset, entries = header
+    payload = memoryview(reader.read(offset, sum(entry['stored'] for entry in entries)))
+    reader.crc = zlib.crc32(payload)
+    _check_container(reader)
+    files = []
+    pos = 0
+    for entry in entries:
+        data = payload[pos:pos + entry['stored']]
+        pos += entry['stored']
+        if entry['codec'] != 'none':
+            with stages.stage('decompress', len(data)):
+                data = memoryview(_decompress(entry['codec'], data))
+        digest = _Digest('blake2' if 'blake2' in entry else 'crc32')
+        digest.update(data)
+        if not digest.matches(entry):
+            raise ValueError(f"❌ Checksum mismatch in {entry['name']}: the stego image is damaged or was re-encoded.")
+        files.append((entry['name'], data))
+    return files
+
+def verify(stego, on_event=None):
+    # Check every hidden file, and the container as a whole, against the
+    # checksums written by the embedder. Nothing is written: only the rows
+    # that hold the payload are decoded, so the time follows the payload
+    # size, not the image size.
+    # Returns a StegoResult with `valid` and an 'ok' per file: True/False,
+    # or None for images in the old delimiter format, which have no
+    # checksums and are only scanned for their files.
+    stages = _Stages(on_event)
+    source = _as_source(stego)
+    reader = _open_reader(source, stages)
+    output = stego if _is_path(stego) else None
+    header = _read_header(reader)
+    if header is None:
+        entries = [{'name': name, 'codec': 'none', 'size': len(data), 'stored': len(data), 'ok': None}
+                   for name, data in _legacy_files(source, stages)]
+        return StegoResult('verify', output, entries, None, stages.totals, stages.elapsed(),
+                           valid=None if entries else False)
+
+    offset, entries = header
+    total = sum(entry['stored'] for entry in entries)
+    done = 0
+    for entry in entries:
+        entry['ok'] = True
+        try:
+            for _, stored in _entry_chunks(reader, offset, entry, stages):
+                done += stored
+                stages.progress('verify', done, total)
+        except (ValueError, zlib.error, lzma.LZMAError, OSError):
+            # A checksum mismatch, a broken compressed stream, or a length
+            # that runs off the end of the image
+            entry['ok'] = False
+        offset += entry['stored']
+
+    valid = all(entry['ok'] for entry in entries) and _container_ok(reader)
+    return StegoResult('verify', output, entries, reader.bits, stages.totals, stages.elapsed(), valid=valid)
+
+def _decompress(codec, data):
+    decompressor = _decompressor(codec)
+    out = decompressor.decompress(data)
+    if hasattr(decompressor, 'flush'):
+        out += decompressor.flush()
+    return out
+
+def _entry_chunks(reader, offset, entry, stages):
+    # Read exactly the bytes that belong to one entry (stored at body
+    # `offset`), a chunk at a time, decompressing on the way out if needed.
+    # Yields (data, stored bytes it came from). Raises ValueError after the
+    # last chunk if the entry's checksums don't match.
+    decompressor = _decompressor(entry['codec'])
+    digest = _Digest('blake2' if 'blake2' in entry else 'crc32')
+    for pos in range(0, entry['stored'], CHUNK_SIZE):
+        stored = min(CHUNK_SIZE, entry['stored'] - pos)
+        data = reader.read(offset + pos, stored)
+        reader.crc = zlib.crc32(data, reader.crc)
+        if decompressor:
+            with stages.stage('decompress', len(data)):
+                data = decompressor.decompress(data)
+        digest.update(data)
+        yield data, stored
+    if hasattr(decompressor, 'flush'):
+        data = decompressor.flush()
+        digest.update(data)
+        yield data, 0
+    if not digest.matches(entry):
+        raise ValueError(f"❌ Checksum mismatch in {entry['name']}: the stego image is damaged or was re-encoded.")
+
+def _extract_legacy_files(source, output_dir, stages, names=None):
+    # Writes the files of an old delimiter-format image (those in names, if
+    # given). Returns them as dicts, like the header entries.
+    files = []
+    for out_name, file_data in _legacy_files(source, stages):
+        if names is not None and out_name not in names:
+            continue
+        out_path = os.path.join(output_dir, out_name)
+        with stages.stage('write', len(file_data)):
+            with open(out_path, 'wb') as f:
+                f.write(file_data)
+        files.append({'name': out_name, 'codec': 'none', 'size': len(file_data), 'stored': len(file_data),
+                      'path': out_path})
+    if names is not None:
+        _check_names(names, [f['name'] for f in files])
+    return files
+
+def _legacy_files(source, stages):
+    # Old delimiter format: [EXT 8, padded with #] + [DATA] + [####] ...
+    # Yields (name, memoryview of the data) for every file found.
+    # Load image
+    with stages.stage('decode', _encoded_size(source)):
+        if _is_rgb_array(source):
+            arr = source
+        else:
+            img = _open_image(source)
+            # Old images were always written as RGB
+            arr = np.asarray(img if img.mode == "RGB" else img.convert("RGB"))
+
+    # Extract LSBs instantly using NumPy, and pack them back into bytes
+    with stages.stage('unpack') as frame:
+        flat = arr.reshape(-1)
+        bytes_data = _values_to_bytes(flat, 1, 0, len(flat) // 8)
+        frame['bytes'] = len(bytes_data)
+
     # Parse the bytes to find files
     idx = 0
     file_count = 0
+    view = memoryview(bytes_data)
     total_len = len(bytes_data)
-    
-    print("🔍 Scanning for hidden files...")
 
     while idx < total_len:
         # We need at least 8 bytes for an extension
         if idx + 8 > total_len:
             break
-            
+
         # 1. Read the Extension (First 8 bytes)
         ext_block = bytes_data[idx:idx+8]
-        
+
         # Check if this looks like valid data (simple check)
         # If we reached the empty part of the image, the extension will likely be noise or 0s/255s
         # Our protocol pads extensions with '#'.
@@ -85,39 +1727,476 @@ def extract_multiple_files(stego_path, output_dir):
         except:
             # If decoding fails, we probably hit the end of real data
             break
-            
+
         # Move index past extension
         idx += 8
-        
+
         # 2. Find the Delimiter (####)
         # This searches for the next '####' starting from current position
         delimiter_pos = bytes_data.find(b'####', idx)
-        
+
         if delimiter_pos == -1:
             # No delimiter found, stop scanning
             break
-            
-        # 3. Extract the actual file data
-        file_data = bytes_data[idx:delimiter_pos]
-        
+
+        # 3. Extract the actual file data (a view, nothing is copied)
+        file_data = view[idx:delimiter_pos]
+
         # 4. Save the file
         # Clean up extension (remove dots if present to avoid double dots)
         clean_ext = ext_str.lstrip('.')
-        if not clean_ext or len(clean_ext) > 4: 
-            # Fallback if extension looks weird
+        if not clean_ext.isalnum() or len(clean_ext) > 7:
+            # Fallback if extension looks weird (the block holds at most '.' + 7)
             clean_ext = "bin"
-            
-        out_name = f"secret_{file_count}.{clean_ext}"
-        out_path = os.path.join(output_dir, out_name)
-        
-        with open(out_path, 'wb') as f:
-            f.write(file_data)
-            
-        print(f"✅ Extracted file {file_count+1}: {out_path}")
-        
+
+        yield f"secret_{file_count}.{clean_ext}", file_data
+
         # Move index past the delimiter (4 bytes) to look for next file
         idx = delimiter_pos + 4
         file_count += 1
 
-    if file_count == 0:
-        print("⚠️ No hidden files found or header corrupted.")
\ No newline at end of file
+# ========================== MULTI-FRAME ==========================
+# A multi-frame TIFF cover written back as a TIFF carries one body across
+# all of its pages, so the capacity grows with the page count. Pages are
+# visited in order through ImageSequence and only one is decoded (or
+# memory-mapped, when uncompressed) at a time, on both sides:
+#   frame 0 .. n-2   data from their first body sample, no signature
+#   frame n-1        signature and header as in a single image, then the
+#                    rest of the data
+# The data of frame i starts at FRAME START i, so the reader goes straight
+# to the frames that hold the bytes it wants. The header lives in the last
+# frame because its checksums are only known once all the data has gone
+# through, and the frames are written strictly in order.
+# Every frame must have the same mode.
+
+def _frame_plan(img, path=None):
+    # One (size, native mode, raw layout) per frame of an open image. Only
+    # the frame directories are read, nothing is decoded. raw layout: see
+    # _raw_layout, None unless `path` is given and the frame is uncompressed
+    frames = []
+    for frame in ImageSequence.Iterator(img):
+        layout = _raw_layout(frame) if path is not None else None
+        frames.append((frame.size, _cover_mode(frame), layout))
+    img.seek(0)
+    if len({mode for _, mode, _ in frames}) > 1:
+        raise ValueError("❌ Every frame of a multi-frame cover must have the same mode.")
+    return frames
+
+def _frame_capacities(sizes, body_channels, body_start, header_len, bits_per_channel, code=0):
+    # Data bytes every frame holds. A byte never straddles two frames; the
+    # last one also holds the signature and header.
+    capacities = [_capacity_bytes(width * height * body_channels, bits_per_channel, code) for width, height in sizes]
+    width, height = sizes[-1]
+    last = _capacity_bytes(max(0, width * height * body_channels - body_start), bits_per_channel, code) - header_len
+    capacities[-1] = max(0, last)
+    return capacities
+
+def _frame_starts(capacities):
+    starts = [0]
+    for capacity in capacities[:-1]:
+        starts.append(starts[-1] + capacity)
+    return starts
+
+def _take(chunks, size, pending):
+    # Up to `size` bytes of the chunk iterator, as chunks. What is left of
+    # the last chunk goes to `pending`, where the next call picks it up.
+    while size > 0:
+        chunk = pending.pop() if pending else next(chunks, None)
+        if chunk is None:
+            return
+        chunk = memoryview(chunk)
+        if len(chunk) > size:
+            pending.append(chunk[size:])
+            chunk = chunk[:size]
+        size -= len(chunk)
+        yield chunk
+
+def _embed_frames(cover, entries, output, stages, chunk_size, bits_per_channel, options, channels, checksum,
+                  matrix=False):
+    # _embed_entries for a multi-frame TIFF cover (see MULTI-FRAME)
+    with stages.stage('prepare'):
+        raw = _is_path(cover) and _is_path(output) and _is_uncompressed('TIFF', options)
+        with _open_image(cover) as img:
+            frames = _frame_plan(img, cover if raw else None)
+        mode = frames[0][1]
+        signature_channels, body_channels = _carriers(mode, channels)
+        mask = sum(1 << i for i in body_channels)
+        starts = [0] * len(frames)
+        signature, header = _build_header(entries, bits_per_channel, mode, mask, checksum, frame_starts=starts)
+        body_start = _body_start(len(signature), signature_channels, body_channels)
+        sizes = [size for size, _, _ in frames]
+        code = 0
+        if matrix:
+            def code_capacity(code):
+                header_len = len(_build_header(entries, 1, mode, mask, checksum, frame_starts=starts, code=code)[1])
+                return header_len, header_len + sum(_frame_capacities(sizes, len(body_channels), body_start,
+                                                                      header_len, 1, code))
+
+            code = _choose_code(code_capacity, sum(entry['size'] for entry in entries))
+            signature, header = _build_header(entries, bits_per_channel, mode, mask, checksum, frame_starts=starts,
+                                              code=code)
+        layout = {
+            'bands': len(ImageMode.getmode(mode).bands),
+            'signature': np.unpackbits(np.frombuffer(signature, dtype=np.uint8)),
+            'signature_channels': signature_channels,
+            'channels': body_channels,
+            'body_start': body_start,
+            'code': code,
+        }
+        capacities = _frame_capacities(sizes, len(body_channels), body_start, len(header), bits_per_channel, code)
+        starts[:] = _frame_starts(capacities)
+        capacity = sum(capacities)
+        chunk_bytes = max(1, _capacity_bytes(chunk_size, bits_per_channel, code))
+        # The frames are written one after the other, so everything has to be
+        # known to fit before the first one is. Compressed sizes are only known
+        # once the data has gone through: compress it once just to count.
+        if all(entry['codec'] == 'none' for entry in entries):
+            stored = sum(entry['size'] for entry in entries)
+        else:
+            with stages.stage('compress'):
+                stored = _stored_size(entries, chunk_bytes)
+        _check_frame_space(stored, capacity, len(frames))
+
+    value_bits = code or bits_per_channel
+    container = {'checksum': checksum, 'crc': 0}
+    data = stages.timed('read', _payload_chunks(0, entries, chunk_bytes, stages, container))
+    pending = []
+
+    def frame_chunks(index):
+        if index == len(frames) - 1:
+            # The header slot, filled in by header_symbols
+            yield bytes(len(header))
+        yield from _take(data, capacities[index], pending)
+
+    def frame_symbols(index):
+        return stages.timed('unpack', _payload_symbols(frame_chunks(index), value_bits),
+                            lambda item: len(item[0]) * item[1] // 8)
+
+    def header_symbols():
+        # Anything still unread was not there when the size was checked
+        if any(len(chunk) for chunk in [*pending, *data]):
+            raise ValueError("❌ The secret files changed while embedding.")
+        header = _build_header(entries, bits_per_channel, mode, mask, checksum, container['crc'], starts, code)[1]
+        return [(_to_symbols(header, value_bits), value_bits)]
+
+    def embed(index, pixels):
+        width, height = frames[index][0]
+        if index < len(frames) - 1:
+            chunk_rows = max(1, chunk_size // (width * layout['bands']))
+            _embed_rows(pixels.__getitem__, pixels.__setitem__, width, height, chunk_rows,
+                        frame_symbols(index), body_channels, code=code)
+        else:
+            _embed_layout(pixels.__getitem__, pixels.__setitem__, width, height, chunk_size, layout,
+                          frame_symbols(index), header_symbols)
+
+    if raw and all(frame[2] for frame in frames):
+        _embed_frames_raw(cover, output, frames, embed, stages)
+    else:
+        _embed_frames_encoded(cover, output, embed, options, stages)
+    return _embed_result(output, entries, bits_per_channel, stages)
+
+def _stored_size(entries, chunk_size):
+    # Bytes the entries take once compressed, from a dry run over their data
+    stored = 0
+    for entry in entries:
+        compressor = _compressor(entry['codec'])
+        for piece in _entry_source(entry, chunk_size):
+            stored += len(compressor.compress(piece)) if compressor else len(piece)
+        if compressor:
+            stored += len(compressor.flush())
+    return stored
+
+def _check_frame_space(needed, available, frames):
+    if needed > available:
+        raise ValueError(f"❌ Not enough space! Need {needed} bytes, but the {frames} frames only hold {available}.")
+
+def _embed_frames_raw(cover_path, output_path, frames, embed, stages):
+    # Uncompressed frames written to an uncompressed TIFF: copy the file and
+    # patch one frame at a time through a memmap, like _embed_raw
+    if os.path.abspath(cover_path) != os.path.abspath(output_path):
+        with stages.stage('copy', os.path.getsize(cover_path)):
+            shutil.copyfile(cover_path, output_path)
+    try:
+        for index, (size, _, layout) in enumerate(frames):
+            mm, pixels = _map_pixels(output_path, size, layout, 'r+')
+            with stages.stage('embed'):
+                embed(index, pixels)
+            with stages.stage('flush'):
+                mm.flush()
+            del mm, pixels
+    except Exception:
+        if os.path.abspath(cover_path) != os.path.abspath(output_path):
+            os.remove(output_path)
+        raise
+
+def _embed_frames_encoded(cover, output, embed, options, stages):
+    # Decode a frame, embed, encode it and append it to the output before
+    # the next frame is decoded. Writing over the cover itself goes through
+    # a temporary file, as its frames are still being read.
+    target = output
+    if _is_path(cover) and _is_path(output) and os.path.abspath(cover) == os.path.abspath(output):
+        target = f"{output}.{os.getpid()}.tmp"
+    try:
+        with _open_image(cover) as img, TiffImagePlugin.AppendingTiffWriter(target, new=True) as tf:
+            for index, frame in enumerate(ImageSequence.Iterator(img)):
+                with stages.stage('decode'):
+                    frame.load()
+                with stages.stage('convert') as info:
+                    arr = np.array(_native(frame))
+                    info['bytes'] = arr.nbytes
+                with stages.stage('embed'):
+                    embed(index, _bands(arr))
+                with stages.stage('encode'):
+                    Image.fromarray(arr).save(tf, 'TIFF', **options)
+                    tf.newFrame()
+                del arr
+    except Exception:
+        if _is_path(target) and os.path.exists(target):
+            os.remove(target)
+        raise
+    if target is not output:
+        os.replace(target, output)
+
+def _frame_pixels(source, index, stages):
+    # (height, width[, bands]) pixels of one frame: memory-mapped when the
+    # frame is uncompressed and in a file, decoded otherwise
+    with _open_image(source) as img:
+        img.seek(index)
+        layout = _raw_layout(img) if _is_path(source) else None
+        if layout:
+            pixels = _map_pixels(source, img.size, layout)[1]
+            return pixels[:, :, 0] if pixels.shape[2] == 1 else pixels
+        with stages.stage('decode') as frame:
+            pixels = np.asarray(_native(img))
+            frame['bytes'] = pixels.nbytes
+    return pixels
+
+class _FrameReader:
+    # Reads a body spread over the frames of a multi-frame TIFF (see
+    # MULTI-FRAME). The signature and header come from the last frame; once
+    # _read_header has called set_frames(), data offsets go to the frame
+    # that holds them. One frame other than the last is open at a time.
+    # Everything else (mode, bits, channels, set_body...) is the last
+    # frame's _LSBReader.
+    def __init__(self, source, frames, stages=None):
+        self.source = source
+        self.stages = stages or _Stages()
+        self.last = _LSBReader(_frame_pixels(source, frames - 1, self.stages), self.stages)
+        self.starts = None
+        self.header_len = 0
+        self.frame = (None, None)  # (index, _LSBReader)
+        self.checks = None
+        self.crc = 0
+
+    def __getattr__(self, name):
+        if name == 'last':
+            raise AttributeError(name)
+        return getattr(self.last, name)
+
+    def set_frames(self, starts, header_len):
+        self.starts = starts
+        self.header_len = header_len
+
+    def _reader(self, index):
+        if self.frame[0] != index:
+            self.frame = (None, None)
+            reader = _LSBReader(_frame_pixels(self.source, index, self.stages), self.stages)
+            if reader.mode != self.last.mode:
+                raise ValueError(f"❌ Frame {index} is a {reader.mode} image, the last one a {self.last.mode} image.")
+            reader.set_body(0, self.last.bits, self.last.channels, self.last.code)
+            self.frame = (index, reader)
+        return self.frame[1]
+
+    def read(self, offset, length):
+        if self.starts is None or offset + length <= self.header_len:
+            return self.last.read(offset, length)
+        parts = []
+        if offset < self.header_len:
+            parts.append(self.last.read(offset, self.header_len - offset))
+            length -= self.header_len - offset
+            offset = self.header_len
+        # Offset into the data, then a piece per frame it spans
+        pos = offset - self.header_len
+        while length > 0:
+            index = bisect.bisect_right(self.starts, pos) - 1
+            if index == len(self.starts) - 1:
+                parts.append(self.last.read(self.header_len + pos - self.starts[index], length))
+                break
+            n = min(length, self.starts[index + 1] - pos)
+            parts.append(self._reader(index).read(pos - self.starts[index], n))
+            pos += n
+            length -= n
+        return b''.join(parts)
+
+def _open_reader(source, stages=None):
+    # A reader for the body of any stego image: a _FrameReader when the
+    # image is a multi-frame TIFF whose last frame has the signature, an
+    # _LSBReader otherwise
+    if not _is_native_array(source):
+        with _open_image(source) as img:
+            frames = getattr(img, 'n_frames', 1) if img.format == 'TIFF' else 1
+        if frames > 1:
+            reader = _FrameReader(source, frames, stages)
+            if reader.read(0, len(MAGIC)) == MAGIC:
+                return reader
+    return _LSBReader(source, stages)
+
+# ========================== SHARDING ==========================
+# A payload set too big for one cover is split across several. Every shard
+# is an ordinary container whose first entry is a small JSON manifest:
+#   {"set": id, "index": i, "count": n,
+#    "files": [{"name", "size"}, ...],                  the whole set
+#    "pieces": [{"file", "offset", "size"}, ...]}       this shard
+# followed by one entry per piece, in the same order. A piece is a slice of
+# one secret file, so the shards embed and extract independently (one
+# process each), and the extractor writes every piece straight to its place
+# in the output files.
+SHARD_MANIFEST = '.stegopro-shard.json'
+
+def _shard_manifest(set_id, index, count, files, pieces):
+    return json.dumps({'set': set_id, 'index': index, 'count': count, 'files': files,
+                       'pieces': pieces}).encode('utf-8')
+
+def _shard_overhead(files, count, bits_per_channel):
+    # Upper bound on the container header + manifest of one shard: a shard
+    # never holds more pieces than there are files, no number is wider than
+    # 20 digits, and no checksum is bigger than BLAKE2
+    widest = 10 ** 19
+    pieces = [{'file': len(files), 'offset': widest, 'size': widest}] * len(files)
+    manifest = _shard_manifest(uuid.uuid4().hex, count, count, files, pieces)
+    entries = [{'name': SHARD_MANIFEST, 'codec': 'none', 'size': len(manifest), 'stored': len(manifest)}]
+    entries += [{'name': f['name'], 'codec': 'none', 'size': widest, 'stored': widest} for f in files]
+    return len(_build_header(entries, bits_per_channel, checksum='blake2')[1]) + len(manifest)
+
+def plan_shards(cover_paths, secret_paths, bits_per_channel=1, channels=None):
+    # Split the secrets, back to back, over the covers in proportion to what
+    # each one can hold, so every shard takes about as long to embed.
+    # Works from headers and file sizes only. Returns (files, shards) where
+    # every shard is the list of pieces for the cover at the same position.
+    files = [{'name': os.path.basename(path), 'size': os.stat(path).st_size} for path in secret_paths]
+    total = sum(f['size'] for f in files)
+    overhead = _shard_overhead(files, len(cover_paths), bits_per_channel)
+    budgets = [max(0, plan_capacity(cover, [], bits_per_channel, channels=channels)['capacity'] - overhead)
+               for cover in cover_paths]
+    room = sum(budgets)
+    if total > room:
+        raise ValueError(f"❌ Not enough space! Need {total:,} bytes, but the covers only hold {room:,}.")
+
+    sizes = [total * budget // room if room else 0 for budget in budgets]
+    rest = total - sum(sizes)
+    for i, budget in enumerate(budgets):
+        # Rounding leftovers go wherever there is room
+        extra = min(rest, budget - sizes[i])
+        sizes[i] += extra
+        rest -= extra
+
+    shards = []
+    index = pos = 0
+    for size in sizes:
+        pieces = []
+        while size > 0:
+            take = min(size, files[index]['size'] - pos)
+            if take:
+                pieces.append({'file': index, 'offset': pos, 'size': take})
+            pos += take
+            size -= take
+            if pos == files[index]['size']:
+                index, pos = index + 1, 0
+        shards.append(pieces)
+    return files, shards
+
+def embed_sharded(cover_paths, secret_paths, output_paths, workers=None, streaming=False, bits_per_channel=1,
+                  compression='none', encoder='default', channels=None, checksum='crc32'):
+    # Spread the secrets over several covers, one process per shard.
+    # Returns a StegoResult per shard, in cover order.
+    _check_settings(bits_per_channel, compression, checksum)
+    if len(cover_paths) != len(output_paths):
+        raise ValueError("❌ Need exactly one output path per cover.")
+
+    files, shards = plan_shards(cover_paths, secret_paths, bits_per_channel, channels)
+    set_id = uuid.uuid4().hex
+    jobs = []
+    for index, (cover, output, pieces) in enumerate(zip(cover_paths, output_paths, shards)):
+        manifest = _shard_manifest(set_id, index, len(shards), files, pieces)
+        entries = [{'name': SHARD_MANIFEST, 'data': manifest, 'codec': 'none', 'size': len(manifest),
+                    'stored': len(manifest)}]
+        for piece in pieces:
+            path = secret_paths[piece['file']]
+            entries.append({
+                'path': path,
+                'offset': piece['offset'],
+                'name': files[piece['file']]['name'],
+                'size': piece['size'],
+                'codec': _choose_codec(path, piece['size'], compression, _file_blocks(path, piece['offset'])),
+                'stored': piece['size'],
+            })
+        jobs.append((cover, entries, output, streaming, bits_per_channel, encoder, channels, checksum))
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_embed_shard, jobs))
+
+def _embed_shard(job):
+    cover, entries, output, streaming, bits_per_channel, encoder, channels, checksum = job
+    return _embed_entries(cover, entries, output, _Stages(), streaming, CHUNK_SIZE, bits_per_channel, encoder,
+                          channels=channels, checksum=checksum)
+
+def _read_shard(stego_path, stages):
+    # Returns (manifest, reader, body offset of the first piece, piece entries)
+    reader = _open_reader(stego_path, stages)
+    header = _read_header(reader)
+    if header is None or not header[1] or header[1][0]['name'] != SHARD_MANIFEST:
+        raise ValueError(f"❌ {stego_path} is not a shard.")
+    offset, entries = header
+    manifest = json.loads(b''.join(data for data, _ in _entry_chunks(reader, offset, entries[0], stages)))
+    return manifest, reader, offset + entries[0]['stored'], entries[1:]
+
+def extract_sharded(stego_paths, output_dir, workers=None):
+    # Reassemble a shard set: the manifests are read first (a few rows of
+    # every image), the output files are created at full size, then every
+    # shard is decoded in its own process and written in place.
+    # Returns a StegoResult whose stages are summed over all shards.
+    start = time.perf_counter()
+    manifests = [_read_shard(path, _Stages())[0] for path in stego_paths]
+    if len({manifest['set'] for manifest in manifests}) > 1:
+        raise ValueError("❌ The images belong to different shard sets.")
+    count = manifests[0]['count']
+    indexes = sorted(manifest['index'] for manifest in manifests)
+    if indexes != list(range(count)):
+        missing = sorted(set(range(count)) - set(indexes))
+        raise ValueError(f"❌ Incomplete shard set: expected {count} shards, missing {missing or 'none'}"
+                         f" ({len(indexes)} given).")
+
+    os.makedirs(output_dir, exist_ok=True)
+    files = []
+    names = _output_names(entry['name'] for entry in manifests[0]['files'])
+    for entry, name in zip(manifests[0]['files'], names):
+        path = os.path.join(output_dir, name)
+        with open(path, 'wb') as f:
+            f.truncate(entry['size'])
+        files.append({'name': entry['name'], 'codec': 'none', 'size': entry['size'], 'stored': entry['size'],
+                      'path': path})
+
+    targets = [f['path'] for f in files]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        shard_stages = list(pool.map(_extract_shard, stego_paths, [targets] * len(stego_paths)))
+
+    stages = {}
+    for totals in shard_stages:
+        for name, value in totals.items():
+            total = stages.setdefault(name, {'seconds': 0.0, 'bytes': 0})
+            total['seconds'] += value['seconds']
+            total['bytes'] += value['bytes']
+    return StegoResult('extract', output_dir, files, None, stages, time.perf_counter() - start)
+
+def _extract_shard(stego_path, targets):
+    stages = _Stages()
+    manifest, reader, offset, entries = _read_shard(stego_path, stages)
+    for piece, entry in zip(manifest['pieces'], entries):
+        with open(targets[piece['file']], 'r+b') as f:
+            f.seek(piece['offset'])
+            for data, _ in _entry_chunks(reader, offset, entry, stages):
+                with stages.stage('write', len(data)):
+                    f.write(data)
+        offset += entry['stored']
+    _check_container(reader)
+    return stages.totals
\ No newline at end of file
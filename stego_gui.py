@@ -3,17 +3,90 @@ from tkinter import ttk, filedialog, messagebox
 from PIL import Image, ImageTk
 import os
 import threading
+import contextlib
 import io
-import sys
+from concurrent.futures import ThreadPoolExecutor
 
 # Import your modules
 try:
     import steganography
-    import analysis
 except ImportError as e:
     print(f"Error importing modules: {e}")
     print("Make sure steganography.py and analysis.py are in the same folder!")
 
+# analysis brings in OpenCV (and matplotlib for the histogram), which takes
+# longer to import than everything else put together. Only the ANALYSIS tab
+# needs it, so it is imported when that tab is first opened (see load_analysis).
+analysis = None
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+LOGO_PATH = os.path.join(APP_DIR, "steganography_logo.png")
+LOGO_SIZE = 80
+
+def load_analysis():
+    global analysis
+    if analysis is None:
+        import analysis as module
+        analysis = module
+    return analysis
+
+def _cache_dir():
+    base = (os.environ.get('LOCALAPPDATA') or os.environ.get('XDG_CACHE_HOME')
+            or os.path.join(os.path.expanduser('~'), '.cache'))
+    return os.path.join(base, 'stegopro')
+
+def logo_thumbnail(size=LOGO_SIZE):
+    # Path of the logo resized to size x size. The full logo is decoded and
+    # resized once; later launches load the small copy from the cache
+    # (refreshed when the logo changes). None if the cache can't be written.
+    thumb = os.path.join(_cache_dir(), f"logo_{size}.png")
+    try:
+        if os.path.getmtime(thumb) >= os.path.getmtime(LOGO_PATH):
+            return thumb
+    except OSError:
+        pass
+    try:
+        os.makedirs(os.path.dirname(thumb), exist_ok=True)
+        partial = f"{thumb}.{os.getpid()}.tmp"
+        with Image.open(LOGO_PATH) as img:
+            img.resize((size, size), Image.Resampling.LANCZOS).save(partial, "PNG")
+        # Two windows starting at once must not see a half-written file
+        os.replace(partial, thumb)
+        return thumb
+    except OSError:
+        return None
+
+# Jobs that run at the same time; the others wait in the queue. The core
+# functions already spread the bit work of one job over several threads.
+JOB_WORKERS = max(1, min(4, (os.cpu_count() or 1) // 2))
+
+def default_extension(cover):
+    # Save dialog default: keep the cover's own lossless format
+    ext = os.path.splitext(cover)[1].lower()
+    return ext if ext in ('.png', '.bmp', '.tif', '.tiff') else '.png'
+
+class JobCancelled(Exception):
+    pass
+
+class Job:
+    # One queued operation. run(on_event) does the work on a worker thread
+    # (on_event is the core functions' progress hook) and on_done(result)
+    # turns the result into a status text back on the Tk thread.
+    def __init__(self, number, title, run, on_done, tab=None):
+        self.number = number
+        self.title = title
+        self.run = run
+        self.on_done = on_done
+        self.tab = tab  # (progress bar, status label) of the tab it came from
+        self.status = 'queued'
+        self.cancel_requested = threading.Event()
+        self.future = None
+        self.row = None
+
+    @property
+    def finished(self):
+        return self.status in ('done', 'failed', 'cancelled')
+
 class StegoProGUI:
     def __init__(self, root):
         self.root = root
@@ -42,7 +115,14 @@ class StegoProGUI:
         self.secret_files = []
         self.stego_input_path = tk.StringVar()
         self.output_dir = tk.StringVar()
-        self.is_processing = False # Lock to prevent double clicks
+
+        # --- JOB QUEUE ---
+        # Every run is queued instead of rejected while another one is busy
+        self.jobs = []
+        self.job_pool = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="stegopro-job")
+        self.latest_job = {}  # tab progress bar -> the job it currently shows
+        self.stdout_lock = threading.Lock()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
 
         # --- LAYOUT ---
         self.create_header()
@@ -67,6 +147,11 @@ class StegoProGUI:
                   background=[("selected", self.colors["accent_gold"])],
                   foreground=[("selected", "#000000")])
 
+        style.configure("Gold.Horizontal.TProgressbar", troughcolor=self.colors["bg_medium"],
+                        background=self.colors["accent_gold"], borderwidth=0)
+        style.configure("Full.Horizontal.TProgressbar", troughcolor=self.colors["bg_medium"],
+                        background=self.colors["error"], borderwidth=0)
+
     def create_header(self):
         header_h = 110
         self.header_canvas = tk.Canvas(self.root, height=header_h, bg=self.colors["bg_dark"], highlightthickness=0)
@@ -77,9 +162,13 @@ class StegoProGUI:
         self.header_canvas.create_oval(500, 20, 650, 170, outline="white", width=1, dash=(4, 4))
 
         try:
-            pil_img = Image.open("steganography_logo.png")
-            pil_img = pil_img.resize((80, 80), Image.Resampling.LANCZOS)
-            self.logo_photo = ImageTk.PhotoImage(pil_img)
+            thumb = logo_thumbnail()
+            if thumb:
+                # Tk reads the small PNG itself
+                self.logo_photo = tk.PhotoImage(file=thumb)
+            else:
+                pil_img = Image.open(LOGO_PATH).resize((LOGO_SIZE, LOGO_SIZE), Image.Resampling.LANCZOS)
+                self.logo_photo = ImageTk.PhotoImage(pil_img)
             self.header_canvas.create_image(50, 55, image=self.logo_photo, anchor="center")
             text_x = 110
         except:
@@ -104,6 +193,17 @@ class StegoProGUI:
         notebook.add(self.tab_analysis, text="  📊 ANALYSIS  ")
         self.build_analysis_tab()
 
+        self.tab_jobs = ttk.Frame(notebook)
+        notebook.add(self.tab_jobs, text="  📋 JOBS  ")
+        self.build_jobs_tab()
+        notebook.bind("<<NotebookTabChanged>>", self.on_tab_changed)
+
+    def on_tab_changed(self, event):
+        # Import analysis in the background as soon as its tab is opened, so
+        # it is usually ready by the time a button is clicked
+        if analysis is None and event.widget.select() == str(self.tab_analysis):
+            threading.Thread(target=load_analysis, daemon=True).start()
+
     # ========================== TAB 1: EMBED ==========================
     def build_embed_tab(self):
         frame = tk.Frame(self.tab_embed, bg=self.colors["bg_dark"])
@@ -135,9 +235,22 @@ class StegoProGUI:
         self.create_button(btn_box, "Add Files +", self.add_secret_files).pack(fill="x", pady=2)
         self.create_button(btn_box, "Clear List", self.clear_secret_files).pack(fill="x", pady=2)
 
+        # Live capacity: how much of the cover the listed secrets will use
+        cap_box = tk.Frame(frame, bg=self.colors["bg_dark"])
+        cap_box.pack(fill="x", pady=(0, 20))
+        self.capacity_bar = self.create_progress_bar(cap_box)
+        self.capacity_bar.pack(fill="x")
+        self.lbl_capacity = tk.Label(cap_box, text="Capacity: select a cover image", bg=self.colors["bg_dark"], fg="#888", font=("Segoe UI", 9))
+        self.lbl_capacity.pack(anchor="w")
+
         self.btn_run_embed = self.create_main_button(frame, "RUN EMBEDDING PROCESS", self.run_embed)
         self.btn_run_embed.pack(fill="x", side="bottom")
 
+        self.lbl_embed_status = tk.Label(frame, text="Ready", bg=self.colors["bg_dark"], fg=self.colors["accent_gold"], font=("Segoe UI", 10, "bold"))
+        self.lbl_embed_status.pack(side="bottom", pady=5)
+        self.embed_progress = self.create_progress_bar(frame)
+        self.embed_progress.pack(fill="x", side="bottom")
+
     # ========================== TAB 2: EXTRACT ==========================
     def build_extract_tab(self):
         frame = tk.Frame(self.tab_extract, bg=self.colors["bg_dark"])
@@ -164,6 +277,8 @@ class StegoProGUI:
         # STATUS LABEL (To show "Processing..." when it freezes)
         self.lbl_status = tk.Label(frame, text="Ready", bg=self.colors["bg_dark"], fg=self.colors["accent_gold"], font=("Segoe UI", 10, "bold"))
         self.lbl_status.pack(side="bottom", pady=5)
+        self.extract_progress = self.create_progress_bar(frame)
+        self.extract_progress.pack(fill="x", side="bottom")
 
         self.btn_run_extract = self.create_main_button(frame, "DECRYPT & EXTRACT FILES", self.run_extract)
         self.btn_run_extract.pack(fill="x", side="bottom")
@@ -191,11 +306,40 @@ class StegoProGUI:
         self.create_button(box2, "...", lambda: self.path_ana_stego.set(filedialog.askopenfilename())).pack(side="right")
 
         btn_frame = tk.Frame(frame, bg=self.colors["bg_dark"])
-        btn_frame.pack(fill="x", pady=30)
+        btn_frame.pack(fill="x", pady=10)
         
         self.create_main_button(btn_frame, "SHOW HISTOGRAM", lambda: self.run_analysis("hist")).pack(fill="x", pady=5)
         self.create_main_button(btn_frame, "CALCULATE PSNR & SIZE", lambda: self.run_analysis("stats")).pack(fill="x", pady=5)
 
+        # The histogram is rendered off-screen by a job and shown here
+        self.hist_canvas = tk.Canvas(frame, bg=self.colors["bg_medium"], highlightthickness=0)
+        self.hist_canvas.pack(fill="both", expand=True, pady=(10, 0))
+        self.hist_photo = None
+
+    # ========================== TAB 4: JOBS ==========================
+    def build_jobs_tab(self):
+        frame = tk.Frame(self.tab_jobs, bg=self.colors["bg_dark"])
+        frame.pack(fill="both", expand=True, padx=20, pady=20)
+
+        top = tk.Frame(frame, bg=self.colors["bg_dark"])
+        top.pack(fill="x", pady=(0, 10))
+        self.lbl_jobs = ttk.Label(top, text="No jobs yet", style="Header.TLabel")
+        self.lbl_jobs.pack(side="left")
+        self.create_button(top, "Clear Finished", self.clear_finished_jobs).pack(side="right")
+
+        # Scrollable list of job rows: a frame inside a canvas
+        box = tk.Frame(frame, bg=self.colors["bg_medium"])
+        box.pack(fill="both", expand=True)
+        canvas = tk.Canvas(box, bg=self.colors["bg_medium"], highlightthickness=0)
+        scrollbar = ttk.Scrollbar(box, orient="vertical", command=canvas.yview)
+        self.job_list = tk.Frame(canvas, bg=self.colors["bg_medium"])
+        self.job_list.bind("<Configure>", lambda e: canvas.configure(scrollregion=canvas.bbox("all")))
+        window = canvas.create_window((0, 0), window=self.job_list, anchor="nw")
+        canvas.bind("<Configure>", lambda e: canvas.itemconfigure(window, width=e.width))
+        canvas.configure(yscrollcommand=scrollbar.set)
+        canvas.pack(side="left", fill="both", expand=True)
+        scrollbar.pack(side="right", fill="y")
+
     def create_footer(self):
         lbl = tk.Label(self.root, text="Developed for Cybersecurity Steganography", 
                        bg=self.colors["bg_dark"], fg="#666", font=("Segoe UI", 8))
@@ -215,6 +359,142 @@ class StegoProGUI:
         btn.config(highlightbackground=self.colors["accent_gold"], highlightthickness=1)
         return btn
 
+    def create_progress_bar(self, parent):
+        return ttk.Progressbar(parent, style="Gold.Horizontal.TProgressbar", mode="determinate", maximum=100)
+
+    def progress_hook(self, bar, label):
+        # Builds an on_event hook for the core functions. It is called from
+        # the worker thread, so every widget update goes through root.after,
+        # and only when the stage or the whole percentage actually changes.
+        last = {'stage': None, 'percent': -1}
+
+        def on_event(event):
+            if event['event'] == 'progress' and event['total']:
+                percent = int(100 * event['bytes'] / event['total'])
+                if percent != last['percent']:
+                    last['percent'] = percent
+                    self.root.after(0, lambda: bar.config(value=percent))
+            elif event['event'] == 'start' and event['stage'] != last['stage']:
+                last['stage'] = stage = event['stage']
+                self.root.after(0, lambda: label.config(text=f"Processing... ({stage})", fg="white"))
+
+        return on_event
+
+    # ========================== JOB QUEUE ==========================
+    def submit_job(self, title, run, on_done, tab=None):
+        # Queue run(on_event) on the worker pool and add its row to the JOBS
+        # tab. tab: (progress bar, status label) that follow the newest job
+        # started from that tab.
+        job = Job(len(self.jobs) + 1, title, run, on_done, tab)
+        self.jobs.append(job)
+        self.add_job_row(job)
+        if tab:
+            self.latest_job[tab[0]] = job
+            tab[0].config(value=0)
+            ahead = sum(1 for other in self.jobs if not other.finished) - 1
+            tab[1].config(text=f"Queued as job #{job.number} ({ahead} ahead, see JOBS)", fg="white")
+        job.future = self.job_pool.submit(self.run_job, job)
+        self.update_job_counts()
+        return job
+
+    def add_job_row(self, job):
+        row = tk.Frame(self.job_list, bg=self.colors["bg_dark"], padx=8, pady=6)
+        row.pack(fill="x", padx=6, pady=3)
+        line = tk.Frame(row, bg=self.colors["bg_dark"])
+        line.pack(fill="x")
+        tk.Label(line, text=f"#{job.number}  {job.title}", bg=self.colors["bg_dark"], fg=self.colors["text_primary"],
+                 font=("Segoe UI", 9, "bold"), anchor="w").pack(side="left", fill="x", expand=True)
+        cancel = self.create_button(line, "Cancel", lambda: self.cancel_job(job))
+        cancel.pack(side="right")
+        status = tk.Label(row, text="Queued", bg=self.colors["bg_dark"], fg="#888", font=("Segoe UI", 9), anchor="w")
+        status.pack(fill="x")
+        bar = self.create_progress_bar(row)
+        bar.pack(fill="x")
+        job.row = {'frame': row, 'status': status, 'bar': bar, 'cancel': cancel}
+
+    def run_job(self, job):
+        # Runs on a pool thread. Widgets are only touched through root.after
+        if job.cancel_requested.is_set():
+            # Cancelled just as it was picked up
+            self.root.after(0, lambda: self.finish_job(job, 'cancelled', "Cancelled", "#888"))
+            return
+        job.status = 'running'
+        self.root.after(0, lambda: job.row['status'].config(text="Running...", fg="white"))
+        self.root.after(0, self.update_job_counts)
+        row_hook = self.progress_hook(job.row['bar'], job.row['status'])
+        tab_hook = self.progress_hook(*job.tab) if job.tab else None
+
+        def on_event(event):
+            # Called between chunks: the cheapest place to stop a job
+            if job.cancel_requested.is_set():
+                raise JobCancelled()
+            row_hook(event)
+            if tab_hook and self.latest_job.get(job.tab[0]) is job:
+                tab_hook(event)
+
+        try:
+            result = job.run(on_event)
+            if job.cancel_requested.is_set():
+                # Work that can't be interrupted still finishes; drop it
+                raise JobCancelled()
+        except JobCancelled:
+            self.root.after(0, lambda: self.finish_job(job, 'cancelled', "Cancelled", "#888"))
+        except Exception as e:
+            # The core's errors already start with ❌
+            message = f"Failed ❌ {str(e).removeprefix('❌').strip()}"
+            self.root.after(0, lambda: self.finish_job(job, 'failed', message, self.colors["error"]))
+        else:
+            # Embed/extract results also list their time per stage in the row
+            details = result.timing_table() if isinstance(result, steganography.StegoResult) else None
+            self.root.after(0, lambda: self.finish_job(job, 'done', job.on_done(result), self.colors["success"], details))
+
+    def finish_job(self, job, status, text, color, details=None):
+        job.status = status
+        job.row['status'].config(text=text, fg=color)
+        job.row['cancel'].config(state="disabled")
+        if status == 'done':
+            job.row['bar'].config(value=100)
+        if details:
+            tk.Label(job.row['frame'], text=details, bg=self.colors["bg_dark"], fg="#888", font=("Consolas", 9),
+                     anchor="w", justify="left").pack(fill="x")
+        if job.tab and self.latest_job.get(job.tab[0]) is job:
+            if status == 'done':
+                job.tab[0].config(value=100)
+            job.tab[1].config(text=text, fg=color)
+        self.update_job_counts()
+
+    def cancel_job(self, job):
+        if job.finished:
+            return
+        job.cancel_requested.set()
+        if job.future.cancel():
+            # Still waiting in the queue: it never starts
+            self.finish_job(job, 'cancelled', "Cancelled", "#888")
+        else:
+            job.row['status'].config(text="Cancelling...", fg="white")
+
+    def clear_finished_jobs(self):
+        for job in self.jobs:
+            if job.finished and job.row:
+                job.row['frame'].destroy()
+                job.row = None
+        self.update_job_counts()
+
+    def update_job_counts(self):
+        counts = {}
+        for job in self.jobs:
+            counts[job.status] = counts.get(job.status, 0) + 1
+        text = ", ".join(f"{counts[status]} {status}" for status in ('running', 'queued', 'done', 'failed', 'cancelled')
+                         if counts.get(status))
+        self.lbl_jobs.config(text=text or "No jobs yet")
+
+    def on_close(self):
+        # Stop at the next chunk instead of finishing the whole queue
+        for job in self.jobs:
+            job.cancel_requested.set()
+        self.job_pool.shutdown(wait=False, cancel_futures=True)
+        self.root.destroy()
+
     # ========================== LOGIC ==========================
     
     # --- EMBED LOGIC ---
@@ -228,20 +508,44 @@ class StegoProGUI:
         if path:
             self.cover_path.set(path)
             self.lbl_cover_preview.config(text=os.path.basename(path), fg=self.colors["accent_gold"])
+            self.update_capacity()
 
     def add_secret_files(self):
         paths = filedialog.askopenfilenames()
         for path in paths:
             self.secret_files.append(path)
             self.list_secrets.insert(tk.END, os.path.basename(path))
+        self.update_capacity()
 
     def clear_secret_files(self):
         self.secret_files = []
         self.list_secrets.delete(0, tk.END)
+        self.update_capacity()
+
+    def update_capacity(self):
+        # Header and file sizes only, so this is cheap enough to run on every change
+        cover = self.cover_path.get()
+        if not cover:
+            return
+        try:
+            # Planned for the format the save dialog offers first
+            fmt = Image.registered_extensions()[default_extension(cover)]
+            plan = steganography.plan_capacity(cover, self.secret_files, fmt=fmt)
+        except Exception as e:
+            self.capacity_bar.config(value=0)
+            self.lbl_capacity.config(text=f"Capacity: cannot read cover ({e})", fg=self.colors["error"])
+            return
+
+        percent = 100 * plan['used'] / plan['capacity'] if plan['capacity'] else 100
+        text = f"Capacity: {plan['used']:,} / {plan['capacity']:,} bytes used ({percent:.1f}%)"
+        if plan['fits']:
+            self.capacity_bar.config(value=percent, style="Gold.Horizontal.TProgressbar")
+            self.lbl_capacity.config(text=f"{text}, {plan['left']:,} left", fg=self.colors["text_primary"])
+        else:
+            self.capacity_bar.config(value=100, style="Full.Horizontal.TProgressbar")
+            self.lbl_capacity.config(text=f"{text}, {-plan['left']:,} too many", fg=self.colors["error"])
 
     def run_embed(self):
-        if self.is_processing: return
-        
         cover = self.cover_path.get()
         secrets = self.secret_files
         
@@ -250,34 +554,29 @@ class StegoProGUI:
             return
 
         out_path = filedialog.asksaveasfilename(
-            defaultextension=".png", 
+            defaultextension=default_extension(cover), 
             filetypes=[("PNG Image", "*.png"), ("BMP Image", "*.bmp"), ("TIFF Image", "*.tiff")]
         )
         if not out_path:
             return
 
-        # Disable button and set flag
-        self.is_processing = True
-        self.btn_run_embed.config(text="PROCESSING... PLEASE WAIT", state="disabled", bg="#555")
-
-        # THREADED WORKER FUNCTION
-        def worker():
-            try:
-                steganography.embed_multiple_files(cover, secrets, out_path)
-                # Success Message (Must be scheduled back to main thread or called safely)
-                self.root.after(0, lambda: messagebox.showinfo("Success", f"Data embedded successfully!\nSaved at: {out_path}"))
-            except Exception as e:
-                self.root.after(0, lambda: messagebox.showerror("Error", f"Embedding failed: {str(e)}"))
-            finally:
-                # Reset button state
-                self.root.after(0, lambda: self.reset_embed_button())
-
-        # Start the thread
-        threading.Thread(target=worker, daemon=True).start()
-
-    def reset_embed_button(self):
-        self.is_processing = False
-        self.btn_run_embed.config(text="RUN EMBEDDING PROCESS", state="normal", bg=self.colors["bg_dark"])
+        # Planned for the chosen format: only a TIFF output keeps the extra pages
+        try:
+            plan = steganography.plan_capacity(cover, secrets, fmt=steganography.output_format(out_path))
+        except Exception as e:
+            messagebox.showerror("Error", f"Cannot read the cover or secret files: {str(e)}")
+            return
+        if not plan['fits']:
+            messagebox.showerror("Error", f"The secret files don't fit: they need {plan['used']:,} bytes, but the cover holds {plan['capacity']:,}.")
+            return
+
+        # Queued: the next run can be set up right away
+        secrets = list(secrets)
+        self.submit_job(
+            f"Embed {len(secrets)} file(s) into {os.path.basename(out_path)}",
+            lambda on_event: steganography.embed_multiple_files(cover, secrets, out_path, on_event=on_event),
+            lambda result: f"Embedding Complete ✅ ({result.seconds:.2f} s): {out_path}",
+            (self.embed_progress, self.lbl_embed_status))
 
     # --- EXTRACT LOGIC ---
     def select_stego_image(self):
@@ -292,8 +591,6 @@ class StegoProGUI:
             self.lbl_stego_preview.config(text=os.path.basename(path), fg=self.colors["accent_gold"])
 
     def run_extract(self):
-        if self.is_processing: return
-
         stego = self.stego_input_path.get()
         if not stego:
             messagebox.showerror("Error", "Please select a steganography image first.")
@@ -305,29 +602,11 @@ class StegoProGUI:
             
         final_dir = os.path.join(out_dir, "Secret_files")
         
-        # Disable button and set flag
-        self.is_processing = True
-        self.btn_run_extract.config(text="EXTRACTING... PLEASE WAIT", state="disabled", bg="#555")
-        self.lbl_status.config(text="Processing... (This may take a minute)", fg="white")
-
-        # THREADED WORKER FUNCTION
-        def worker():
-            try:
-                steganography.extract_multiple_files(stego, final_dir)
-                self.root.after(0, lambda: messagebox.showinfo("Success", f"Files extracted successfully!\nCheck folder: {final_dir}"))
-                self.root.after(0, lambda: self.lbl_status.config(text="Extraction Complete ✅", fg=self.colors["success"]))
-            except Exception as e:
-                self.root.after(0, lambda: messagebox.showerror("Error", f"Extraction failed: {str(e)}"))
-                self.root.after(0, lambda: self.lbl_status.config(text="Extraction Failed ❌", fg=self.colors["error"]))
-            finally:
-                self.root.after(0, lambda: self.reset_extract_button())
-
-        # Start the thread
-        threading.Thread(target=worker, daemon=True).start()
-
-    def reset_extract_button(self):
-        self.is_processing = False
-        self.btn_run_extract.config(text="DECRYPT & EXTRACT FILES", state="normal", bg=self.colors["bg_dark"])
+        self.submit_job(
+            f"Extract {os.path.basename(stego)}",
+            lambda on_event: steganography.extract_multiple_files(stego, final_dir, on_event=on_event),
+            lambda result: f"Extraction Complete ✅ ({result.seconds:.2f} s): {len(result.files)} file(s) in {final_dir}",
+            (self.extract_progress, self.lbl_status))
 
     # --- ANALYSIS LOGIC ---
     def run_analysis(self, mode):
@@ -338,38 +617,41 @@ class StegoProGUI:
             messagebox.showerror("Error", "Please select both Original and Stego images.")
             return
 
-        # Simple tasks can run on main thread, but charts block too. 
-        # Matplotlib blocks naturally, so we accept that, or we thread it.
-        # Let's thread statistics at least.
-        
+        name = f"{os.path.basename(orig)} vs {os.path.basename(stego)}"
         if mode == "stats":
-            def worker():
-                try:
-                    buffer = io.StringIO()
-                    original_stdout = sys.stdout
-                    sys.stdout = buffer
-                    
-                    analysis.calculate_psnr(orig, stego)
-                    print("-" * 30) 
-                    analysis.compare_file_size(orig, stego)
-                    
-                    output_text = buffer.getvalue()
-                    sys.stdout = original_stdout
-                    
-                    self.root.after(0, lambda: messagebox.showinfo("Analysis Results", output_text))
-                except Exception as e:
-                    if 'original_stdout' in locals(): sys.stdout = original_stdout
-                    self.root.after(0, lambda: messagebox.showerror("Error", f"Analysis failed: {str(e)}"))
-
-            threading.Thread(target=worker, daemon=True).start()
-            
+            self.submit_job(f"PSNR & size: {name}", lambda on_event: self.analysis_text(orig, stego),
+                            self.show_analysis_text)
         elif mode == "hist":
-            # Matplotlib must run in main thread usually, or it crashes tkinter.
-            # We keep this one on main thread.
-            try:
-                analysis.show_histogram(orig, stego)
-            except Exception as e:
-                messagebox.showerror("Error", f"Analysis failed: {str(e)}")
+            # Decoding, binning and drawing all happen on the worker; only
+            # the finished picture is put on the canvas
+            width = max(self.hist_canvas.winfo_width(), 400)
+            height = max(self.hist_canvas.winfo_height(), 200)
+            self.hist_canvas.delete("all")
+            self.hist_canvas.create_text(width // 2, height // 2, text="Rendering histogram...", fill="#888")
+            self.submit_job(f"Histogram: {name}",
+                            lambda on_event: load_analysis().render_histogram(orig, stego, width, height),
+                            self.show_histogram_image)
+
+    def analysis_text(self, orig, stego):
+        # The analysis functions print their report. stdout is shared by
+        # every thread, so only one job captures it at a time
+        analysis = load_analysis()
+        buffer = io.StringIO()
+        with self.stdout_lock, contextlib.redirect_stdout(buffer):
+            analysis.calculate_psnr(orig, stego)
+            print("-" * 30)
+            analysis.compare_file_size(orig, stego)
+        return buffer.getvalue()
+
+    def show_analysis_text(self, text):
+        messagebox.showinfo("Analysis Results", text)
+        return "Done ✅"
+
+    def show_histogram_image(self, image):
+        self.hist_photo = ImageTk.PhotoImage(image)
+        self.hist_canvas.delete("all")
+        self.hist_canvas.create_image(0, 0, image=self.hist_photo, anchor="nw")
+        return "Done ✅ (see ANALYSIS)"
 
 if __name__ == "__main__":
     root = tk.Tk()
@@ -0,0 +1,40 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(0)
+
+
+@pytest.fixture
+def make_cover(tmp_path, rng):
+    # Writes a noisy cover image and returns its path
+    def make(name='cover.png', size=(64, 48), mode='RGB', **save_options):
+        width, height = size
+        bands = len(Image.new(mode, (1, 1)).getbands())
+        if mode.startswith('I;16'):
+            arr = rng.integers(0, 1 << 16, (height, width), dtype=np.uint16)
+        else:
+            arr = rng.integers(0, 256, (height, width, bands), dtype=np.uint8)
+            arr = arr[:, :, 0] if bands == 1 else arr
+        path = tmp_path / name
+        Image.fromarray(arr).save(path, **save_options)
+        return str(path)
+    return make
+
+
+@pytest.fixture
+def make_secret(tmp_path, rng):
+    # Writes a secret file (random bytes unless data is given) and returns its path
+    def make(name='secret.bin', size=1000, data=None):
+        path = tmp_path / name
+        path.write_bytes(rng.integers(0, 256, size, dtype=np.uint8).tobytes() if data is None else data)
+        return str(path)
+    return make
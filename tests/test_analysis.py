@@ -0,0 +1,133 @@
+import io
+import json
+import math
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+import analysis
+import steganography
+
+
+def test_report_statistics_match_opencv(tmp_path, make_cover):
+    original = make_cover('original.png')
+    img = cv2.imread(original)
+    img[10:12, 20:25] ^= 1
+    stego = str(tmp_path / 'stego.png')
+    cv2.imwrite(stego, img)
+
+    report = analysis.analyze(original, stego)
+    assert report.psnr == pytest.approx(cv2.PSNR(cv2.imread(original), img))
+    assert report.changed_pixels == 10
+    assert report.bbox == (20, 10, 25, 12)
+    assert report.size_difference == os.path.getsize(stego) - os.path.getsize(original)
+    assert report.hist_original.sum(axis=1).tolist() == [64 * 48] * 3
+
+
+def test_images_are_decoded_once_until_they_change(tmp_path, make_cover):
+    original, stego = make_cover('original.png'), make_cover('stego.png')
+    report = analysis.analyze(original, stego)
+    assert analysis.analyze(original, stego) is report
+    assert analysis.load_image(original) is analysis.load_image(original)
+    with pytest.raises(ValueError):
+        analysis.load_image(original)[0, 0, 0] = 0
+
+    # A rewritten file is a new cache key
+    img = cv2.imread(stego)
+    cv2.imwrite(stego, np.ascontiguousarray(img[:, ::-1]))
+    st = os.stat(stego)
+    os.utime(stego, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert analysis.analyze(original, stego) is not report
+    assert np.array_equal(analysis.load_image(stego), img[:, ::-1])
+
+
+def test_psnr_reports_a_missing_or_unreadable_payload(tmp_path, make_cover, make_secret, monkeypatch, capsys):
+    original = make_cover('original.png')
+    stego = str(tmp_path / 'stego.png')
+    # Written as an unsupported container version: the header can't be read
+    monkeypatch.setattr(steganography, 'FORMAT_VERSION', steganography.FORMAT_VERSION + 1)
+    steganography.embed_multiple_files(original, [make_secret()], stego)
+    monkeypatch.undo()
+
+    assert analysis.calculate_psnr(original, original) > 60
+    assert "Payload: none found" in capsys.readouterr().out
+    assert analysis.calculate_psnr(original, stego) > 40
+    assert "Payload: unreadable (Unsupported container version" in capsys.readouterr().out
+
+    def truncated(stego):
+        raise OSError("image file is truncated")
+
+    monkeypatch.setattr(steganography, 'stego_info', truncated)
+    analysis.calculate_psnr(original, stego)
+    assert "Payload: unreadable (image file is truncated)" in capsys.readouterr().out
+
+
+def _smooth_image(rng):
+    # Gradients and a little noise: LSBs of a natural image are not random
+    y, x = np.mgrid[0:128, 0:128]
+    base = (60 + 40 * np.sin(x / 9.0) + 30 * np.cos(y / 13.0))[..., None] + np.array([0, 20, 40])
+    return np.clip(base + rng.normal(0, 2, (128, 128, 3)), 0, 255).astype(np.uint8)
+
+
+def _embed_random_bits(img, fraction, rng):
+    # What a sequential LSB embedder leaves: random LSBs over a prefix
+    flat = img.copy().reshape(-1)
+    n = int(len(flat) * fraction)
+    flat[:n] = (flat[:n] & 0xFE) | rng.integers(0, 2, n, dtype=np.uint8)
+    return flat.reshape(img.shape)
+
+
+def test_detectors_track_the_embedded_fraction(rng):
+    clean = _smooth_image(rng)
+    half, full = _embed_random_bits(clean, 0.5, rng), _embed_random_bits(clean, 1.0, rng)
+    rates = {name: analysis.detect_lsb(img) for name, img in (('clean', clean), ('half', half), ('full', full))}
+
+    for key in ('rs_rate', 'spa_rate'):
+        assert rates['clean'][key] < 0.15
+        assert 0.3 < rates['half'][key] < 0.7
+        assert rates['full'][key] > 0.9
+    assert rates['clean']['chi2_embedded_fraction'] < rates['half']['chi2_embedded_fraction']
+    assert rates['full']['chi2_embedded_fraction'] == 1.0
+
+
+def test_scan_csv_has_a_row_per_image(tmp_path, make_cover):
+    for name in ('a.png', 'b.bmp', 'c.tif'):
+        make_cover(name)
+    (tmp_path / 'notes.txt').write_text('not an image')
+    (tmp_path / 'broken.png').write_bytes(b'not a png')
+    out = tmp_path / 'report.csv'
+    assert analysis.scan_directory(str(tmp_path), str(out), 'csv', workers=2) == 4
+
+    lines = out.read_text(encoding='utf-8').splitlines()
+    assert lines[0].split(',') == analysis.SCAN_FIELDS
+    rows = {line.split(',')[0].rsplit('/', 1)[-1]: line for line in lines[1:]}
+    assert sorted(rows) == ['a.png', 'b.bmp', 'broken.png', 'c.tif']
+    assert rows['broken.png'].endswith('could not read image')
+
+
+def _strict_loads(line):
+    # json.loads accepts the NaN/Infinity tokens, a strict reader doesn't
+    def reject(token):
+        raise ValueError(f"not JSON: {token}")
+    return json.loads(line, parse_constant=reject)
+
+
+def test_scan_jsonl_writes_null_for_undefined_rates(tmp_path, make_cover):
+    make_cover('noise.png')
+    # Narrower than the RS mask: no groups to count, rs_analysis is NaN
+    make_cover('narrow.png', size=(3, 8))
+    assert math.isnan(analysis.rs_analysis(str(tmp_path / 'narrow.png')))
+
+    out = io.StringIO()
+    assert analysis.scan_directory(str(tmp_path), out, 'jsonl', workers=1) == 2
+    rows = {row['path'].rsplit('/', 1)[-1]: row for row in map(_strict_loads, out.getvalue().splitlines())}
+    assert rows['narrow.png']['rs_rate'] is None
+    assert rows['narrow.png']['error'] == ''
+    assert isinstance(rows['noise.png']['rs_rate'], float)
+
+
+def test_json_row_keeps_finite_values():
+    row = {'path': 'a.png', 'rate': 0.25, 'nan': float('nan'), 'inf': float('-inf'), 'count': 3}
+    assert analysis.json_row(row) == {'path': 'a.png', 'rate': 0.25, 'nan': None, 'inf': None, 'count': 3}
@@ -0,0 +1,31 @@
+import json
+
+import pytest
+
+import benchmark
+
+
+@pytest.mark.parametrize('text, size', [('1KB', 1024), ('2MB', 2 * 1024 ** 2), ('0.5', 500), ('max', 1000),
+                                        ('300', 300)])
+def test_parse_size(text, size):
+    assert benchmark.parse_size(text, 1000) == size
+
+
+def test_small_run_writes_results_and_flags_regressions(tmp_path):
+    output = tmp_path / 'results.json'
+    argv = ['--sizes', '0.01', '--formats', 'png', '--payloads', '1KB', '--ops', 'embed,extract,psnr',
+            '--output', str(output)]
+    assert benchmark.main(argv) == 0
+
+    results = json.loads(output.read_text(encoding='utf-8'))['results']
+    assert [(row['case'], row['op']) for row in results] == [('0.01MP-RGB-png-1KB', op)
+                                                             for op in ('embed', 'extract', 'psnr')]
+    assert all(row['seconds'] > 0 for row in results)
+    assert 0.3 < results[0]['changes_per_bit'] < 0.7
+
+    # A baseline that was 1000x faster is a regression everywhere
+    baseline = tmp_path / 'baseline.json'
+    for row in results:
+        row['seconds'] /= 1000
+    baseline.write_text(json.dumps({'results': results}), encoding='utf-8')
+    assert benchmark.main(argv + ['--baseline', str(baseline)]) == 1
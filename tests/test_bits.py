@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+import steganography
+
+
+@pytest.mark.parametrize('bits', [1, 2, 3, 4])
+def test_k_bit_round_trip_touches_only_low_bits(tmp_path, make_cover, make_secret, bits):
+    cover, secret = make_cover(size=(80, 60)), make_secret(size=1500)
+    output = str(tmp_path / 'out.png')
+    steganography.embed_multiple_files(cover, [secret], output, bits_per_channel=bits)
+
+    assert steganography.stego_info(output)['bits_per_channel'] == bits
+    with open(secret, 'rb') as f:
+        assert bytes(dict(steganography.extract_bytes(output))['secret.bin']) == f.read()
+    high = ~np.uint8((1 << bits) - 1)
+    assert np.array_equal(np.asarray(Image.open(cover)) & high, np.asarray(Image.open(output)) & high)
+
+
+def test_capacity_grows_with_bits(make_cover, make_secret):
+    cover, secret = make_cover(size=(80, 60)), make_secret(size=10)
+    capacities = [steganography.plan_capacity(cover, [secret], bits)['capacity'] for bits in (1, 2, 3, 4)]
+    # The 16-byte signature always takes 128 samples (43 whole RGB pixels)
+    body = 80 * 60 * 3 - 43 * 3
+    assert capacities == [body * bits // 8 for bits in (1, 2, 3, 4)]
+
+
+@pytest.mark.parametrize('bits', [0, 5])
+def test_bits_out_of_range(tmp_path, make_cover, make_secret, bits):
+    with pytest.raises(ValueError):
+        steganography.embed_multiple_files(make_cover(), [make_secret()], str(tmp_path / 'out.png'),
+                                           bits_per_channel=bits)
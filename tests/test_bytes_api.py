@@ -0,0 +1,43 @@
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import steganography
+
+SECRETS = [('a.txt', b'hello ' * 50), ('b.bin', bytes(range(256)) * 2), ('empty', b'')]
+
+
+def _cover_bytes(rng, fmt='PNG'):
+    buffer = io.BytesIO()
+    Image.fromarray(rng.integers(0, 256, (48, 64, 3), dtype=np.uint8)).save(buffer, fmt)
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize('fmt', ['PNG', 'BMP', 'TIFF'])
+def test_bytes_round_trip(rng, fmt):
+    stego = steganography.embed_bytes(_cover_bytes(rng, fmt), SECRETS)
+    with Image.open(io.BytesIO(stego)) as img:
+        assert img.format == fmt
+    files = steganography.extract_bytes(stego)
+    assert [(name, bytes(data)) for name, data in files] == SECRETS
+    assert all(isinstance(data, memoryview) for _, data in files)
+
+
+def test_other_sources_and_formats(rng):
+    cover = rng.integers(0, 256, (48, 64, 3), dtype=np.uint8)
+    # An array cover is written as PNG unless told otherwise
+    stego = steganography.embed_bytes(cover, SECRETS, compression='zlib')
+    assert stego.startswith(b'\x89PNG')
+    stego = steganography.embed_bytes(memoryview(_cover_bytes(rng)), SECRETS, fmt='BMP')
+    assert stego.startswith(b'BM')
+    # A file object and the decoded pixels read the same
+    assert dict(steganography.extract_bytes(io.BytesIO(stego)))['a.txt'] == SECRETS[0][1]
+    pixels = np.asarray(Image.open(io.BytesIO(stego)))
+    assert bytes(dict(steganography.extract_bytes(pixels))['b.bin']) == SECRETS[1][1]
+
+
+def test_secrets_too_big(rng):
+    with pytest.raises(ValueError, match="Not enough space"):
+        steganography.embed_bytes(_cover_bytes(rng), [('big', bytes(5000))])
@@ -0,0 +1,48 @@
+import pytest
+from PIL import Image
+
+import steganography
+
+
+@pytest.mark.parametrize('bits', [1, 2, 3])
+def test_plan_is_exact(tmp_path, make_cover, make_secret, bits):
+    cover = make_cover(size=(80, 60))
+    other = make_secret('other.txt', size=100)
+    left = steganography.plan_capacity(cover, [other, make_secret(data=b'')], bits)['left']
+
+    fill = make_secret(size=left)
+    plan = steganography.plan_capacity(cover, [other, fill], bits)
+    assert plan['fits'] and plan['left'] == 0 and plan['exact']
+    steganography.embed_multiple_files(cover, [other, fill], str(tmp_path / 'full.png'), bits_per_channel=bits)
+
+    fill = make_secret(size=left + 1)
+    assert not steganography.plan_capacity(cover, [other, fill], bits)['fits']
+    with pytest.raises(ValueError, match="Not enough space"):
+        steganography.embed_multiple_files(cover, [other, fill], str(tmp_path / 'over.png'), bits_per_channel=bits)
+
+
+def test_plan_reads_no_pixels(monkeypatch, make_cover, make_secret):
+    cover, secret = make_cover(), make_secret()
+
+    def no_decoding(self):
+        raise AssertionError("pixels decoded")
+
+    monkeypatch.setattr(Image.Image, 'load', no_decoding)
+    plan = steganography.plan_capacity(cover, [secret])
+    assert (plan['width'], plan['height'], plan['mode']) == (64, 48, 'RGB')
+    assert plan['used'] == plan['overhead'] + 1000
+
+
+def test_plan_with_compression_is_an_upper_bound(make_cover, make_secret):
+    plan = steganography.plan_capacity(make_cover(), [make_secret()], compression='auto')
+    assert not plan['exact']
+    assert plan['used'] >= 1000
+
+
+def test_plan_follows_the_carrier_channels(make_cover, make_secret):
+    rgba, secret = make_cover('cover.png', mode='RGBA'), make_secret(size=10)
+    default = steganography.plan_capacity(rgba, [secret])
+    with_alpha = steganography.plan_capacity(rgba, [secret], channels='RGBA')
+    green = steganography.plan_capacity(rgba, [secret], channels='G')
+    assert (default['channels'], with_alpha['channels'], green['channels']) == ('RGB', 'RGBA', 'G')
+    assert green['capacity'] < default['capacity'] < with_alpha['capacity']
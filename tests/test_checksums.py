@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+import main
+import steganography
+
+
+def _flip_lsb(path, sample):
+    # Flip the lowest bit of one sample, as a damaged or edited image would
+    arr = np.array(Image.open(path))
+    arr.reshape(-1)[sample] ^= 1
+    Image.fromarray(arr).save(path)
+
+
+def _legacy_image(path, rng, files):
+    # The old delimiter format: [EXT 8, padded with #] + [DATA] + [####] per
+    # file, one bit per RGB sample, most significant bit first
+    arr = rng.integers(0, 256, (48, 64, 3), dtype=np.uint8)
+    payload = b''.join(ext.ljust(8, b'#') + data + b'####' for ext, data in files)
+    bits = np.unpackbits(np.frombuffer(payload, dtype=np.uint8))
+    flat = arr.reshape(-1)
+    flat[:len(bits)] = (flat[:len(bits)] & 0xFE) | bits
+    Image.fromarray(arr).save(path)
+    return str(path)
+
+
+@pytest.mark.parametrize('checksum', steganography.CHECKSUMS)
+def test_verify_passes_an_intact_image(tmp_path, make_cover, make_secret, checksum):
+    output = str(tmp_path / 'out.png')
+    steganography.embed_multiple_files(make_cover(), [make_secret()], output, checksum=checksum)
+    result = steganography.verify(output)
+    assert result.valid is True
+    assert [entry['ok'] for entry in result.files] == [True]
+    assert ('blake2' in result.files[0]) == (checksum == 'blake2')
+
+
+@pytest.mark.parametrize('checksum', steganography.CHECKSUMS)
+def test_verify_catches_a_flipped_payload_bit(tmp_path, make_cover, make_secret, checksum):
+    output = str(tmp_path / 'out.png')
+    steganography.embed_multiple_files(make_cover(), [make_secret()], output, checksum=checksum)
+    _flip_lsb(output, 5000)
+
+    result = steganography.verify(output)
+    assert result.valid is False
+    assert [entry['ok'] for entry in result.files] == [False]
+    with pytest.raises(ValueError, match="mismatch"):
+        steganography.extract_bytes(output)
+
+
+def test_verify_legacy_image_has_nothing_to_check(tmp_path, rng, capsys):
+    stego = _legacy_image(tmp_path / 'old.png', rng, [(b'.txt', b'hello'), (b'.bin', b'\x00\x01\x02')])
+    result = steganography.verify(stego)
+    assert result.valid is None
+    assert [(entry['name'], entry['size'], entry['ok']) for entry in result.files] == [
+        ('secret_0.txt', 5, None), ('secret_1.bin', 3, None)]
+    assert "no checksums (legacy format)" in result.summary()
+
+    # Not counted as a damaged image by the batch verify
+    assert main.main(['--workers', '1', 'verify', stego]) == 0
+    assert "1/1 succeeded" in capsys.readouterr().out
+
+
+def test_verify_image_without_payload_is_invalid(make_cover):
+    result = steganography.verify(make_cover())
+    assert result.valid is False
+    assert result.files == []
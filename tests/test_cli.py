@@ -0,0 +1,77 @@
+import json
+
+import main
+import steganography
+
+
+def _manifest(tmp_path, lines):
+    path = tmp_path / 'jobs.jsonl'
+    path.write_text("\n".join(lines) + "\n", encoding='utf-8')
+    return str(path)
+
+
+def test_bad_manifest_lines_fail_alone(tmp_path, make_cover, make_secret, capsys):
+    cover = make_cover()
+    secret = make_secret()
+    out = tmp_path / 'out'
+    manifest = _manifest(tmp_path, [
+        json.dumps({'cover': cover, 'secrets': [secret], 'output': str(out / 'good.png')}),
+        '{"cover": "broken.png", ',
+        json.dumps({'cover': cover, 'output': str(out / 'nosecret.png')}),
+        '# comment',
+        json.dumps({'secrets': [secret]}),
+    ])
+
+    status = main.main(['--workers', '1', 'embed', '--manifest', manifest, '--out', str(out)])
+    printed = capsys.readouterr().out
+    assert status == 1
+    assert "1/4 succeeded, 3 failed" in printed
+    assert "manifest (line 2): invalid JSON" in printed
+    assert "(line 3): no secret files given" in printed
+    assert "manifest (line 5): missing 'cover'" in printed
+    with open(secret, 'rb') as f:
+        assert bytes(dict(steganography.extract_bytes(str(out / 'good.png')))['secret.bin']) == f.read()
+
+
+def test_embed_extract_batch_round_trip(tmp_path, make_cover, make_secret, capsys):
+    covers = [make_cover(f'cover{i}.png') for i in range(3)]
+    secret = make_secret()
+    stego, recovered = tmp_path / 'stego', tmp_path / 'recovered'
+
+    assert main.main(['--workers', '2', 'embed', *covers, '--secret', secret, '--out', str(stego)]) == 0
+    assert main.main(['--workers', '2', 'verify', str(stego)]) == 0
+    assert main.main(['--workers', '2', 'extract', str(stego), '--out', str(recovered)]) == 0
+    assert "3/3 succeeded" in capsys.readouterr().out
+    with open(secret, 'rb') as f:
+        data = f.read()
+    for i in range(3):
+        assert (recovered / f'cover{i}' / 'secret.bin').read_bytes() == data
+
+
+def test_a_failed_job_does_not_stop_the_batch(tmp_path, make_cover, make_secret, capsys):
+    covers = [make_cover('good.png'), str(tmp_path / 'missing.png')]
+    out = tmp_path / 'out'
+
+    assert main.main(['--workers', '1', 'embed', *covers, '--secret', make_secret(), '--out', str(out)]) == 1
+    printed = capsys.readouterr().out
+    assert "1/2 succeeded, 1 failed" in printed
+    assert any(line.startswith("❌") and covers[1] in line for line in printed.splitlines())
+    assert (out / 'good.png').exists()
+
+
+def test_lossy_outputs_are_avoided(tmp_path, make_cover, make_secret, capsys):
+    # A JPEG cover is written back as PNG; an explicit lossy output fails its job
+    cover = make_cover('photo.jpg')
+    secret = make_secret()
+    out = tmp_path / 'out'
+    manifest = _manifest(tmp_path, [json.dumps({'cover': cover, 'output': str(out / 'explicit.jpg')})])
+
+    assert main.main(['--workers', '1', 'embed', cover, '--manifest', manifest, '--secret', secret,
+                      '--out', str(out)]) == 1
+    printed = capsys.readouterr().out
+    assert "1/2 succeeded, 1 failed" in printed
+    assert "explicit.jpg is not lossless" in printed
+    assert not (out / 'photo.jpg').exists()
+    assert not (out / 'explicit.jpg').exists()
+    with open(secret, 'rb') as f:
+        assert bytes(dict(steganography.extract_bytes(str(out / 'photo.png')))['secret.bin']) == f.read()
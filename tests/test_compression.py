@@ -0,0 +1,44 @@
+import pytest
+
+import steganography
+
+TEXT = b"The quick brown fox jumps over the lazy dog. " * 200
+
+
+@pytest.mark.parametrize('codec', steganography.CODECS)
+def test_codec_round_trip(tmp_path, make_cover, make_secret, codec):
+    secret = make_secret('text.txt', data=TEXT)
+    output = str(tmp_path / 'out.png')
+    steganography.embed_multiple_files(make_cover(size=(200, 160)), [secret], output, compression=codec)
+
+    (entry,) = steganography.list_files(output)
+    assert entry['codec'] == codec
+    assert entry['size'] == len(TEXT)
+    if codec != 'none':
+        assert entry['stored'] < len(TEXT) // 10
+    assert bytes(dict(steganography.extract_bytes(output))['text.txt']) == TEXT
+
+
+def test_auto_compresses_only_what_shrinks(tmp_path, make_cover, make_secret):
+    secrets = [make_secret('text.txt', data=TEXT), make_secret('noise.bin', size=3000),
+               make_secret('photo.jpg', data=TEXT)]
+    output = str(tmp_path / 'out.png')
+    steganography.embed_multiple_files(make_cover(size=(240, 200)), secrets, output, compression='auto')
+
+    # Low sampled entropy is compressed; noise and already-compressed
+    # extensions are stored as they are
+    assert {entry['name']: entry['codec'] for entry in steganography.list_files(output)} == {
+        'text.txt': 'zlib', 'noise.bin': 'none', 'photo.jpg': 'none'}
+    files = dict(steganography.extract_bytes(output))
+    for secret in secrets:
+        with open(secret, 'rb') as f:
+            assert bytes(files[secret.rsplit('/', 1)[-1]]) == f.read()
+
+
+def test_compression_lets_a_large_text_fit(tmp_path, make_cover, make_secret):
+    # 9000 bytes of text don't fit in 64x48 at 1 bit, compressed they do
+    secret = make_secret('text.txt', data=TEXT)
+    with pytest.raises(ValueError):
+        steganography.embed_multiple_files(make_cover(), [secret], str(tmp_path / 'plain.png'))
+    steganography.embed_multiple_files(make_cover(), [secret], str(tmp_path / 'packed.png'), compression='auto')
+    assert bytes(dict(steganography.extract_bytes(str(tmp_path / 'packed.png')))['text.txt']) == TEXT
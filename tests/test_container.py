@@ -0,0 +1,71 @@
+import os
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import steganography
+
+
+def test_files_round_trip_with_names(tmp_path, make_cover, make_secret):
+    secrets = [make_secret('notes.txt', data=b'hello world\n' * 20), make_secret('blob.bin', size=500),
+               make_secret('empty.dat', data=b'')]
+    output = str(tmp_path / 'out.png')
+    steganography.embed_multiple_files(make_cover(), secrets, output)
+
+    result = steganography.extract_multiple_files(output, str(tmp_path / 'recovered'))
+    assert [entry['name'] for entry in result.files] == ['notes.txt', 'blob.bin', 'empty.dat']
+    for secret in secrets:
+        with open(secret, 'rb') as f:
+            assert (tmp_path / 'recovered' / os.path.basename(secret)).read_bytes() == f.read()
+
+
+def test_only_the_payload_samples_change(tmp_path, make_cover, make_secret):
+    cover = make_cover(size=(128, 96))
+    output = str(tmp_path / 'out.png')
+    steganography.embed_multiple_files(cover, [make_secret(size=300)], output)
+
+    info = steganography.stego_info(output)
+    assert info['bits_per_channel'] == 1
+    assert [entry['size'] for entry in info['files']] == [300]
+    # Signature, then the length-prefixed body from the next whole pixel,
+    # one bit per sample
+    signature = (steganography.SIGNATURE.size + steganography.LAYOUT.size + steganography.CARRIER.size +
+                 steganography.CODE.size)
+    body_start = -(-signature * 8 // 3) * 3
+    changed = np.flatnonzero(np.asarray(Image.open(cover)) != np.asarray(Image.open(output)))
+    assert changed.max() < body_start + info['payload_bytes'] * 8
+
+
+def test_too_large_payload_leaves_no_output(tmp_path, make_cover, make_secret):
+    output = tmp_path / 'out.png'
+    with pytest.raises(ValueError, match="Not enough space"):
+        steganography.embed_multiple_files(make_cover(size=(16, 16)), [make_secret(size=1000)], str(output))
+    assert not output.exists()
+
+
+def test_delimiter_images_still_extract(tmp_path, make_cover):
+    # The format written before the container: [EXT 8][DATA][####] per file
+    cover = make_cover()
+    payload = b'.txt####' + b'an old secret' + b'####'
+    pixels = np.asarray(Image.open(cover)).copy()
+    flat = pixels.reshape(-1)
+    bits = np.unpackbits(np.frombuffer(payload, dtype=np.uint8))
+    flat[:len(bits)] = (flat[:len(bits)] & 0xFE) | bits
+    stego = str(tmp_path / 'old.png')
+    Image.fromarray(pixels).save(stego)
+
+    result = steganography.extract_multiple_files(stego, str(tmp_path / 'out'))
+    assert len(result.files) == 1
+    assert steganography.stego_info(stego) is None
+    assert (tmp_path / 'out' / 'secret_0.txt').read_bytes() == b'an old secret'
+
+
+def test_other_container_versions_are_refused(tmp_path, make_cover, make_secret, monkeypatch):
+    output = str(tmp_path / 'old.png')
+    monkeypatch.setattr(steganography, 'FORMAT_VERSION', steganography.FORMAT_VERSION - 1)
+    steganography.embed_multiple_files(make_cover(), [make_secret()], output)
+    monkeypatch.undo()
+
+    with pytest.raises(ValueError, match=f"Unsupported container version {steganography.FORMAT_VERSION - 1}"):
+        steganography.stego_info(output)
@@ -0,0 +1,70 @@
+import os
+
+import pytest
+from PIL import Image
+
+import steganography
+
+
+def _extracted(path):
+    return bytes(dict(steganography.extract_bytes(path))['secret.bin'])
+
+
+@pytest.mark.parametrize('encoder', [name for name in steganography.ENCODERS] +
+                         [{'compress_level': 2, 'compress_type': 'filtered'}])
+def test_every_png_profile_round_trips(tmp_path, make_cover, make_secret, encoder):
+    secret = make_secret()
+    output = str(tmp_path / 'out.png')
+    steganography.embed_multiple_files(make_cover(), [secret], output, encoder=encoder)
+    with open(secret, 'rb') as f:
+        assert _extracted(output) == f.read()
+
+
+def test_png_levels_trade_size(tmp_path, make_secret):
+    # A gradient compresses, unlike the noise covers
+    cover = str(tmp_path / 'gradient.png')
+    Image.linear_gradient('L').convert('RGB').save(cover)
+    secret = make_secret()
+    sizes = {}
+    for encoder in ('uncompressed', 'smallest'):
+        output = str(tmp_path / f'{encoder}.png')
+        steganography.embed_multiple_files(cover, [secret], output, encoder=encoder)
+        sizes[encoder] = os.path.getsize(output)
+    assert sizes['smallest'] < sizes['uncompressed']
+
+
+@pytest.mark.parametrize('encoder', ['no-such-profile', {'compress_type': 'no-such-strategy'}])
+def test_unknown_encoder_settings(tmp_path, make_cover, make_secret, encoder):
+    with pytest.raises(ValueError, match="Unknown"):
+        steganography.embed_multiple_files(make_cover(), [make_secret()], str(tmp_path / 'out.png'),
+                                           encoder=encoder)
+
+
+@pytest.mark.parametrize('name, options', [('cover.bmp', {}), ('cover.tif', {'compression': 'raw'})])
+def test_raw_cover_is_patched_without_reencoding(tmp_path, make_cover, make_secret, name, options):
+    cover, secret = make_cover(name, **options), make_secret()
+    output = str(tmp_path / ('out' + os.path.splitext(name)[1]))
+    result = steganography.embed_multiple_files(cover, [secret], output)
+
+    assert 'copy' in result.stages
+    assert 'decode' not in result.stages and 'encode' not in result.stages
+    assert os.path.getsize(output) == os.path.getsize(cover)
+    with open(cover, 'rb') as a, open(output, 'rb') as b:
+        # Only pixel bytes change: the file header is the same
+        assert a.read(14) == b.read(14)
+    with open(secret, 'rb') as f:
+        assert _extracted(output) == f.read()
+
+
+def test_source_profile_keeps_tiff_compression(tmp_path, make_cover, make_secret):
+    cover = make_cover('cover.tif', compression='tiff_adobe_deflate')
+    output = str(tmp_path / 'out.tif')
+    steganography.embed_multiple_files(cover, [make_secret()], output, encoder='source')
+    with Image.open(output) as img:
+        assert img.info['compression'] == 'tiff_adobe_deflate'
+
+
+def test_profile_encoders_reports_every_profile(make_cover):
+    rows = steganography.profile_encoders(make_cover(), ['fastest', 'smallest'])
+    assert [(row['encoder'], row['format']) for row in rows] == [('fastest', 'PNG'), ('smallest', 'PNG')]
+    assert all(row['bytes'] > 0 and row['seconds'] >= 0 for row in rows)
@@ -0,0 +1,105 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import steganography
+import stego_gui
+
+
+class Widget:
+    # Records config() calls in place of a Tk widget
+    def __init__(self, *args, **options):
+        self.options = dict(options)
+
+    def config(self, **options):
+        self.options.update(options)
+
+    def pack(self, **options):
+        pass
+
+
+class Root:
+    # Runs root.after callbacks straight away, on the calling thread
+    def after(self, ms, callback):
+        callback()
+
+
+@pytest.fixture
+def gui(monkeypatch):
+    # The job queue of the GUI without a display: widgets are stand-ins,
+    # and the labels finish_job adds record their text in app.details
+    app = object.__new__(stego_gui.StegoProGUI)
+    app.root = Root()
+    app.colors = {'bg_dark': '#000', 'success': 'green', 'error': 'red'}
+    app.jobs, app.latest_job = [], {}
+    app.job_pool = ThreadPoolExecutor(max_workers=1)
+    app.lbl_jobs = Widget()
+    app.add_job_row = lambda job: setattr(job, 'row', {'frame': Widget(), 'status': Widget(), 'bar': Widget(),
+                                                       'cancel': Widget()})
+    details = []
+    monkeypatch.setattr(stego_gui.tk, 'Label', lambda *args, **options: details.append(options['text']) or Widget())
+    app.details = details
+    yield app
+    app.job_pool.shutdown(wait=True)
+
+
+def test_finished_embed_shows_status_and_timings(tmp_path, gui, make_cover, make_secret):
+    cover, secret, output = make_cover(), make_secret(), str(tmp_path / 'out.png')
+    tab = (Widget(), Widget())
+    job = gui.submit_job("embed", lambda on_event: steganography.embed_multiple_files(cover, [secret], output,
+                                                                                      on_event=on_event),
+                         lambda result: f"done in {result.seconds:.2f} s", tab)
+    job.future.result()
+
+    assert job.status == 'done'
+    assert job.row['status'].options['text'].startswith("done in")
+    assert job.row['bar'].options['value'] == 100
+    assert tab[0].options['value'] == 100 and tab[1].options['text'] == job.row['status'].options['text']
+    assert len(gui.details) == 1 and gui.details[0].startswith("⏱️ Time by stage:")
+    assert gui.lbl_jobs.options['text'] == "1 done"
+
+
+def test_queued_job_cancels_without_running(gui):
+    release, ran = threading.Event(), []
+    blocker = gui.submit_job("blocker", lambda on_event: release.wait(5), lambda result: "ok")
+    waiting = gui.submit_job("waiting", lambda on_event: ran.append(True), lambda result: "ok")
+    gui.cancel_job(waiting)
+    release.set()
+    blocker.future.result()
+
+    assert waiting.status == 'cancelled' and ran == []
+    assert blocker.status == 'done'
+    assert gui.lbl_jobs.options['text'] == "1 done, 1 cancelled"
+
+
+def test_running_job_stops_at_the_next_event(gui):
+    started, go_on = threading.Event(), threading.Event()
+
+    def run(on_event):
+        started.set()
+        go_on.wait(5)
+        for done in range(100):
+            on_event({'event': 'progress', 'stage': 'embed', 'bytes': done, 'total': 100})
+        return "finished"
+
+    job = gui.submit_job("slow", run, lambda result: result)
+    started.wait(5)
+    gui.cancel_job(job)
+    assert job.row['status'].options['text'] == "Cancelling..."
+    go_on.set()
+    job.future.result()
+    assert job.status == 'cancelled'
+    assert gui.details == []
+
+
+def test_failed_job_shows_the_error(gui):
+    def run(on_event):
+        # Worded like the core's errors, which carry their own ❌
+        raise ValueError("❌ broken cover")
+
+    job = gui.submit_job("bad", run, lambda result: "ok")
+    job.future.result()
+    assert job.status == 'failed'
+    assert job.row['status'].options['text'] == "Failed ❌ broken cover"
+    assert job.row['status'].options['text'].count("❌") == 1
@@ -0,0 +1,53 @@
+import pytest
+
+import steganography
+
+
+def _check_events(events):
+    # Every start has its end, and progress only goes forward
+    open_stages = []
+    progress = {}
+    for event in events:
+        if event['event'] == 'start':
+            open_stages.append(event['stage'])
+        elif event['event'] == 'end':
+            assert open_stages.pop() == event['stage']
+            assert event['seconds'] >= 0
+        else:
+            assert event['bytes'] >= progress.get(event['stage'], 0)
+            assert event['bytes'] <= event['total']
+            progress[event['stage']] = event['bytes']
+    assert open_stages == []
+    return progress
+
+
+def test_embed_and_extract_report_their_stages(tmp_path, make_cover, make_secret):
+    secrets = [make_secret('a.bin', size=600), make_secret('b.bin', size=400)]
+    output = str(tmp_path / 'out.png')
+    events = []
+    result = steganography.embed_multiple_files(make_cover(size=(96, 80)), secrets, output, chunk_size=2000,
+                                                on_event=events.append)
+    assert _check_events(events)['embed'] == 1000
+    assert {'prepare', 'read', 'embed'} <= set(result.stages)
+    # Nested stages are not counted twice
+    assert sum(stage['seconds'] for stage in result.stages.values()) == pytest.approx(result.seconds, abs=0.05)
+
+    events = []
+    result = steganography.extract_multiple_files(output, str(tmp_path / 'out'), on_event=events.append)
+    _check_events(events)
+    assert result.payload_bytes == 1000
+    table = result.timing_table()
+    assert table.startswith("⏱️ Time by stage:")
+    assert all(name in table for name in result.stages)
+
+
+def test_hook_can_stop_an_embed(tmp_path, make_cover, make_secret):
+    class Stop(Exception):
+        pass
+
+    def hook(event):
+        if event['event'] == 'progress':
+            raise Stop()
+
+    with pytest.raises(Stop):
+        steganography.embed_multiple_files(make_cover(), [make_secret()], str(tmp_path / 'out.png'), on_event=hook)
@@ -0,0 +1,120 @@
+import threading
+
+import numpy as np
+import pytest
+
+import steganography
+
+
+@pytest.fixture
+def threaded(monkeypatch):
+    # Four threads on tiny bands, so even small arrays are split up
+    monkeypatch.setattr(steganography, 'THREADS', 4)
+    monkeypatch.setattr(steganography, 'BAND_SIZE', 64)
+    steganography._reset_thread_pool()
+    yield
+    steganography._reset_thread_pool()
+
+
+@pytest.mark.parametrize('k', [1, 2, 3, 4])
+@pytest.mark.parametrize('dtype', [np.uint8, np.uint16])
+def test_values_round_trip(rng, k, dtype):
+    data = rng.integers(0, 256, 3 * 1000, dtype=np.uint8).tobytes()
+    symbols = steganography._to_symbols(data, k)
+    # The payload sits under whatever the cover had in its high bits
+    samples = rng.integers(0, np.iinfo(dtype).max, len(symbols) + 1, dtype=dtype)
+    samples[1:] = (samples[1:] & ~np.array((1 << k) - 1, dtype=dtype)) | symbols
+    assert steganography._values_to_bytes(samples[1:], k, 0, len(data)) == data
+    # Starting part-way into a value (k = 3 packs across byte boundaries)
+    if k == 3:
+        assert steganography._values_to_bytes(samples[1:], k, 2, 100) == \
+            np.packbits(np.unpackbits(np.frombuffer(data, dtype=np.uint8))[2:802]).tobytes()
+
+
+@pytest.mark.parametrize('k', [1, 2, 3, 4])
+def test_threads_give_the_same_bytes(rng, monkeypatch, k):
+    data = rng.integers(0, 256, 4096 * 3, dtype=np.uint8).tobytes()
+    samples = rng.integers(0, 256, len(data) * 8 // k, dtype=np.uint8)
+    samples = (samples & ~np.uint8((1 << k) - 1)) | steganography._to_symbols(data, k)
+
+    monkeypatch.setattr(steganography, 'THREADS', 1)
+    single = steganography._values_to_bytes(samples, k, 0, len(data)), steganography._to_symbols(data, k)
+    monkeypatch.setattr(steganography, 'THREADS', 4)
+    monkeypatch.setattr(steganography, 'BAND_SIZE', 64)
+    steganography._reset_thread_pool()
+    try:
+        threaded = steganography._values_to_bytes(samples, k, 0, len(data)), steganography._to_symbols(data, k)
+    finally:
+        steganography._reset_thread_pool()
+    assert single[0] == threaded[0] == data
+    assert np.array_equal(single[1], threaded[1])
+
+
+def test_concurrent_calls_share_one_pool(threaded, monkeypatch):
+    created = []
+
+    class CountingPool(steganography.ThreadPoolExecutor):
+        def __init__(self, *args, **kwargs):
+            created.append(self)
+            super().__init__(*args, **kwargs)
+
+    monkeypatch.setattr(steganography, 'ThreadPoolExecutor', CountingPool)
+    start = threading.Barrier(8)
+    sums = []
+
+    def call():
+        out = np.zeros(4000, dtype=np.int64)
+
+        def band(lo, hi):
+            out[lo:hi] = np.arange(lo, hi)
+
+        start.wait()
+        steganography._in_bands(len(out), band, min_band=100)
+        sums.append(int(out.sum()))
+
+    callers = [threading.Thread(target=call) for _ in range(8)]
+    for caller in callers:
+        caller.start()
+    for caller in callers:
+        caller.join()
+    assert len(created) == 1
+    assert sums == [sum(range(4000))] * 8
+    created[0].shutdown()
+
+
+def test_threaded_embed_matches_single_thread(tmp_path, make_cover, make_secret, monkeypatch, threaded):
+    cover, secret = make_cover(size=(128, 96)), make_secret(size=4000)
+    steganography.embed_multiple_files(cover, [secret], str(tmp_path / 'threads.png'), bits_per_channel=3)
+    monkeypatch.setattr(steganography, 'THREADS', 1)
+    steganography.embed_multiple_files(cover, [secret], str(tmp_path / 'single.png'), bits_per_channel=3)
+    assert (tmp_path / 'threads.png').read_bytes() == (tmp_path / 'single.png').read_bytes()
+
+
+def test_pool_swap_between_calls_does_not_break_a_running_one(threaded, monkeypatch):
+    # Right after the first call takes the pool, another thread changes
+    # THREADS and runs, shutting that pool down. The first call still has
+    # all of its bands done.
+    class SwapAfterRelease:
+        def __init__(self):
+            self.lock, self.swapped = threading.Lock(), False
+
+        def __enter__(self):
+            self.lock.acquire()
+
+        def __exit__(self, *exc):
+            self.lock.release()
+            if not self.swapped:
+                self.swapped = True
+                monkeypatch.setattr(steganography, 'THREADS', 2)
+                other = threading.Thread(target=steganography._in_bands, args=(256, lambda lo, hi: None, 64))
+                other.start()
+                other.join()
+
+    monkeypatch.setattr(steganography, '_thread_pool_lock', SwapAfterRelease())
+    out = np.zeros(1024, dtype=np.int64)
+
+    def band(lo, hi):
+        out[lo:hi] = np.arange(lo, hi)
+
+    steganography._in_bands(len(out), band, min_band=64)
+    assert np.array_equal(out, np.arange(1024))
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+import main
+import steganography
+
+
+def _changed(cover, stego):
+    return int(np.count_nonzero(np.asarray(Image.open(cover)) != np.asarray(Image.open(stego))))
+
+
+def test_syndrome_write_reaches_any_value(rng):
+    for code in range(steganography.MIN_CODE, steganography.MAX_CODE + 1):
+        n = (1 << code) - 1
+        samples = rng.integers(0, 256, n * 500, dtype=np.uint8)
+        values = rng.integers(0, 1 << code, 500, dtype=np.uint8)
+        before = samples.copy()
+        steganography._matrix_write(samples, values, code)
+        assert np.array_equal(steganography._syndromes(samples, code), values)
+        # At most one LSB per block
+        diff = (before != samples).reshape(-1, n).sum(axis=1)
+        assert diff.max() <= 1 and np.array_equal(before >> 1, samples >> 1)
+
+
+@pytest.mark.parametrize('size', [200, 1000, 2500])
+def test_matrix_round_trip_changes_fewer_channels(tmp_path, make_cover, make_secret, size):
+    cover, secret = make_cover(size=(128, 96)), make_secret(size=size)
+    plain, coded = str(tmp_path / 'plain.png'), str(tmp_path / 'coded.png')
+    steganography.embed_multiple_files(cover, [secret], plain)
+    steganography.embed_multiple_files(cover, [secret], coded, matrix=True)
+
+    info = steganography.stego_info(coded)
+    plan = steganography.plan_capacity(cover, [secret], matrix=True)
+    assert info['code'] == plan['code'] >= steganography.MIN_CODE
+    assert _changed(cover, coded) < _changed(cover, plain)
+    with open(secret, 'rb') as f:
+        assert bytes(dict(steganography.extract_bytes(coded))['secret.bin']) == f.read()
+    assert steganography.verify(coded).valid
+
+
+def test_smaller_payloads_get_longer_codes(make_cover, make_secret):
+    cover = make_cover(size=(128, 96))
+    codes = [steganography.plan_capacity(cover, [make_secret(size=size)], matrix=True)['code']
+             for size in (100, 1000, 2500)]
+    assert codes == sorted(codes, reverse=True) and codes[0] > codes[-1]
+
+
+def test_matrix_needs_one_bit_per_channel(tmp_path, make_cover, make_secret):
+    with pytest.raises(ValueError):
+        steganography.embed_multiple_files(make_cover(), [make_secret()], str(tmp_path / 'out.png'),
+                                           bits_per_channel=2, matrix=True)
+
+
+def test_cli_refuses_matrix_with_shards(tmp_path, make_cover, make_secret):
+    with pytest.raises(SystemExit, match="--matrix"):
+        main.main(['embed', make_cover(), '--secret', make_secret(), '--out', str(tmp_path), '--matrix',
+                   '--shard'])
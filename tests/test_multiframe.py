@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+import steganography
+
+
+@pytest.fixture
+def tiff_cover(tmp_path, rng):
+    # A 4-page TIFF, pages of different heights
+    pages = [Image.fromarray(rng.integers(0, 256, (40 + 6 * i, 64, 3), dtype=np.uint8)) for i in range(4)]
+    path = tmp_path / 'pages.tif'
+    pages[0].save(path, save_all=True, append_images=pages[1:], compression='raw')
+    return str(path)
+
+
+def test_plan_counts_pages_only_for_tiff_output(tiff_cover, make_secret):
+    secret = make_secret(size=100)
+    as_tiff = steganography.plan_capacity(tiff_cover, [secret], fmt='TIFF')
+    as_png = steganography.plan_capacity(tiff_cover, [secret], fmt='PNG')
+    assert as_tiff['frames'] == 4
+    assert as_png['frames'] == 1
+    assert as_png['capacity'] < as_tiff['capacity']
+    # Without fmt the cover's own format is assumed
+    assert steganography.plan_capacity(tiff_cover, [secret]) == as_tiff
+
+
+def test_png_plan_matches_what_png_output_holds(tiff_cover, make_secret, tmp_path):
+    empty = make_secret(name='fill.bin', data=b'')
+    left = steganography.plan_capacity(tiff_cover, [empty], fmt='PNG')['left']
+
+    fill = make_secret(name='fill.bin', size=left)
+    assert steganography.plan_capacity(tiff_cover, [fill], fmt='PNG')['fits']
+    steganography.embed_multiple_files(tiff_cover, [fill], str(tmp_path / 'out.png'))
+
+    fill = make_secret(name='fill.bin', size=left + 1)
+    assert not steganography.plan_capacity(tiff_cover, [fill], fmt='PNG')['fits']
+    assert steganography.plan_capacity(tiff_cover, [fill], fmt='TIFF')['fits']
+    with pytest.raises(ValueError):
+        steganography.embed_multiple_files(tiff_cover, [fill], str(tmp_path / 'big.png'))
+
+
+@pytest.mark.parametrize('bits', [1, 2])
+def test_payload_spread_over_pages_round_trips(tiff_cover, make_secret, tmp_path, bits):
+    first_page = steganography.plan_capacity(tiff_cover, [make_secret(data=b'')], bits, fmt='PNG')['capacity']
+    secret = make_secret(size=2 * first_page)
+    output = str(tmp_path / 'out.tif')
+    steganography.embed_multiple_files(tiff_cover, [secret], output, bits_per_channel=bits)
+
+    with Image.open(output) as img:
+        assert img.n_frames == 4
+    assert steganography.stego_info(output)['frames'] > 1
+    with open(secret, 'rb') as f:
+        assert bytes(dict(steganography.extract_bytes(output))['secret.bin']) == f.read()
+    assert steganography.verify(output).valid
+
+
+def test_compressed_overflow_is_caught_before_any_page_is_written(tiff_cover, make_secret, tmp_path):
+    capacity = steganography.plan_capacity(tiff_cover, [make_secret(data=b'')], fmt='TIFF')['capacity']
+    # Random bytes don't shrink, so the zlib stream is a little larger than the file
+    secret = make_secret(size=capacity + 1000)
+    output = tmp_path / 'out.tif'
+    with pytest.raises(ValueError, match="Not enough space") as error:
+        steganography.embed_multiple_files(tiff_cover, [secret], str(output), compression='zlib')
+    needed = int(str(error.value).split('Need ')[1].split()[0])
+    assert needed > capacity + 1000
+    assert not output.exists()
+
+    # Text that only fits once compressed still goes in
+    text = make_secret(name='notes.txt', data=b'steganography ' * (capacity // 7))
+    steganography.embed_multiple_files(tiff_cover, [text], str(output), compression='zlib')
+    with open(text, 'rb') as f:
+        assert bytes(dict(steganography.extract_bytes(output))['notes.txt']) == f.read()
@@ -0,0 +1,95 @@
+import struct
+import zlib
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import steganography
+
+
+@pytest.mark.parametrize('mode, name', [('RGBA', 'cover.png'), ('L', 'cover.png'), ('LA', 'cover.png'),
+                                        ('I;16', 'cover.png'), ('I;16', 'cover.tif')])
+def test_native_mode_round_trip(tmp_path, make_cover, make_secret, mode, name):
+    cover, secret = make_cover(name, size=(96, 64), mode=mode), make_secret(size=300)
+    output = str(tmp_path / ('out.' + name.rsplit('.', 1)[1]))
+    steganography.embed_multiple_files(cover, [secret], output, bits_per_channel=2)
+
+    with Image.open(cover) as before, Image.open(output) as after:
+        # Same mode and depth: nothing was converted on the way
+        assert after.mode == before.mode
+        original, changed = np.asarray(before), np.asarray(after)
+    assert changed.dtype == original.dtype == (np.uint16 if mode == 'I;16' else np.uint8)
+    assert steganography.stego_info(output)['mode'] == mode
+    assert np.array_equal(original >> 2, changed >> 2)
+    if mode.endswith('A'):
+        # Alpha carries nothing by default
+        assert np.array_equal(original[..., -1], changed[..., -1])
+    with open(secret, 'rb') as f:
+        assert bytes(dict(steganography.extract_bytes(output))['secret.bin']) == f.read()
+
+
+def test_alpha_can_carry_data_when_asked(tmp_path, make_cover, make_secret):
+    cover, secret = make_cover(mode='RGBA'), make_secret(size=300)
+    output = str(tmp_path / 'out.png')
+    steganography.embed_multiple_files(cover, [secret], output, channels='A')
+
+    assert steganography.stego_info(output)['channels'] == 'A'
+    original, changed = np.asarray(Image.open(cover)), np.asarray(Image.open(output))
+    # The signature still goes in RGB, the body only in alpha
+    assert not np.array_equal(original[..., 3], changed[..., 3])
+    assert np.array_equal(original[20:, :, :3], changed[20:, :, :3])
+    with open(secret, 'rb') as f:
+        assert bytes(dict(steganography.extract_bytes(output))['secret.bin']) == f.read()
+
+
+def test_unknown_channels_are_refused(tmp_path, make_cover, make_secret):
+    with pytest.raises(ValueError, match="Channels"):
+        steganography.embed_multiple_files(make_cover(mode='L'), [make_secret()], str(tmp_path / 'out.png'),
+                                           channels='R')
+
+
+def _rgb16_png(path, pixels):
+    height, width, _ = pixels.shape
+    raw = b''.join(b'\x00' + row.astype('>u2').tobytes() for row in pixels)
+
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+    with open(path, 'wb') as f:
+        f.write(b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 16, 2, 0, 0, 0))
+                + chunk(b'IDAT', zlib.compress(raw)) + chunk(b'IEND', b''))
+
+
+def _rgb16_tiff(path, pixels, order):
+    # One uncompressed strip; BitsPerSample (3 values) follows the IFD, the pixels follow that
+    height, width, _ = pixels.shape
+    data = pixels.astype(order + 'u2').tobytes()
+    tags = [(256, 3, 1, width), (257, 3, 1, height), (258, 3, 3, 8 + 2 + 12 * 10 + 4), (259, 3, 1, 1),
+            (262, 3, 1, 2), (273, 4, 1, 8 + 2 + 12 * 10 + 4 + 6), (277, 3, 1, 3), (278, 3, 1, height),
+            (279, 4, 1, len(data)), (284, 3, 1, 1)]
+    out = (b'II' if order == '<' else b'MM') + struct.pack(order + 'HIH', 42, 8, len(tags))
+    for tag, kind, count, value in tags:
+        out += struct.pack(order + ('HHIHH' if kind == 3 and count == 1 else 'HHII'), tag, kind, count, value,
+                           *((0,) if kind == 3 and count == 1 else ()))
+    with open(path, 'wb') as f:
+        f.write(out + struct.pack(order + 'I3H', 0, 16, 16, 16) + data)
+
+
+@pytest.mark.parametrize('name, order', [('cover.png', '>'), ('cover.tif', '<'), ('cover.tif', '>')])
+def test_16_bit_colour_covers_are_refused(tmp_path, rng, make_secret, name, order):
+    # Pillow reads these as 8-bit RGB: embedding would silently drop the low byte of every sample
+    cover, output = str(tmp_path / name), tmp_path / ('out.' + name.rsplit('.', 1)[1])
+    pixels = rng.integers(0, 65536, size=(64, 96, 3), dtype=np.uint16)
+    if name.endswith('.png'):
+        _rgb16_png(cover, pixels)
+    else:
+        _rgb16_tiff(cover, pixels, order)
+    with Image.open(cover) as img:
+        args = img.tile[0][3]
+        assert img.mode == 'RGB' and (args[0] if isinstance(args, tuple) else args).startswith('RGB;16')
+
+    with pytest.raises(ValueError, match="16-bit RGB"):
+        steganography.embed_multiple_files(cover, [make_secret()], str(output))
+    assert not output.exists()
+    with pytest.raises(ValueError, match="16-bit RGB"):
+        steganography.plan_capacity(cover, [make_secret()])
@@ -0,0 +1,160 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+import server
+import steganography
+
+
+async def _request(port, method, path, body=None, headers=None):
+    # One raw HTTP request; reads the response until the server closes the connection
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    data = json.dumps(body).encode('utf-8') if body is not None else b''
+    head = [f"{method} {path} HTTP/1.1", "Host: localhost"]
+    head += [f"{key}: {value}" for key, value in (headers or {'Content-Length': len(data)}).items()]
+    writer.write(("\r\n".join(head) + "\r\n\r\n").encode('latin-1') + data)
+    await writer.drain()
+    response = await asyncio.wait_for(reader.read(), timeout=10)
+    writer.close()
+    status_line, _, rest = response.partition(b'\r\n')
+    _, _, payload = rest.partition(b'\r\n\r\n')
+    return int(status_line.split()[1]), json.loads(payload)
+
+
+def _with_server(scenario, **options):
+    async def run():
+        job_server = await server.JobServer(port=0, workers=options.pop('workers', 1), **options).start()
+        try:
+            return await scenario(job_server)
+        finally:
+            await job_server.close()
+    return asyncio.run(run())
+
+
+def test_post_response_ends_with_eof(tmp_path):
+    # Every response, the first POST included, must be followed by EOF
+    async def scenario(job_server):
+        return [await _request(job_server.port, 'POST', '/jobs', {'op': 'verify', 'stego': str(tmp_path / 'x.png')})
+                for _ in range(3)]
+
+    for status, payload in _with_server(scenario, workers=2):
+        assert status == 202
+        assert payload['status'] == 'queued'
+
+
+def test_bad_content_length_is_a_400():
+    async def scenario(job_server):
+        return [await _request(job_server.port, 'POST', '/jobs', headers={'Content-Length': value})
+                for value in ('abc', '-5', '1_0', '')]
+
+    for status, payload in _with_server(scenario):
+        assert status == 400
+        assert 'Content-Length' in payload['error']
+
+
+def test_analyze_result_is_strict_json(make_cover):
+    narrow = make_cover('narrow.png', size=(3, 8))
+    # Too narrow for RS analysis: the undefined rate is null, not NaN
+    result = server.analyze_task({'original': narrow, 'stego': narrow, 'detect': True})
+    assert result['rs_rate'] is None
+    json.dumps(result, allow_nan=False)
+
+
+def test_full_queue_is_a_503_and_queued_jobs_cancel():
+    # No dispatchers: jobs stay queued, so the queue limit is what counts
+    async def scenario():
+        job_server = server.JobServer(workers=1, queue_size=2)
+        job_server.queue = asyncio.Queue()
+        jobs = [job_server.submit({'op': 'extract', 'stego': f'{i}.png', 'output_dir': 'out'}) for i in range(2)]
+        with pytest.raises(server.HTTPError) as full:
+            job_server.submit({'op': 'extract', 'stego': '2.png', 'output_dir': 'out'})
+        assert full.value.status == 503
+        assert full.value.headers == {'Retry-After': '1'}
+
+        assert job_server.cancel(jobs[0]['id'])['status'] == 'cancelled'
+        assert job_server.metrics()['queue_depth'] == 1
+        # The cancelled job no longer takes up room, even though it is still in the queue
+        job_server.submit({'op': 'extract', 'stego': '3.png', 'output_dir': 'out'})
+        with pytest.raises(server.HTTPError):
+            job_server.submit({'op': 'extract', 'stego': '4.png', 'output_dir': 'out'})
+        metrics = job_server.metrics()
+        assert metrics['rejected'] == 2
+        assert metrics['queue_depth'] == 2
+        assert metrics['jobs'] == {'cancelled': 1, 'queued': 2}
+
+    asyncio.run(scenario())
+
+
+def test_bad_job_requests():
+    async def scenario(job_server):
+        return [await _request(job_server.port, 'POST', '/jobs', {'op': 'nope'}),
+                await _request(job_server.port, 'POST', '/jobs', {'op': 'embed', 'cover': 'c.png'}),
+                await _request(job_server.port, 'POST', '/jobs', [1, 2]),
+                await _request(job_server.port, 'GET', '/jobs/unknown'),
+                await _request(job_server.port, 'PUT', '/jobs/unknown')]
+
+    statuses = [status for status, _ in _with_server(scenario)]
+    assert statuses == [400, 400, 400, 404, 405]
+
+
+def test_job_runs_to_completion(tmp_path, make_cover, make_secret):
+    stego = str(tmp_path / 'stego.png')
+    steganography.embed_multiple_files(make_cover(), [make_secret()], stego)
+
+    async def scenario(job_server):
+        _, job = await _request(job_server.port, 'POST', '/jobs', {'op': 'verify', 'stego': stego})
+        for _ in range(200):
+            _, job = await _request(job_server.port, 'GET', f"/jobs/{job['id']}")
+            if job['status'] not in ('queued', 'running'):
+                break
+            await asyncio.sleep(0.05)
+        # Too late to cancel: the finished job comes back as it is
+        _, cancelled = await _request(job_server.port, 'DELETE', f"/jobs/{job['id']}")
+        _, metrics = await _request(job_server.port, 'GET', '/metrics')
+        return job, cancelled, metrics
+
+    job, cancelled, metrics = _with_server(scenario)
+    assert job['status'] == 'done'
+    assert job['result']['valid'] is True
+    assert cancelled['status'] == 'done'
+    assert metrics['jobs'] == {'done': 1}
+    assert metrics['latency']['run']['count'] == 1
+
+
+def _crash(params):
+    # Dies the way an out-of-memory kill would: no exception, the process is just gone
+    os._exit(1)
+
+
+def test_pool_is_rebuilt_after_a_worker_dies(tmp_path, make_cover, make_secret, monkeypatch):
+    monkeypatch.setitem(server.TASKS, 'crash', _crash)
+    monkeypatch.setitem(server.REQUIRED, 'crash', ())
+    stego = str(tmp_path / 'stego.png')
+    steganography.embed_multiple_files(make_cover(), [make_secret()], stego)
+
+    async def finished(job_server, params):
+        _, job = await _request(job_server.port, 'POST', '/jobs', params)
+        for _ in range(400):
+            _, job = await _request(job_server.port, 'GET', f"/jobs/{job['id']}")
+            if job['status'] not in ('queued', 'running'):
+                return job
+            await asyncio.sleep(0.05)
+
+    async def scenario(job_server):
+        crashed = await finished(job_server, {'op': 'crash'})
+        for _ in range(400):
+            _, health = await _request(job_server.port, 'GET', '/health')
+            if health['status'] == 'ok':
+                break
+            await asyncio.sleep(0.05)
+        # The next job gets a working pool instead of BrokenProcessPool
+        return crashed, health, await finished(job_server, {'op': 'verify', 'stego': stego})
+
+    crashed, health, job = _with_server(scenario)
+    assert crashed['status'] == 'failed'
+    assert 'worker process died' in crashed['error']
+    assert health == {'status': 'ok', 'pool_restarts': 1}
+    assert job['status'] == 'done'
+    assert job['result']['valid'] is True
@@ -0,0 +1,46 @@
+import pytest
+
+import steganography
+
+
+@pytest.fixture
+def shard_set(tmp_path, make_cover, make_secret):
+    # Two secrets spread over three covers of different sizes
+    covers = [make_cover(f'cover{i}.png', size=(64 + 32 * i, 64)) for i in range(3)]
+    secrets = [make_secret('a.bin', size=3000), make_secret('b.txt', size=1500)]
+    outputs = [str(tmp_path / f'shard{i}.png') for i in range(3)]
+    results = steganography.embed_sharded(covers, secrets, outputs, workers=2)
+    return covers, secrets, outputs, results
+
+
+def test_shards_reassemble(tmp_path, shard_set):
+    covers, secrets, outputs, results = shard_set
+    assert [result.output for result in results] == outputs
+
+    # In any order
+    result = steganography.extract_sharded(outputs[::-1], str(tmp_path / 'out'), workers=2)
+    assert [entry['name'] for entry in result.files] == ['a.bin', 'b.txt']
+    for secret in secrets:
+        with open(secret, 'rb') as f:
+            assert (tmp_path / 'out' / secret.rsplit('/', 1)[-1]).read_bytes() == f.read()
+
+
+def test_plan_splits_by_capacity(shard_set):
+    covers, secrets, _, _ = shard_set
+    files, shards = steganography.plan_shards(covers, secrets)
+    sizes = [sum(piece['size'] for piece in pieces) for pieces in shards]
+    assert sum(sizes) == 4500
+    # Bigger covers take more
+    assert sizes[0] < sizes[1] < sizes[2]
+
+
+def test_incomplete_set_is_refused(tmp_path, shard_set):
+    _, _, outputs, _ = shard_set
+    with pytest.raises(ValueError, match="Incomplete shard set"):
+        steganography.extract_sharded(outputs[:2], str(tmp_path / 'out'))
+
+
+def test_payload_too_big_for_all_covers(tmp_path, make_cover, make_secret):
+    covers = [make_cover(f'cover{i}.png', size=(16, 16)) for i in range(2)]
+    with pytest.raises(ValueError, match="Not enough space"):
+        steganography.embed_sharded(covers, [make_secret(size=1000)], [str(tmp_path / f'{i}.png') for i in range(2)])
@@ -0,0 +1,37 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import stego_gui
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.mark.parametrize('module', ['stego_gui', 'main', 'server'])
+def test_front_ends_defer_heavy_imports(module):
+    # A fresh interpreter, as at launch
+    code = f"import sys, {module}; print(','.join(m for m in ('cv2', 'matplotlib', 'analysis') if m in sys.modules))"
+    loaded = subprocess.run([sys.executable, '-c', code], cwd=REPO, capture_output=True, text=True, check=True)
+    assert loaded.stdout.strip() == ''
+
+
+def test_logo_thumbnail_is_cached(tmp_path, monkeypatch):
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path))
+    monkeypatch.delenv('LOCALAPPDATA', raising=False)
+    thumb = stego_gui.logo_thumbnail(32)
+    assert thumb == str(tmp_path / 'stegopro' / 'logo_32.png')
+    written = os.path.getmtime(thumb)
+
+    # Reused while it is newer than the logo
+    assert stego_gui.logo_thumbnail(32) == thumb
+    assert os.path.getmtime(thumb) == written
+
+
+def test_logo_thumbnail_without_a_writable_cache(tmp_path, monkeypatch):
+    blocker = tmp_path / 'file'
+    blocker.write_text('')
+    monkeypatch.setenv('XDG_CACHE_HOME', str(blocker))
+    monkeypatch.delenv('LOCALAPPDATA', raising=False)
+    assert stego_gui.logo_thumbnail(32) is None
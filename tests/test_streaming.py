@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+import steganography
+
+
+def _pixels(path):
+    with Image.open(path) as img:
+        return np.asarray(img)
+
+
+@pytest.mark.parametrize('name', ['cover.png', 'cover.bmp'])
+@pytest.mark.parametrize('bits', [1, 2, 3])
+def test_streaming_embed_matches_in_memory(tmp_path, make_cover, make_secret, name, bits):
+    cover, secret = make_cover(name, size=(96, 80)), make_secret(size=2000)
+    ext = '.' + name.rsplit('.', 1)[1]
+    whole, streamed = str(tmp_path / ('whole' + ext)), str(tmp_path / ('streamed' + ext))
+    steganography.embed_multiple_files(cover, [secret], whole, bits_per_channel=bits)
+    # A few rows at a time
+    steganography.embed_multiple_files(cover, [secret], streamed, streaming=True, chunk_size=1000,
+                                       bits_per_channel=bits)
+
+    assert np.array_equal(_pixels(whole), _pixels(streamed))
+    with open(secret, 'rb') as f:
+        assert bytes(dict(steganography.extract_bytes(streamed))['secret.bin']) == f.read()
+
+
+def test_streaming_embed_checks_space_first(tmp_path, make_cover, make_secret):
+    output = tmp_path / 'out.png'
+    with pytest.raises(ValueError, match="Not enough space"):
+        steganography.embed_multiple_files(make_cover(size=(16, 16)), [make_secret(size=1000)], str(output),
+                                           streaming=True, chunk_size=100)
+    assert not output.exists()
+
+
+def test_secrets_are_read_a_chunk_at_a_time(tmp_path, make_cover, make_secret):
+    cover = make_cover(size=(96, 80))
+    secrets = [make_secret('a.bin', size=2000), make_secret('b.bin', size=700)]
+    events = []
+    chunked = str(tmp_path / 'chunked.png')
+    steganography.embed_multiple_files(cover, secrets, chunked, chunk_size=1000, on_event=events.append)
+
+    # 1000 one-bit samples hold 125 bytes: no read is bigger than that, and
+    # the header slot plus the two files come through in full
+    reads = [event['bytes'] for event in events if event['stage'] == 'read' and event['event'] == 'end']
+    header_len = reads[0]
+    assert max(reads[1:]) == 125
+    assert sum(reads) == header_len + 2700
+
+    whole = str(tmp_path / 'whole.png')
+    steganography.embed_multiple_files(cover, secrets, whole)
+    assert np.array_equal(_pixels(whole), _pixels(chunked))
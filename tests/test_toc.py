@@ -0,0 +1,58 @@
+import io
+
+import pytest
+
+import main
+import steganography
+
+
+@pytest.fixture
+def stego(tmp_path, make_cover, make_secret):
+    secrets = [make_secret('first.txt', data=b'first file\n' * 30), make_secret('middle.bin', size=2000),
+               make_secret('last.txt', data=b'the end')]
+    output = str(tmp_path / 'stego.png')
+    steganography.embed_multiple_files(make_cover(size=(256, 192)), secrets, output, compression='auto')
+    return output
+
+
+def test_table_of_contents(stego):
+    entries = steganography.list_files(stego)
+    assert [(entry['name'], entry['size']) for entry in entries] == [
+        ('first.txt', 330), ('middle.bin', 2000), ('last.txt', 7)]
+    # Stored back to back
+    for entry, following in zip(entries, entries[1:]):
+        assert following['offset'] == entry['offset'] + entry['stored']
+
+
+def test_extract_one_file_decodes_only_its_rows(stego):
+    events = []
+    buffer = io.BytesIO()
+    result = steganography.extract_file(stego, 'last.txt', buffer, on_event=events.append)
+    assert buffer.getvalue() == b'the end'
+    assert result.files[0]['name'] == 'last.txt'
+    # Header and the last file, not the 2000 bytes in between
+    unpacked = sum(event['bytes'] for event in events if event['event'] == 'end' and event['stage'] == 'unpack')
+    assert unpacked < 1000
+
+
+def test_extract_a_subset(tmp_path, stego):
+    out = tmp_path / 'out'
+    result = steganography.extract_multiple_files(stego, str(out), names=['last.txt', 'first.txt'])
+    assert sorted(entry['name'] for entry in result.files) == ['first.txt', 'last.txt']
+    assert sorted(path.name for path in out.iterdir()) == ['first.txt', 'last.txt']
+    assert (out / 'first.txt').read_bytes() == b'first file\n' * 30
+
+
+def test_unknown_name(tmp_path, stego):
+    with pytest.raises(ValueError, match="No hidden file named 'missing.txt'"):
+        steganography.extract_file(stego, 'missing.txt', str(tmp_path / 'missing.txt'))
+
+
+def test_cli_list_and_extract_file(tmp_path, stego, capsys):
+    assert main.main(['--workers', '1', 'list', stego]) == 0
+    listing = capsys.readouterr().out
+    assert "first.txt: 330 bytes (zlib" in listing and "middle.bin: 2,000 bytes" in listing
+
+    out = tmp_path / 'out'
+    assert main.main(['--workers', '1', 'extract', stego, '--out', str(out), '--file', 'middle.bin']) == 0
+    assert [path.name for path in (out / 'stego').iterdir()] == ['middle.bin']